@@ -0,0 +1,268 @@
+# analytics.py
+import argparse
+import glob
+import os
+import time
+from collections import Counter
+import numpy as np
+from events import Dug, LootFound, TorchLit
+from loot import LOOT_TABLES
+
+RECORDS_PER_CHUNK = 1 << 16  # Games buffered in memory before they are written out as a chunk
+HISTOGRAM_BINS = 4096  # Turn counts kept exactly by the running histograms. Longer games share the last bin.
+HISTOGRAMS_SUFFIX = ".histograms.npz"  # Each writer's histograms, next to its chunks
+
+# What a game ended with, as stored in the outcome column
+OUTCOMES = ["escaped", "caught", "quit", "abandoned", "timeout"]
+
+# Everything the loot tables can turn up, "nothing" included
+LOOT_ITEMS = list(dict.fromkeys(item for table in LOOT_TABLES.values() for item, _, _ in table))
+
+def loot_column(item):
+    return "loot_" + (item or "nothing").replace(" ", "_")
+
+# One fixed-width record per game
+COLUMNS = [
+    ("seed", np.uint64),
+    ("outcome", np.uint8),
+    ("turns", np.uint32),
+    ("width", np.uint16),
+    ("height", np.uint16),
+    ("digs", np.uint32),  # Cells dug for the first time
+    ("torches", np.uint32),  # Torches lit
+] + [(loot_column(item), np.uint16) for item in LOOT_ITEMS]  # Draws from the loot table, by what they found
+
+RECORD = np.dtype(COLUMNS)
+
+# Columns that are added up over all games
+TOTALLED = ["digs", "torches"] + [loot_column(item) for item in LOOT_ITEMS]
+
+class GameTally:
+    """A sink for Game(event_log=...) that counts what a game's events add up to, and shows nothing."""
+    __slots__ = ("digs", "torches", "loot")
+
+    def __init__(self):
+        self.digs = 0
+        self.torches = 0
+        self.loot = Counter()
+
+    def handle(self, events):
+        for event in events:
+            kind = type(event)
+            if kind is Dug:
+                self.digs += 1
+            elif kind is TorchLit:
+                self.torches += 1
+            elif kind is LootFound:
+                self.loot[event.item] += 1
+
+class RunningHistogram:
+    __slots__ = ("counts",)
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        """
+        Counts of whole numbers from 0 up, kept as games stream past, so distributions are known
+        without keeping the values. Values of bins - 1 and more are counted in the last bin.
+
+        Args:
+            bins (int): How many bins to keep.
+        """
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def add(self, values):
+        """Count many values at once."""
+        bins = len(self.counts)
+        self.counts += np.bincount(np.minimum(values, bins - 1), minlength=bins)
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        total = self.total()
+        return float(np.arange(len(self.counts)) @ self.counts) / total if total else 0.0
+
+    def quantile(self, fraction):
+        """The smallest value that at least this fraction of the values are at or below."""
+        cumulative = np.cumsum(self.counts)
+        if not cumulative[-1]:
+            return 0
+        return int(np.searchsorted(cumulative, fraction * cumulative[-1]))
+
+class OutcomeWriter:
+    def __init__(self, directory, name, records_per_chunk=RECORDS_PER_CHUNK):
+        """
+        Stream one record per game to disk. Records are buffered in a fixed-size NumPy array of
+        RECORD and written as one .npy file per chunk whenever the buffer fills up, so memory stays
+        the same however many games are played. A histogram of turns per outcome is kept as they go,
+        and written next to the chunks when the writer is closed.
+
+        Args:
+            directory (str): Where to write the chunks.
+            name (str): Start of every file name. Writers sharing a directory need different names.
+            records_per_chunk (int): Games per chunk.
+        """
+        self.directory = directory
+        self.name = name
+        self.records = np.zeros(records_per_chunk, dtype=RECORD)
+        self.buffer = {column: self.records[column] for column, _ in COLUMNS}  # Views of each column, quicker to write to
+        self.size = 0  # Records in the buffer
+        self.chunks = 0  # Chunks written
+        self.histograms = {outcome: RunningHistogram() for outcome in OUTCOMES}
+
+    def append(self, seed, outcome, turns, settings, tally):
+        """
+        Add one game.
+
+        Args:
+            seed (int): The game's seed.
+            outcome (str): One of OUTCOMES.
+            turns (int): Turns played.
+            settings (Settings): The game's settings, for the map size.
+            tally (GameTally): What happened during the game.
+        """
+        buffer = self.buffer
+        i = self.size
+        buffer["seed"][i] = seed
+        buffer["outcome"][i] = OUTCOMES.index(outcome)
+        buffer["turns"][i] = turns
+        buffer["width"][i] = settings.GRID_WIDTH
+        buffer["height"][i] = settings.GRID_HEIGHT
+        buffer["digs"][i] = tally.digs
+        buffer["torches"][i] = tally.torches
+        for item, count in tally.loot.items():
+            buffer[loot_column(item)][i] = count
+        self.size += 1
+        if self.size == len(self.records):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records as a new chunk and update the histograms."""
+        if not self.size:
+            return
+        size = self.size
+        records = self.records[:size]
+        for code, outcome in enumerate(OUTCOMES):
+            self.histograms[outcome].add(records["turns"][records["outcome"] == code])
+        np.save(os.path.join(self.directory, f"{self.name}-{self.chunks:05d}.npy"), records)
+        records[:] = 0  # Loot columns are only written for what was found
+        self.size = 0
+        self.chunks += 1
+
+    def close(self):
+        """Write what is left, and the histograms of every game this writer was given."""
+        self.flush()
+        path = os.path.join(self.directory, self.name + HISTOGRAMS_SUFFIX)
+        np.savez(path, **{outcome: histogram.counts for outcome, histogram in self.histograms.items()})
+
+def load_histograms(directory):
+    """Add up the histograms of every writer that wrote to a directory."""
+    histograms = {outcome: RunningHistogram() for outcome in OUTCOMES}
+    for path in glob.glob(os.path.join(directory, "*" + HISTOGRAMS_SUFFIX)):
+        with np.load(path) as saved:
+            for outcome in OUTCOMES:
+                if outcome in saved:
+                    histograms[outcome].counts += saved[outcome]
+    return histograms
+
+def chunks(directory):
+    """Yield every chunk in a directory, memory-mapped so only the columns asked for are read."""
+    for path in sorted(glob.glob(os.path.join(directory, "*.npy"))):
+        yield np.load(path, mmap_mode="r")
+
+def summarize(directory, outcome=None, size=None):
+    """
+    Add up every record in a directory, a chunk at a time.
+
+    Args:
+        directory (str): Where the chunks are.
+        outcome (str): Only count games that ended this way.
+        size (tuple): Only count games on maps of this (width, height).
+
+    Returns:
+        dict: Game counts and turn histograms by outcome, totals of the other columns, and games and
+            escapes by map size.
+    """
+    games = Counter()
+    turns = {name: RunningHistogram() for name in OUTCOMES}
+    totals = Counter()
+    sizes = Counter()
+    escapes = Counter()
+    escaped = OUTCOMES.index("escaped")
+    for records in chunks(directory):
+        outcomes = np.asarray(records["outcome"])
+        width, height = np.asarray(records["width"]), np.asarray(records["height"])
+        selected = None
+        if outcome is not None:
+            selected = outcomes == OUTCOMES.index(outcome)
+        if size is not None:
+            same_size = (width == size[0]) & (height == size[1])
+            selected = same_size if selected is None else selected & same_size
+        if selected is not None:
+            if not selected.any():
+                continue
+            outcomes, width, height = outcomes[selected], width[selected], height[selected]
+
+        counts = np.bincount(outcomes, minlength=len(OUTCOMES))
+        games.update({name: int(count) for name, count in zip(OUTCOMES, counts) if count})
+        chunk_turns = np.asarray(records["turns"])
+        if selected is not None:
+            chunk_turns = chunk_turns[selected]
+        for code, name in enumerate(OUTCOMES):
+            if counts[code]:
+                turns[name].add(chunk_turns[outcomes == code])
+        for name in TOTALLED:
+            values = np.asarray(records[name])
+            totals[name] += int((values[selected] if selected is not None else values).sum(dtype=np.int64))
+
+        # Games and escapes per map size, by a key that packs the width and the height into one number
+        keys = width.astype(np.int64) << 16 | height
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            sizes[int(key)] += int(count)
+        for key, count in zip(*np.unique(keys[outcomes == escaped], return_counts=True)):
+            escapes[int(key)] += int(count)
+
+    return {
+        "games": games,
+        "turns": turns,
+        "totals": totals,
+        "sizes": {(key >> 16, key & 0xFFFF): (count, escapes[key]) for key, count in sorted(sizes.items())},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize game outcomes written by simulator.py --analytics.")
+    parser.add_argument("directory")
+    parser.add_argument("--outcome", choices=OUTCOMES, help="Only count games that ended this way")
+    parser.add_argument("--size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="Only count games on maps this big")
+    parser.add_argument("--sizes", action="store_true", help="Show the escape rate of every map size")
+    parser.add_argument("--histograms", action="store_true", help="Only read the running histograms, not the records")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.histograms:
+        summary = {"turns": load_histograms(args.directory), "totals": {}, "sizes": {}}
+        summary["games"] = Counter({name: histogram.total() for name, histogram in summary["turns"].items() if histogram.total()})
+    else:
+        summary = summarize(args.directory, args.outcome, tuple(args.size) if args.size else None)
+    games = sum(summary["games"].values())
+    print(f"{games:,} games")
+    for name, count in summary["games"].most_common():
+        histogram = summary["turns"][name]
+        print(f"{name}: {count:,} ({count / games:.1%}), turns mean {histogram.mean():.1f}, "
+              f"median {histogram.quantile(0.5)}, p99 {histogram.quantile(0.99)}")
+    totals = summary["totals"]
+    if games and totals:
+        print(f"per game: {totals['digs'] / games:.2f} digs, {totals['torches'] / games:.2f} torches lit")
+        draws = sum(totals[loot_column(item)] for item in LOOT_ITEMS)
+        for item in LOOT_ITEMS:
+            found = totals[loot_column(item)]
+            print(f"loot {item or 'nothing'}: {found:,} ({found / max(draws, 1):.1%} of draws)")
+    if args.sizes:
+        for (width, height), (count, escapes) in summary["sizes"].items():
+            print(f"{width}x{height}: {count:,} games, {escapes / count:.1%} escaped")
+    print(f"Summarized in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
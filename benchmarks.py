@@ -0,0 +1,1003 @@
+# benchmarks.py
+import argparse
+import ast
+import bisect
+import collections
+import inspect
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import random
+import statistics
+import textwrap
+import time
+import tracemalloc
+from cave import CaveGenerator
+from commands import commands_dict
+from game import Game
+from grid import GridState, SEARCHED, WALL
+from headless import HeadlessGUI
+from instrumentation import Instrumentation
+from inventory import Inventory
+from loot import AliasTable
+from monster import Monster
+from pathfinding import DistanceField, find_path
+from replay import GameLog, replay
+from settings import Settings
+from snapshot import dumps
+from spatial import SpatialIndex
+from simulator import RandomPolicy, play_game, run_batch
+from worker import TurnWorker
+from fov import FieldOfView, shadowcast
+from fuzzy import SymSpellIndex, edit_distance
+from parser import CommandParser, command_parser, normalize
+from utils import unpack_position
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The order Game.run used to check the command lists in, before parser.py existed
+CASCADE_ORDER = ["quit", "up", "down", "left", "right", "dig", "torch", "sweep", "repel", "inventory", "unlock", "help", "cheat"]
+
+def cascade_lookup(player_input, commands=commands_dict, order=CASCADE_ORDER):
+    """The old way of finding an action: check each command list in turn."""
+    for action in order:
+        if player_input in commands[action]:
+            return action
+    return None
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark that can't run here, e.g. because there is no display."""
+
+class BenchmarkFailed(Exception):
+    """Raised by a benchmark whose result breaks a hard limit, e.g. the window stopped responding."""
+
+WORKER_LAG_BUDGET_MS = 100  # The threaded window may be this late at most, about when people notice it hanging
+
+def time_calls(function, inputs, repeat=5):
+    """
+    Call a function once per input, several times over, and keep the fastest pass.
+
+    Returns:
+        float: Seconds per call.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in inputs:
+            function(value)
+        best = min(best, time.perf_counter() - start)
+    return best / len(inputs)
+
+def bench_parser():
+    """Per-command parse latency of the phrase index against the old cascade."""
+    # The cascade scans more phrases as commands.py grows; the index does not
+    grown = dict(commands_dict, generated=[f"generated phrase {i}" for i in range(5000)])
+    grown_order = CASCADE_ORDER + ["generated"]
+    grown_parser = CommandParser(grown)
+
+    phrases = [phrase for action in commands_dict.values() for phrase in action]
+    unknown = ["dance", "go sideways", "eat the shovel", "what is this place"] * 25
+    results = {}
+    for name, inputs in [("known", phrases), ("unknown", unknown)]:
+        for size, commands, order, parser in [("", commands_dict, CASCADE_ORDER, command_parser), ("_grown", grown, grown_order, grown_parser)]:
+            cascade = time_calls(lambda text: cascade_lookup(text, commands, order), inputs)
+            uncached = time_calls(parser.parse_uncached, inputs)
+            cached = time_calls(parser.parse, inputs)
+            results[name + size] = {
+                "cascade_us": cascade * 1e6,
+                "index_us": uncached * 1e6,
+                "index_cached_us": cached * 1e6,
+                "cascade_per_second": 1 / cascade,
+                "index_per_second": 1 / uncached,
+            }
+    return results
+
+def brute_force_lookup(text, phrases, max_distance):
+    """Compare the text with every phrase and keep the closest one."""
+    best = None
+    for phrase in phrases:
+        distance = edit_distance(text, phrase, max_distance)
+        if distance <= max_distance and (best is None or distance < best[1]):
+            best = (phrase, distance)
+    return best
+
+def bench_fuzzy():
+    """Typo lookup with the deletion index against brute-force edit distance over every phrase."""
+    rng = random.Random(0)
+    words = sorted({word for phrases in commands_dict.values() for phrase in phrases for word in normalize(phrase).split()})
+    phrases = sorted({normalize(phrase) for action in commands_dict.values() for phrase in action})
+    generated = [" ".join(rng.choice(words) for _ in range(rng.randint(2, 5))) for _ in range(20000)]
+
+    def add_typo(phrase):
+        i = rng.randrange(len(phrase))
+        return phrase[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + phrase[i + 1:]
+
+    results = {}
+    for name, terms in [("commands", phrases), ("generated_20000", phrases + generated)]:
+        index = SymSpellIndex(max_distance=2)
+        start = time.perf_counter()
+        for term in terms:
+            index.add(term, term)
+        build = time.perf_counter() - start
+        queries = [add_typo(rng.choice(terms)) for _ in range(200)]
+        brute = time_calls(lambda text: brute_force_lookup(text, terms, 2), queries[:20], repeat=1)
+        indexed = time_calls(index.lookup, queries)
+        results[name] = {
+            "phrases": len(terms),
+            "build_ms": build * 1e3,
+            "brute_force_us": brute * 1e6,
+            "index_us": indexed * 1e6,
+        }
+    return results
+
+def bench_grid():
+    """Memory and dig-check latency of GridState against the old list of searched positions."""
+    rng = random.Random(0)
+    results = {}
+    for size in [8, 100, 1000, 10000]:
+        tracemalloc.start()
+        grid = GridState(size, size)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        dug = [(rng.randrange(size), rng.randrange(size)) for _ in range(min(size * size // 2, 2000))]
+        for position in dug:
+            grid.mark_searched(position)
+        searched_positions = list(dug)
+        probes = [(rng.randrange(size), rng.randrange(size)) for _ in range(1000)]
+        results[f"{size}x{size}"] = {
+            "grid_bytes": memory,
+            "grid_dig_check_ns": time_calls(grid.is_searched, probes) * 1e9,
+            "list_dig_check_ns": time_calls(lambda position: position in searched_positions, probes, repeat=1) * 1e9,
+        }
+        del grid
+    return results
+
+def full_draw_map(game, show_key=False):
+    """The old draw_map: build every cell of a new grid and join all rows on every call."""
+    grid = [['⛝ ' if cell & SEARCHED else '⬚ ' for cell in game.grid.row(y)] for y in range(game.grid.height)]
+    for (x, y), symbol in [(game.player_position, '♙ '), (game.monster.position, '♞ '), (game.exit_position, '⬕ ')]:
+        grid[y][x] = symbol
+    if show_key and game.key_position:
+        key_x, key_y = game.key_position
+        grid[key_y][key_x] = '⚿ '
+    return '\n'.join(''.join(row) for row in grid)
+
+def bench_render():
+    """Map drawing time against map size, drawing everything vs. redrawing only what changed."""
+    random.seed(0)
+    results = {}
+    for size in [8, 64, 256, 1024, 10000]:
+        game = Game(HeadlessGUI(keep_messages=False), size, size)
+        game.draw_map(viewport=(16, 12))
+
+        def turn(_):
+            game.run(random.choice(["go north", "go south", "go east", "go west", "dig"]))
+            game.outcome = None
+            game.awaiting_play_again = False
+
+        def time_draws(draw, count):
+            """Play a turn, then time only the drawing that follows it."""
+            total = 0.0
+            for _ in range(count):
+                turn(None)
+                start = time.perf_counter()
+                draw()
+                total += time.perf_counter() - start
+            return total / count
+
+        metrics = {"viewport_ms": time_draws(lambda: game.draw_map(viewport=(16, 12)), 50) * 1e3}
+        if size <= 1024:
+            metrics["incremental_ms"] = time_draws(game.draw_map, 20) * 1e3
+            metrics["full_ms"] = time_draws(lambda: full_draw_map(game), 20) * 1e3
+        results[f"{size}x{size}"] = metrics
+    return results
+
+class BatchRecorder:
+    """An output that keeps every batch of events the game hands over, to feed the same turns to other outputs."""
+    def __init__(self):
+        self.batches = []
+
+    def handle(self, events):
+        self.batches.append(events)
+
+def record_batches(turns, size=8):
+    """Play a seeded game with the random policy and return each turn's batch of events."""
+    recorder = BatchRecorder()
+    game = Game(recorder, size, size, seed=0)
+    rng = random.Random(0)
+    policy = RandomPolicy()
+    for turn in range(turns):
+        game.run("y" if game.awaiting_play_again else policy.choose(game, turn, rng))
+    return recorder.batches
+
+def bench_message_log():
+    """Time per turn of GUI.handle, the window's event sink, at the start and the end of a 100,000 turn session."""
+    import tkinter as tk
+    batches = record_batches(1000)  # Real turns, maps from torches included, played over and over
+    try:
+        import ttkbootstrap as ttk
+        from gui import GUI
+        window = ttk.Window(themename='darkly')
+    except (ImportError, tk.TclError) as error:
+        raise SkipBenchmark(error)
+    window.withdraw()
+    gui = GUI(window)
+    turn_times = []
+    for turn in range(100000):
+        start = time.perf_counter()
+        gui.handle(batches[turn % len(batches)])
+        window.update()  # Runs the idle callback that flushes the turn's messages
+        turn_times.append(time.perf_counter() - start)
+    window.destroy()
+    return {
+        "first_1000_turns": {"turn_us": sum(turn_times[:1000]) / 1000 * 1e6},
+        "last_1000_turns": {"turn_us": sum(turn_times[-1000:]) / 1000 * 1e6},
+    }
+
+def measure_event_loop_lag(start_turn, turn_finished, interval=10):
+    """
+    Run a Tcl event loop with a heartbeat every few milliseconds while a turn is played,
+    and report how late the heartbeats were. No window is needed for this.
+
+    Args:
+        start_turn (function): Called from inside the event loop to start the slow turn.
+        turn_finished (function): Returns True once the turn's output has been shown.
+        interval (int): Milliseconds between heartbeats.
+
+    Returns:
+        dict: The worst and average heartbeat lag in milliseconds.
+    """
+    import tkinter as tk
+    interpreter = tk.Tcl()
+    lags = []
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        lags.append(max(0, (now - last[0]) * 1e3 - interval))
+        last[0] = now
+        interpreter.after(interval, heartbeat)
+
+    interpreter.after(interval, heartbeat)
+    interpreter.after(50, start_turn)
+    start = time.perf_counter()
+    while not (turn_finished() and time.perf_counter() - start > 0.1):
+        interpreter.update()
+        time.sleep(0.001)
+    return {"max_lag_ms": max(lags), "mean_lag_ms": sum(lags) / len(lags), "turn_ms": (time.perf_counter() - start) * 1e3}
+
+def torch_went_out(gui):
+    """Check if the last turn was a torch that has been fully shown."""
+    return any(message.startswith("The light has gone out") for message in gui.messages[-3:])
+
+def bench_worker():
+    """Event loop lag while a deliberately slow turn (a torch showing a 1500x1500 map) is played."""
+    results = {}
+    random.seed(0)
+    gui = HeadlessGUI()
+    game = Game(gui, 1500, 1500)
+    game.settings.VIEWPORT_WIDTH = game.settings.VIEWPORT_HEIGHT = 1500  # Make the torch draw the whole map
+    results["inline"] = measure_event_loop_lag(
+        lambda: game.run("light torch"),
+        lambda: torch_went_out(gui),
+    )
+
+    random.seed(0)
+    gui = HeadlessGUI()
+    worker = TurnWorker({"width": 1500, "height": 1500})
+    worker.start()
+    while worker.game is None:  # The game is created on the worker thread
+        time.sleep(0.01)
+    worker.game.settings.VIEWPORT_WIDTH = worker.game.settings.VIEWPORT_HEIGHT = 1500
+
+    def finished():
+        worker.drain(gui)  # What GUI.poll_worker does on the main thread
+        return torch_went_out(gui)
+
+    results["threaded"] = measure_event_loop_lag(lambda: worker.submit("light torch"), finished)
+    worker.stop()
+    if results["threaded"]["max_lag_ms"] > WORKER_LAG_BUDGET_MS:
+        raise BenchmarkFailed(
+            f"the event loop was {results['threaded']['max_lag_ms']:.0f} ms late with the turn on the worker thread, "
+            f"more than the {WORKER_LAG_BUDGET_MS} ms budget"
+        )
+    return results
+
+def bench_pathfinding():
+    """Distance fields and A* on a 1000x1000 map where a fifth of the cells are walls."""
+    rng = random.Random(0)
+    size = 1000
+    grid = GridState(size, size)
+    for index in range(size * size):
+        if rng.random() < 0.2:
+            grid.cells[index] = WALL
+    player = (size // 2, size // 2)
+    grid.clear(player, WALL)
+    field = DistanceField(grid)
+    monsters = [(rng.randrange(size), rng.randrange(size)) for _ in range(1000)]
+    nearby = [(player[0] + rng.randint(-2, 2), player[1] + rng.randint(-2, 2)) for _ in range(1000)]
+
+    def fresh_field(_):
+        field.update((player[0], player[1] + 1))
+        field.update(player)  # The player moved, so the field starts over
+
+    results = {}
+    start = time.perf_counter()
+    field.update(player)
+    field.expand()  # Fill in the whole field
+    results["full_field"] = {"build_ms": (time.perf_counter() - start) * 1e3, "cells": len(field.frontier)}
+    results["cached_field"] = {
+        "step_towards_us": time_calls(field.step_towards, monsters) * 1e6,
+        "step_away_us": time_calls(field.step_away, monsters) * 1e6,
+    }
+    results["after_player_moves"] = {
+        "near_check_us": time_calls(lambda position: (fresh_field(None), field.distance(position, limit=2)), nearby, repeat=1) * 1e6,
+        "step_away_us": time_calls(lambda position: (fresh_field(None), field.step_away(position)), monsters, repeat=1) * 1e6,
+    }
+    results["astar"] = {
+        "path_ms": time_calls(lambda goal: find_path(grid, player, goal), monsters[:10], repeat=1) * 1e3,
+    }
+    return results
+
+def bench_swarm():
+    """Moving many monsters per turn: the vectorized swarm against a loop over Monster objects."""
+    try:
+        from swarm import MonsterSwarm
+    except ImportError as error:
+        raise SkipBenchmark(error)
+    results = {}
+    for count in [10, 100, 1000, 10000]:
+        rng = random.Random(0)
+        size = 1000
+        grid = GridState(size, size)
+        positions = [(rng.randrange(size), rng.randrange(size)) for _ in range(count)]
+        player = (size // 2, size // 2)
+        try:
+            swarm = MonsterSwarm(positions, DistanceField(grid))
+        except ImportError as error:
+            raise SkipBenchmark(error)
+        field = DistanceField(grid)
+        monsters = [Monster(position, field) for position in positions]
+
+        def move_objects(_):
+            for monster in monsters:
+                monster.move(player)
+                monster.check_if_caught(player)
+
+        results[f"{count}_monsters"] = {
+            "swarm_ms": time_calls(lambda _: (swarm.move(player), swarm.check_if_caught(player)), range(20)) * 1e3,
+            "objects_ms": time_calls(move_objects, range(5 if count >= 10000 else 20)) * 1e3,
+        }
+    return results
+
+class Unslotted:
+    """An object with a __dict__, the way every part of a game was kept before the parts got __slots__."""
+
+PACKED_POSITIONS = {"_player", "_key", "_exit", "_monster", "_position"}
+
+def unslotted_copy(value, copies):
+    """
+    Copy part of a game the way it was stored before sessions were shrunk: objects with a __dict__,
+    positions as tuples, the inventory as a dict of names and the distance field's frontier in a deque.
+    Objects that several parts share (the grid, the random generator) are copied once. Anything that
+    isn't part of one game, like the loot tables, is shared and not counted.
+    """
+    if id(value) in copies:
+        return copies[id(value)]
+    if isinstance(value, random.Random):
+        copy = random.Random()
+        copy.setstate(value.getstate())
+    elif isinstance(value, (list, tuple)):
+        copy = type(value)(unslotted_copy(item, copies) for item in value)
+    elif isinstance(value, dict):
+        copy = {unslotted_copy(key, copies): unslotted_copy(item, copies) for key, item in value.items()}
+    elif isinstance(value, bytearray):
+        copy = bytearray(value)
+    elif isinstance(value, (Game, GridState, HeadlessGUI, Inventory, Monster, DistanceField, SpatialIndex, Settings)):
+        copy = Unslotted()
+        copies[id(value)] = copy
+        for name in type(value).__slots__:
+            if not hasattr(value, name):
+                continue
+            field = getattr(value, name)
+            if name in PACKED_POSITIONS:
+                setattr(copy, name.lstrip("_"), unpack_position(field))
+            elif isinstance(value, Inventory) and name == "counts":
+                copy.items = dict(value.items)
+            elif isinstance(value, Inventory) and name == "owned":
+                pass  # The dict's keys are the items the player ever had
+            elif isinstance(value, DistanceField) and name == "frontier":
+                copy.frontier = collections.deque(field[value.head:])
+            elif isinstance(value, DistanceField) and name == "head":
+                pass  # The deque drops cells once they are expanded
+            elif isinstance(value, Game) and name == "renderer" and field is None:
+                copy.renderer = Unslotted()  # The renderer was made with the game, before anything was drawn
+                copy.renderer.__dict__.update(grid=unslotted_copy(value.grid, copies), rows={}, row_text={}, overlays={}, dirty=set())
+            else:
+                setattr(copy, name, unslotted_copy(field, copies))
+        return copy
+    else:
+        return value  # Numbers, strings and things shared between games
+    copies[id(value)] = copy
+    return copy
+
+def bench_session_memory():
+    """
+    Bytes of memory per live game, measured with tracemalloc over a few thousand sessions, against
+    the same games copied into the unslotted dict, tuple and deque layout they had before.
+    """
+    import gc
+    random.seed(0)
+    commands = ["go north", "go south", "go east", "go west", "dig", "sweep"]
+    results = {}
+    for size in [None, 64]:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        games = []
+        for _ in range(2000):
+            game = Game(HeadlessGUI(keep_messages=False), size, size)
+            for _ in range(5):
+                game.run(random.choice(commands))
+            games.append(game)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        references = [unslotted_copy(game, {}) for game in games]
+        gc.collect()
+        reference = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results["random_map" if size is None else f"{size}x{size}"] = {
+            "bytes_per_session": (after - before) / len(games),
+            "unslotted_bytes_per_session": (reference - after) / len(games),
+        }
+        del games, references
+    return results
+
+def bench_replay():
+    """Turns per second when replaying a corpus of recorded games, with and without checking state hashes."""
+    results = {}
+    for size in [None, 64]:
+        logs = []
+        for seed in range(200):
+            log = GameLog()
+            play_game(seed, RandomPolicy(), map_size=(size, size), log=log)
+            logs.append(log)
+        turns = sum(len(log.turns) for log in logs)
+        case = "random_map" if size is None else f"{size}x{size}"
+        for verify in [False, True]:
+            start = time.perf_counter()
+            for log in logs:
+                replay(log, verify)
+            elapsed = time.perf_counter() - start
+            results[f"{case}_{'verified' if verify else 'unverified'}"] = {"turns": turns, "turns_per_second": turns / elapsed}
+    return results
+
+def json_dumps(game):
+    """The naive way to save a game: every field, the random state and every cell in one JSON document."""
+    return json.dumps({
+        "width": game.grid.width, "height": game.grid.height, "seed": game.seed,
+        "player": game.player_position, "key": game.key_position, "exit": game.exit_position,
+        "monsters": game.monster.positions(), "repellent": game.monster.repellent_turns_left,
+        "inventory": game.inventory.items, "rng": game.rng.getstate(),
+        "cells": list(game.grid.cells),
+    }).encode()
+
+def bench_snapshot():
+    """Snapshot size and save/resume time against a JSON dump, for fresh and heavily dug maps."""
+    results = {}
+    for size, dug in [(8, 0), (1000, 0), (1000, 0.3), (3000, 0), (10000, 0)]:
+        game = Game(HeadlessGUI(keep_messages=False), size, size, seed=0)
+        rng = random.Random(0)
+        for _ in range(int(size * size * dug)):
+            game.grid.mark_searched((rng.randrange(size), rng.randrange(size)))
+        for _ in range(20):
+            game.run(rng.choice(["go north", "go south", "go east", "go west", "dig"]))
+
+        repeat = 5 if size <= 1000 else 1
+        case = f"{size}x{size}" + (f"_{dug:.0%}_dug" if dug else "")
+        data = dumps(game)
+        metrics = {
+            "bytes": len(data),
+            "save_ms": time_calls(lambda _: dumps(game), [None], repeat) * 1e3,
+            "load_ms": time_calls(lambda _: Game(HeadlessGUI(keep_messages=False), snapshot=data), [None], repeat) * 1e3,
+        }
+        if size <= 3000:  # A JSON list of 100 million cells takes minutes and gigabytes
+            text = json_dumps(game)
+            metrics["json_bytes"] = len(text)
+            metrics["json_save_ms"] = time_calls(lambda _: json_dumps(game), [None], repeat) * 1e3
+            metrics["json_load_ms"] = time_calls(json.loads, [text], repeat) * 1e3
+        results[case] = metrics
+    return results
+
+def time_each(function, inputs):
+    """
+    Time every call separately.
+
+    Returns:
+        list: Seconds taken by each call, sorted.
+    """
+    times = []
+    for value in inputs:
+        start = time.perf_counter()
+        function(value)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+def bench_turn():
+    """Game.run latency per kind of command, including the monster's move after it."""
+    commands = {
+        "move": ["go north", "go south", "go east", "go west"],
+        "dig": ["dig"],
+        "sweep": ["sweep"],
+        "torch": ["light torch"],
+        "inventory": ["check inventory"],
+        "typo": ["go nroth", "chekc inventory"],
+        "unknown": ["dance"],
+    }
+    results = {}
+    for size in [8, 64]:
+        game = Game(HeadlessGUI(keep_messages=False), size, size, seed=0)
+        rng = random.Random(0)
+
+        def turn(player_input):
+            game.run(player_input)
+            game.outcome = None  # Keep playing the same game when the monster wins
+            game.awaiting_play_again = False
+            game.inventory.add_item("torch")  # Never run out of torches
+
+        for kind, inputs in commands.items():
+            times = time_each(turn, [rng.choice(inputs) for _ in range(2000)])
+            results[f"{kind}_{size}x{size}"] = {
+                "mean_us": sum(times) / len(times) * 1e6,
+                "p99_us": times[int(0.99 * len(times))] * 1e6,
+            }
+    return results
+
+def bench_monster():
+    """Monster.move in each of its modes on a 64x64 map: wandering, chasing and fleeing."""
+    size = 64
+    grid = GridState(size, size)
+    field = DistanceField(grid)
+    player = (size // 2, size // 2)
+    monster = Monster(player, field, random.Random(0))
+    modes = {
+        "random": ((player[0] - 10, player[1]), 0),  # Too far away to notice the player
+        "chase": ((player[0] - 2, player[1]), 0),
+        "avoid": ((player[0] - 1, player[1]), 3),
+    }
+    results = {}
+    for mode, (start, repellent) in modes.items():
+        def move(_):
+            monster.position = start
+            monster.repellent_turns_left = repellent
+            monster.move(player)
+        results[mode] = {"move_us": time_calls(move, range(10000)) * 1e6}
+    return results
+
+def bench_loot():
+    """Inventory.find_random_item, and alias-table draws against a cumulative-weight search as tables grow."""
+    rng = random.Random(0)
+    inventory = Inventory(rng)
+    results = {"find_random_item": {"call_ns": time_calls(lambda _: inventory.find_random_item(), range(100000)) * 1e9}}
+    for size in [6, 100, 10000]:
+        weights = [rng.randint(1, 100) for _ in range(size)]
+        table = AliasTable(list(zip(range(size), weights)))
+        cumulative = list(itertools.accumulate(weights))
+        metrics = {
+            "alias_ns": time_calls(lambda _: table.sample(rng), range(100000)) * 1e9,
+            "bisect_ns": time_calls(lambda _: bisect.bisect_right(cumulative, rng.random() * cumulative[-1]), range(100000)) * 1e9,
+            "linear_ns": time_calls(lambda _: rng.choices(range(size), weights), range(1000 if size >= 10000 else 100000)) * 1e9,
+        }
+        try:
+            import numpy as np
+            np_rng = np.random.default_rng(0)
+            metrics["batch_draws_per_second"] = 1 / time_calls(lambda _: table.sample_many(1_000_000, np_rng), [None]) * 1_000_000
+        except ImportError:
+            pass
+        results[f"{size}_entries"] = metrics
+    return results
+
+def bench_throughput():
+    """Whole seeded games played by the random policy, in one process and on every core."""
+    results = {}
+    policy = RandomPolicy()
+    for name, processes, games in [("one_process", 1, 2000), ("all_cores", os.cpu_count(), 20000)]:
+        start = time.perf_counter()
+        result = run_batch(games, policy, processes=processes, chunk_size=500)
+        elapsed = time.perf_counter() - start
+        turns = sum(result["average_turns"][outcome] * count for outcome, count in result["outcomes"].items())
+        results[name] = {"processes": processes, "games_per_second": games / elapsed, "turns_per_second": turns / elapsed}
+    return results
+
+def recompiled(method, strip_stats=False):
+    """
+    Compile a fresh copy of a Game method, optionally with every statement that touches stats taken
+    out, as if instrumentation had never been added to the game. A recompiled copy can run a few
+    percent faster or slower than the original, so every build a benchmark compares is made this way.
+    """
+    def uses_stats(node):
+        return any(isinstance(child, ast.Name) and child.id == "stats" or isinstance(child, ast.Attribute) and child.attr == "stats" for child in ast.walk(node))
+
+    class StripStats(ast.NodeTransformer):
+        def visit_If(self, node):
+            return None if uses_stats(node.test) and not node.orelse else self.generic_visit(node)
+
+        def visit_Assign(self, node):
+            return None if uses_stats(node.value) else node
+
+    lines, first_line = inspect.getsourcelines(method)
+    tree = ast.parse(textwrap.dedent("".join(lines)))
+    ast.increment_lineno(tree, first_line - 1)  # Tracebacks point into the real file
+    if strip_stats:
+        tree = ast.fix_missing_locations(StripStats().visit(tree))
+    namespace = {}
+    exec(compile(tree, inspect.getsourcefile(method), "exec"), vars(sys.modules[method.__module__]), namespace)
+    return namespace[method.__name__]
+
+def bench_instrumentation():
+    """
+    Turn latency of the same seeded game with instrumentation on, off, and taken out of the game
+    altogether, which is what "off" costs compared with never having had it. A second copy of the
+    build without it shows how much two identical builds differ on this machine.
+    """
+    commands = ["go north", "go south", "go east", "go west", "dig", "sweep", "check inventory", "light torch"]
+    rng = random.Random(0)
+    inputs = [rng.choice(commands) for _ in range(1000)]
+
+    class UninstrumentedGame(Game):
+        __slots__ = ()
+        run = recompiled(Game.run, strip_stats=True)
+        play_turn = recompiled(Game.play_turn, strip_stats=True)
+
+    class InstrumentedGame(Game):
+        __slots__ = ()
+        run = recompiled(Game.run)
+        play_turn = recompiled(Game.play_turn)
+
+    builds = {
+        "none": (UninstrumentedGame, None),
+        "none_again": (UninstrumentedGame, None),
+        "off": (InstrumentedGame, None),
+        "on": (InstrumentedGame, Instrumentation),
+    }
+    times = {name: [] for name in builds}
+    for _ in range(15):
+        # New games every round, made in a shuffled order, so no build keeps a lucky or unlucky place in memory
+        order = rng.sample(list(builds), len(builds))
+        games = [(name, builds[name][0](HeadlessGUI(keep_messages=False), 64, 64, seed=0, stats=builds[name][1] and builds[name][1]())) for name in order]
+        for player_input in inputs:
+            # Every build plays the same turn from the same state, in a shuffled order, so a slow
+            # moment of the machine or a cache another build left cold doesn't land on one of them only
+            rng.shuffle(games)
+            for name, game in games:
+                start = time.perf_counter()
+                game.run(player_input)
+                times[name].append(time.perf_counter() - start)
+                game.outcome = None
+                game.awaiting_play_again = False
+
+    def overhead(name):
+        """The median of how much slower each turn was than the same turn without instrumentation."""
+        return (statistics.median(slow / fast for slow, fast in zip(times[name], times["none"])) - 1) * 100
+
+    return {
+        "64x64": {
+            "none_us": statistics.median(times["none"]) * 1e6,
+            "off_us": statistics.median(times["off"]) * 1e6,
+            "on_us": statistics.median(times["on"]) * 1e6,
+            "noise_percent": overhead("none_again"),
+            "off_overhead_percent": overhead("off"),
+            "on_overhead_percent": overhead("on"),
+        }
+    }
+
+def import_time(code):
+    """
+    Run Python code in a new interpreter with -X importtime.
+
+    Returns:
+        tuple: (milliseconds spent importing, names of every module imported)
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    total = 0
+    modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # Only top-level imports, the nested ones are part of their cumulative time
+            total += int(cumulative)
+    return total / 1e3, modules
+
+def bench_startup():
+    """Import time of both entry points with -X importtime, and the terminal game's whole run to its first prompt."""
+    results = {}
+    # main.py itself only imports argparse and cli, so the window's imports are measured through gui
+    for name, code in [("cli", "import cli, game"), ("gui", "import main, game, gui")]:
+        try:
+            import_ms, modules = min(import_time(code) for _ in range(5))
+        except subprocess.CalledProcessError as error:
+            print(f"{name} skipped: {error.stderr.strip().splitlines()[-1]}")  # e.g. ttkbootstrap isn't installed
+            continue
+        results[name] = {"import_ms": import_ms, "imports_tkinter": int("tkinter" in modules)}
+
+    def run_cli(_):
+        subprocess.run([sys.executable, "cli.py", "--seed", "0"], input="quit\n", cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    # The terminal game still runs when its import couldn't be timed
+    results.setdefault("cli", {})["process_ms"] = time_calls(run_cli, [None]) * 1e3
+    return results
+
+def bench_spatial():
+    """The buried-item index with 100,000 things buried on a 10,000x10,000 map, against scanning a list."""
+    rng = random.Random(0)
+    size = 10000
+    items = [((rng.randrange(size), rng.randrange(size)), rng.choice(["key", "ruby", "emerald", "diamond"])) for _ in range(100000)]
+    probes = [(rng.randrange(size), rng.randrange(size)) for _ in range(1000)]
+    results = {}
+    for bucket_size in [16, 64]:
+        index = SpatialIndex(bucket_size)
+        start = time.perf_counter()
+        for position, kind in items:
+            index.insert(position, kind)
+        insert = (time.perf_counter() - start) / len(items)
+        results[f"buckets_of_{bucket_size}"] = {
+            "insert_ns": insert * 1e9,
+            "detector_us": time_calls(lambda position: index.nearest(position, 2), probes) * 1e6,
+            "nearest_us": time_calls(index.nearest, probes) * 1e6,
+            "within_100_us": time_calls(lambda position: index.within(position, 100), probes) * 1e6,
+            "remove_insert_ns": time_calls(lambda item: (index.remove(item[0]), index.insert(*item)), items[:10000]) * 1e9,
+        }
+
+    def scan(position):
+        x, y = position
+        return min(items, key=lambda item: abs(item[0][0] - x) + abs(item[0][1] - y))
+    results["list_scan"] = {"nearest_us": time_calls(scan, probes[:20], repeat=1) * 1e6}
+    return results
+
+def bench_cave():
+    """Carving caves: making chunks, starting a game on a huge cave, and touching chunks as things move."""
+    generator = CaveGenerator(0, 8192, 8192)
+    chunks = [(cx, 7) for cx in range(20)]
+    results = {"generate": {"chunk_ms": time_calls(generator.generate, chunks, repeat=1) * 1e3}}
+
+    start = time.perf_counter()
+    game = Game(HeadlessGUI(keep_messages=False), 8192, 8192, seed=0, cave=True)
+    results["start"] = {"game_8192x8192_ms": (time.perf_counter() - start) * 1e3, "chunks_carved": len(game.cave.generated)}
+
+    # Already carved chunks are the common case on every turn
+    cave = game.cave
+    positions = [[(x, 100)] for x in range(0, 1000, 7)]
+    cave.touch(positions[0])
+    results["touch"] = {"carved_ns": time_calls(cave.touch, positions[:1] * 1000) * 1e9}
+    start = time.perf_counter()
+    for position in positions:
+        cave.touch(position)
+    results["touch"]["walk_1000_cells_ms"] = (time.perf_counter() - start) * 1e3
+    return results
+
+def bench_solver():
+    """The solver: building a board, solving one layout, and every layout of the smallest map."""
+    try:
+        from solver import Board, KnownKeySolver, solve_all
+    except ImportError as error:
+        raise SkipBenchmark(error)
+    start = time.perf_counter()
+    Board(6, 6)
+    results = {"board": {"6x6_ms": (time.perf_counter() - start) * 1e3}}
+
+    solver = KnownKeySolver()
+    solver.board(6, 6)
+    start = time.perf_counter()
+    solver.chance((6, 6, (0, 0), (5, 5), (5, 0), (0, 5)))
+    results["layout"] = {"6x6_ms": (time.perf_counter() - start) * 1e3}
+    start = time.perf_counter()
+    solver.best_action(6, 6, (5, 5), (5, 0), (1, 0), (0, 5), False, 0)
+    results["layout"]["cached_action_us"] = (time.perf_counter() - start) * 1e6
+
+    start = time.perf_counter()
+    _, _, layouts = solve_all(4, 4, processes=1)
+    results["all_layouts"] = {"4x4_ms": (time.perf_counter() - start) * 1e3, "layouts": layouts}
+    return results
+
+def bench_fov():
+    """Torchlight in fog of war: shadowcasting against radius and how much of the map is rock, and cached lookups."""
+    results = {}
+    for density in [0.0, 0.2, 0.45]:
+        rng = random.Random(0)
+        grid = GridState(101, 101)
+        for index in range(len(grid.cells)):
+            if rng.random() < density:
+                grid.cells[index] = WALL
+        center = (50, 50)
+        grid.cells[grid.index(center)] = 0
+        metrics = {}
+        for radius in [2, 5, 10, 20, 40]:
+            metrics[f"radius_{radius}_us"] = time_calls(lambda _: shadowcast(grid, center, radius), range(20)) * 1e6
+            metrics[f"radius_{radius}_lit_cells"] = len(shadowcast(grid, center, radius))
+        results[f"{round(density * 100)}%_rock"] = metrics
+
+    field = FieldOfView(GridState(101, 101))
+    field.visible((50, 50), Game.TORCH_RADIUS)
+    results["cache"] = {"hit_ns": time_calls(lambda _: field.visible((50, 50), Game.TORCH_RADIUS), range(100000)) * 1e9}
+    return results
+
+def bench_events():
+    """Handing a turn's batch of events to each kind of output, against writing every message with its own call."""
+    from cli import TerminalOutput
+    from events import EventLog
+    from server import SessionOutput
+
+    batches = record_batches(1000)
+
+    results = {}
+    with open(os.devnull, "w", encoding="utf-8", buffering=1) as devnull:  # Line buffered, like a terminal
+        def write_lines(events):
+            for event in events:
+                for line in event.lines():
+                    devnull.write(line + "\n")  # How the terminal wrote each message before events were batched
+
+        outputs = {
+            "headless": HeadlessGUI(keep_messages=False).handle,
+            "headless_messages": HeadlessGUI().handle,
+            "terminal": TerminalOutput(devnull).handle,
+            "terminal_per_line": write_lines,
+            "session": SessionOutput().handle,
+        }
+        for name, handle in outputs.items():
+            results[name] = {"turn_ns": time_calls(handle, batches) * 1e9}
+        log = EventLog(os.devnull)
+        results["event_log"] = {"turn_ns": time_calls(log.handle, batches) * 1e9}
+        log.close()
+    results["batch"] = {"events_per_turn": sum(map(len, batches)) / len(batches)}
+    return results
+
+def bench_analytics():
+    """Streaming game records to disk, and summarizing them again, with a few million records."""
+    import shutil
+    import tempfile
+    try:
+        from analytics import GameTally, OutcomeWriter, summarize
+    except ImportError as error:
+        raise SkipBenchmark(error)
+    game = Game(HeadlessGUI(keep_messages=False), 8, 8, seed=0)
+    tally = GameTally()
+    tally.loot.update({"torch": 2, None: 1})
+    directory = tempfile.mkdtemp()
+    try:
+        writer = OutcomeWriter(directory, "bench")
+        records = 2_000_000
+        start = time.perf_counter()
+        for seed in range(records):
+            writer.append(seed, "caught", seed % 500, game.settings, tally)
+        writer.close()
+        results = {"write": {"records_per_second": records / (time.perf_counter() - start)}}
+        start = time.perf_counter()
+        summarize(directory)
+        results["summarize"] = {"records_per_second": records / (time.perf_counter() - start)}
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+BENCHMARKS = {
+    "turn": bench_turn,
+    "monster": bench_monster,
+    "loot": bench_loot,
+    "throughput": bench_throughput,
+    "parser": bench_parser,
+    "fuzzy": bench_fuzzy,
+    "grid": bench_grid,
+    "render": bench_render,
+    "message_log": bench_message_log,
+    "worker": bench_worker,
+    "pathfinding": bench_pathfinding,
+    "swarm": bench_swarm,
+    "session_memory": bench_session_memory,
+    "replay": bench_replay,
+    "snapshot": bench_snapshot,
+    "instrumentation": bench_instrumentation,
+    "startup": bench_startup,
+    "spatial": bench_spatial,
+    "cave": bench_cave,
+    "solver": bench_solver,
+    "fov": bench_fov,
+    "events": bench_events,
+    "analytics": bench_analytics,
+}
+
+# Metrics whose names end like this are compared against a baseline. Everything else (counts, sizes
+# of the test data) only describes the run.
+LOWER_IS_BETTER = ("_ns", "_us", "_ms", "bytes", "bytes_per_session")
+HIGHER_IS_BETTER = ("_per_second",)
+
+def compare(results, baseline, threshold):
+    """
+    Find the metrics that got worse than the baseline by more than the threshold.
+
+    Args:
+        results (dict): benchmark -> case -> metric -> value, from this run.
+        baseline (dict): The same, from an earlier run.
+        threshold (float): Allowed slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+        list: (benchmark, case, metric, baseline value, new value, change) for every regression.
+    """
+    regressions = []
+    for name, cases in results.items():
+        for case, metrics in cases.items():
+            for metric, value in metrics.items():
+                old = baseline.get(name, {}).get(case, {}).get(metric)
+                if not old:
+                    continue
+                if metric.endswith(LOWER_IS_BETTER):
+                    change = value / old - 1
+                elif metric.endswith(HIGHER_IS_BETTER):
+                    change = old / value - 1 if value else float("inf")
+                else:
+                    continue
+                if change > threshold:
+                    regressions.append((name, case, metric, old, value, change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all). One of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to this file as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against the JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Fail when a metric is this much worse than the baseline (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    skipped = {}
+    failed = {}
+    for name in args.names or BENCHMARKS:
+        print(f"== {name}")
+        try:
+            results[name] = BENCHMARKS[name]()
+        except SkipBenchmark as reason:
+            print(f"skipped: {reason}")
+            skipped[name] = str(reason)
+            continue
+        except BenchmarkFailed as reason:
+            print(f"FAILED: {reason}")
+            failed[name] = str(reason)
+            continue
+        for case, metrics in results[name].items():
+            print(f"{case}: " + ", ".join(f"{key}={value:,.2f}" for key, value in metrics.items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+                "skipped": skipped,
+                "failed": failed,
+            }, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        print(f"== compared with {args.baseline}")
+        for name, case, metric, old, new, change in regressions:
+            print(f"REGRESSION {name} {case} {metric}: {old:,.2f} -> {new:,.2f} ({change:+.0%})")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no metric is more than {args.threshold:.0%} worse")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# cave.py
+import random
+from grid import WALL
+
+CHUNK_SIZE = 32  # Width and height of a chunk in cells
+FILL = 0.45  # Share of cells that start out as rock before smoothing
+SMOOTHING_STEPS = 4  # Rounds of the cave-smoothing rule
+
+class CaveGenerator:
+    def __init__(self, seed, width, height, chunk_size=CHUNK_SIZE):
+        """
+        Make the rock of a cave one chunk at a time. The same seed always gives the same cave,
+        and a chunk doesn't depend on any other chunk, so they can be made in any order.
+
+        Every chunk has a corridor from its middle to a door on each of its edges. Neighbouring
+        chunks agree on where the door between them is, so every cell joined to the middle of
+        its chunk can be reached from every other such cell on the map.
+
+        Args:
+            seed (int): Seed of the whole cave.
+            width (int): Width of the map in cells.
+            height (int): Height of the map in cells.
+            chunk_size (int): Width and height of a chunk in cells.
+        """
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunks_x = -(-width // chunk_size)  # Chunks across, counting the partial one at the edge
+        self.chunks_y = -(-height // chunk_size)
+
+    def chunk_of(self, position):
+        return (position[0] // self.chunk_size, position[1] // self.chunk_size)
+
+    def extent(self, chunk):
+        """The (left, top, width, height) of the part of a chunk that lies on the map."""
+        cx, cy = chunk
+        left, top = cx * self.chunk_size, cy * self.chunk_size
+        return left, top, min(self.chunk_size, self.width - left), min(self.chunk_size, self.height - top)
+
+    def middle(self, chunk):
+        """The cell every corridor of a chunk starts from, in chunk coordinates."""
+        _, _, width, height = self.extent(chunk)
+        return width // 2, height // 2
+
+    def doors(self, chunk):
+        """Yield the cells, in chunk coordinates, where a corridor leaves the chunk."""
+        cx, cy = chunk
+        _, _, width, height = self.extent(chunk)
+        # A door between two chunks is rolled from the edge they share, so both sides pick the same cell
+        west = random.Random(f"{self.seed}:x:{cx}:{cy}").randrange(height) if cx > 0 else height // 2
+        east = random.Random(f"{self.seed}:x:{cx + 1}:{cy}").randrange(height) if cx + 1 < self.chunks_x else height // 2
+        north = random.Random(f"{self.seed}:y:{cx}:{cy}").randrange(width) if cy > 0 else width // 2
+        south = random.Random(f"{self.seed}:y:{cx}:{cy + 1}").randrange(width) if cy + 1 < self.chunks_y else width // 2
+        yield 0, west
+        yield width - 1, east
+        yield north, 0
+        yield south, height - 1
+
+    def generate(self, chunk):
+        """
+        Make the rock of one chunk.
+
+        Returns:
+            bytearray: chunk_size * chunk_size cells, row by row, WALL or 0. Cells off the map are WALL.
+        """
+        size = self.chunk_size
+        _, _, width, height = self.extent(chunk)
+        rng = random.Random(f"{self.seed}:{chunk[0]}:{chunk[1]}")
+        rock = [[x >= width or y >= height or rng.random() < FILL for x in range(size)] for y in range(size)]
+
+        # A cell becomes rock when most of the 3x3 block around it is rock, which turns noise into caverns
+        for _ in range(SMOOTHING_STEPS):
+            padded = [[True] * (size + 2)] + [[True] + row + [True] for row in rock] + [[True] * (size + 2)]
+            rock = [
+                [
+                    x >= width or y >= height or
+                    padded[y][x] + padded[y][x + 1] + padded[y][x + 2] + padded[y + 1][x] + padded[y + 1][x + 1] + padded[y + 1][x + 2] +
+                    padded[y + 2][x] + padded[y + 2][x + 1] + padded[y + 2][x + 2] >= 5
+                    for x in range(size)
+                ]
+                for y in range(size)
+            ]
+
+        mx, my = self.middle(chunk)
+        for door_x, door_y in self.doors(chunk):
+            # Down or up from the middle to the door's row, then along it to the door
+            for y in range(min(my, door_y), max(my, door_y) + 1):
+                rock[y][mx] = False
+            for x in range(min(mx, door_x), max(mx, door_x) + 1):
+                rock[door_y][x] = False
+
+        return bytearray(WALL if cell else 0 for row in rock for cell in row)
+
+    def reachable(self, chunk, template):
+        """
+        Find the open cells of a chunk that are joined to its middle.
+
+        Returns:
+            set: Their indexes into the template.
+        """
+        size = self.chunk_size
+        mx, my = self.middle(chunk)
+        start = my * size + mx
+        found = {start}
+        frontier = [start]
+        while frontier:
+            index = frontier.pop()
+            x = index % size
+            for neighbour, inside in ((index - 1, x > 0), (index + 1, x < size - 1), (index - size, True), (index + size, True)):
+                if inside and 0 <= neighbour < len(template) and neighbour not in found and not template[neighbour] & WALL:
+                    found.add(neighbour)
+                    frontier.append(neighbour)
+        return found
+
+class CaveMap:
+    __slots__ = ("grid", "generator", "generated", "pending")
+
+    def __init__(self, grid, generator):
+        """
+        Carve a cave into a grid lazily: a chunk's rock is only written once the player or a monster
+        comes near it, so a huge map is quick to start and only as much rock is made as gets explored.
+
+        The grid itself is still allocated for the whole map, one byte per cell, and stays the only
+        copy of the rock once a chunk is written. Chunks are a way to make the cave a piece at a time
+        from the seed, not a way to store it.
+
+        Args:
+            grid (GridState): The map to carve into.
+            generator (CaveGenerator): Makes the chunks.
+        """
+        self.grid = grid
+        self.generator = generator
+        self.generated = set()  # Chunks already written into the grid
+        self.pending = {}  # chunk -> rock made for placing things, until the chunk is written
+
+    def template(self, chunk):
+        """Return a chunk's rock, made from the seed unless it was made for placing things already."""
+        template = self.pending.get(chunk)
+        if template is None:
+            template = self.generator.generate(chunk)
+            if chunk not in self.generated:
+                self.pending[chunk] = template  # Written soon, when the player or a monster gets near
+        return template
+
+    def touch(self, positions):
+        """
+        Make sure the chunks at some positions, and the chunks around them, have been written into the grid.
+
+        Args:
+            positions (list): (x, y) positions of the player and the monsters.
+
+        Returns:
+            list: The chunks written by this call, usually none.
+        """
+        generator = self.generator
+        written = []
+        for cx, cy in {generator.chunk_of(position) for position in positions}:
+            for chunk in ((cx + dx, cy + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)):
+                if chunk not in self.generated and 0 <= chunk[0] < generator.chunks_x and 0 <= chunk[1] < generator.chunks_y:
+                    self.write(chunk)
+                    written.append(chunk)
+        return written
+
+    def write(self, chunk):
+        """Add a chunk's rock to the grid, keeping the flags already there."""
+        template = self.pending.pop(chunk, None) or self.generator.generate(chunk)
+        left, top, width, height = self.generator.extent(chunk)
+        size = self.generator.chunk_size
+        cells = self.grid.cells
+        for y in range(height):
+            start = (top + y) * self.grid.width + left
+            rock = template[y * size:y * size + width]
+            cells[start:start + width] = bytes(a | b for a, b in zip(cells[start:start + width], rock))
+        self.generated.add(chunk)
+        self.grid.version += 1  # Walls changed, so cached paths start over
+
+    def open_cell_near(self, position, taken=()):
+        """
+        Find the closest cell to a position in the same chunk that is open and can be reached from
+        everywhere else on the map, for placing the player, the key, the exit and the monsters.
+
+        Args:
+            position (tuple): Where the thing would have gone on a map without rock.
+            taken (set): Positions already used by something else.
+
+        Returns:
+            tuple: An (x, y) position, or None if every reachable cell of the chunk is taken.
+        """
+        chunk = self.generator.chunk_of(position)
+        left, top, _, _ = self.generator.extent(chunk)
+        size = self.generator.chunk_size
+        template = self.template(chunk)
+        best, best_distance = None, None
+        for index in sorted(self.generator.reachable(chunk, template)):
+            cell = (left + index % size, top + index // size)
+            distance = abs(cell[0] - position[0]) + abs(cell[1] - position[1])
+            if cell not in taken and (best is None or distance < best_distance):
+                best, best_distance = cell, distance
+        return best
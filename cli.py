@@ -0,0 +1,109 @@
+# cli.py
+import argparse
+import sys
+from events import Cleared, MapShown, Quit
+from renderer import map_legend
+
+class TerminalOutput:
+    """Shows the game on stdout. Nothing here imports tkinter, so it works over SSH and without a display."""
+    __slots__ = ("out", "echo", "quit_requested")
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.echo = None  # The game repeats each input, which the terminal has already shown
+        self.quit_requested = False
+
+    def handle(self, events):
+        """Write one turn's events with a single call."""
+        parts = []
+        for event in events:
+            kind = type(event)
+            if kind is MapShown:
+                parts.extend([event.map_text, "", *map_legend(event.cave)])
+            elif kind is Cleared:
+                parts.append("")
+            elif kind is Quit:
+                self.quit_requested = True
+            else:
+                for line in event.lines():
+                    if line == self.echo:
+                        self.echo = None
+                        continue
+                    parts.append(line)
+        if parts:
+            self.out.write("\n".join(parts) + "\n")
+
+def add_game_arguments(parser):
+    """The options shared by every way of starting a game."""
+    parser.add_argument("--seed", type=int, help="Play the game with this seed (default: random)")
+    parser.add_argument("--record", metavar="PATH", help="Record every input to a log that replay.py can play again")
+    parser.add_argument("--save", metavar="PATH", help="Where the save command writes the game (default: saving is off)")
+    parser.add_argument("--load", metavar="PATH", help="Resume a saved game")
+    parser.add_argument("--cave", action="store_true", help="Play in a cave with walls, carved as you explore")
+    parser.add_argument("--fog", action="store_true", help="Torches only light the cells around you, and the map only shows what you've seen")
+    parser.add_argument("--events", metavar="PATH", help="Write every event of the game to this JSON Lines file")
+    parser.add_argument("--stats", action="store_true", help="Time every turn and count what happens (see the stats command)")
+    parser.add_argument("--stats-export", metavar="PATH", help="With --stats, write the stats to this .json or .csv file")
+    parser.add_argument("--stats-every", type=int, default=100, help="Turns between stats exports")
+
+def game_options(parser, args):
+    """Turn the options added by add_game_arguments() into keyword arguments for Game, or exit with a usage error."""
+    if args.load and args.record:
+        parser.error("--record can't be used with --load: a resumed game can't be replayed from its seed")
+    options = {"seed": args.seed, "save_path": args.save, "cave": args.cave, "fog": args.fog}
+    if args.stats:
+        from instrumentation import Instrumentation
+        options["stats"] = Instrumentation(args.stats_export, args.stats_every)
+    if args.load:
+        from snapshot import load
+        options["snapshot"] = load(args.load)
+    if args.events:
+        from events import EventLog
+        options["event_log"] = EventLog(args.events)
+    if args.record:
+        from replay import GameLog
+        options["log"] = GameLog(args.record)
+    return options
+
+def play(game, output, lines, prompt=True):
+    """
+    Play input lines until the game asks to quit or the input ends.
+
+    Args:
+        game (Game): The game to play.
+        output (TerminalOutput): The game's output.
+        lines: An iterable of input lines, e.g. sys.stdin.
+        prompt (bool): Show a prompt before each line, for people typing.
+    """
+    out = output.out
+    if prompt:
+        out.write("> ")
+        out.flush()
+    for line in lines:
+        player_input = line.strip()
+        if prompt:
+            output.echo = f"> {player_input}"  # Already on screen after the prompt
+        game.run(player_input)
+        if output.quit_requested:
+            break
+        if prompt:
+            out.write("> ")
+        out.flush()
+    out.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI Adventure in the terminal")
+    parser.add_argument("--width", type=int, help="Map width (default: random)")
+    parser.add_argument("--height", type=int, help="Map height (default: random)")
+    parser.add_argument("--monsters", type=int, default=1)
+    parser.add_argument("--treasures", type=int, default=0, help="Gems to bury around the map")
+    add_game_arguments(parser)
+    args = parser.parse_args()
+
+    from game import Game
+    output = TerminalOutput()
+    game = Game(output, args.width, args.height, monsters=args.monsters, treasures=args.treasures, **game_options(parser, args))
+    play(game, output, sys.stdin, prompt=sys.stdin.isatty())
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-# TODO strip "?" from possible commands
+# Punctuation, case and extra spaces are ignored when matching, see parser.py
 
 commands_dict = {
     "up": [
@@ -21,7 +21,7 @@ commands_dict = {
     ],
     "inventory": [
         "check inventory", "show inventory", "view inventory", "view my inventory",
-        "what do i have", "what do i have?", "what's in my inventory", "what's in my inventory?"
+        "what do i have", "what do i have?", "what's in my inventory", "what's in my inventory?",
         "check my items", "check my items?", "check items", "check items?", "check my inventory"
     ],
     "torch": [
@@ -57,10 +57,30 @@ commands_dict = {
         "what are my options", "what are my options?", "what are my choices", "what are my choices?",
         "what can i type", "what can i type?", "what can i say", "what can i say?", "what can i input",
     ],
+    "save": [
+        "save", "save game", "save the game", "save my game", "save my progress"
+    ],
+    "stats": [
+        "stats", "show stats", "statistics", "show statistics"
+    ],
     "cheat": [
         "cheat"
     ],
     "quit": [
         "quit", "exit", "end", "stop"
     ],
-}
\ No newline at end of file
+}
+
+# Phrases with a <slot> take one argument, looked up in arguments_dict
+command_templates = {
+    "go": [
+        "go <direction>", "move <direction>", "walk <direction>", "head <direction>", "run <direction>"
+    ],
+}
+
+arguments_dict = {
+    "direction": {
+        "north": "up", "up": "up", "south": "down", "down": "down",
+        "east": "right", "right": "right", "west": "left", "left": "left",
+    },
+}
@@ -0,0 +1,226 @@
+# events.py
+import json
+
+class Event:
+    """
+    Something that happened during a turn. The game collects a turn's events and hands them to its
+    output in one batch, and each output decides what to do with them: a window or a terminal shows
+    their lines, a log writes their fields, and a headless run can ignore everything but quitting.
+    """
+    __slots__ = ()
+
+    def lines(self):
+        """The messages the event is shown as, in order. Worked out only when something shows them."""
+        return ()
+
+    def to_dict(self):
+        """The event's name and fields, for logging."""
+        return {"event": type(self).__name__, **{name: getattr(self, name) for name in self.__slots__}}
+
+class Message(Event):
+    """A line of text that isn't any other event, e.g. a hint or a line of the inventory."""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def lines(self):
+        return (self.text,)
+
+BLANK = Message(' ')  # Shown after every command
+
+class Input(Event):
+    """The player's input, repeated back to them."""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def lines(self):
+        return (f"> {self.text}",)
+
+MOVE_MESSAGES = {"up": "You move north.", "down": "You move south.", "left": "You move west.", "right": "You move east."}
+
+class Moved(Event):
+    """The player stepped to a new cell."""
+    __slots__ = ("direction", "position")
+
+    def __init__(self, direction, position):
+        self.direction = direction
+        self.position = position
+
+    def lines(self):
+        return (MOVE_MESSAGES[self.direction],)
+
+class Blocked(Event):
+    """The player tried to step off the map or into rock."""
+    __slots__ = ("direction",)
+
+    def __init__(self, direction):
+        self.direction = direction
+
+    def lines(self):
+        return ("The way is blocked.",)
+
+class Dug(Event):
+    """The player dug at a cell for the first time. What turned up follows as an ItemFound or a LootFound."""
+    __slots__ = ("position",)
+
+    def __init__(self, position):
+        self.position = position
+
+class ItemFound(Event):
+    """Digging turned up the key or a buried gem."""
+    __slots__ = ("item", "message")
+
+    def __init__(self, item, message=None):
+        self.item = item
+        self.message = message  # None for buried gems, which all say the same thing
+
+    def lines(self):
+        return (self.message or f"You dug up a buried {self.item}!",)
+
+class LootFound(Event):
+    """Digging where nothing was buried drew from the loot table. item is None when nothing turned up."""
+    __slots__ = ("item", "message")
+
+    def __init__(self, item, message):
+        self.item = item
+        self.message = message
+
+    def lines(self):
+        return (self.message,)
+
+class TorchLit(Event):
+    """A torch was used up. The map it showed follows as a MapShown."""
+    __slots__ = ("torches_left",)
+
+    def __init__(self, torches_left):
+        self.torches_left = torches_left
+
+    def lines(self):
+        return ("You light a torch and check your map.", ' ')
+
+class TorchOut(Event):
+    """The torch lit this turn has burned down."""
+    __slots__ = ("torches_left",)
+
+    def __init__(self, torches_left):
+        self.torches_left = torches_left
+
+    def lines(self):
+        if self.torches_left == 1: # Handle singular vs. plural in the message.
+            return (f'The light has gone out. You have {self.torches_left} torch left',)
+        return (f'The light has gone out. You have {self.torches_left} torches left',)
+
+class MapShown(Event):
+    """The map, drawn as text by MapRenderer. cave says whether it has rock, for renderer.map_legend()."""
+    __slots__ = ("map_text", "cave")
+
+    def __init__(self, map_text, cave=False):
+        self.map_text = map_text
+        self.cave = cave
+
+DETECTOR_MESSAGES = {
+    None: "The metal detector is silent.",
+    0: "The metal detector is going wild!!",
+    1: "The metal detector is beeping rapidly!",
+    2: "The metal detector is slowly beeping.",
+}
+
+class DetectorBeep(Event):
+    """The metal detector was swept. distance is how far the nearest buried thing is, or None if it is out of range."""
+    __slots__ = ("distance",)
+
+    def __init__(self, distance):
+        self.distance = distance
+
+    def lines(self):
+        return (DETECTOR_MESSAGES.get(self.distance, DETECTOR_MESSAGES[None]),)
+
+class RepellentUsed(Event):
+    """The player used a monster repellent."""
+    __slots__ = ()
+
+    def lines(self):
+        return ('You used a monster repellent.', ' ', 'You hear a disgruntled growl as the sound of heavy footfalls fade away.')
+
+class MonsterHowl(Event):
+    """A monster is close enough to smell the player and gives chase."""
+    __slots__ = ()
+
+    def lines(self):
+        return ("You hear a bloodcurdling howl as a foul stench fills the air.",)
+
+class MonsterYawn(Event):
+    """A wandering monster stayed where it was."""
+    __slots__ = ()
+
+    def lines(self):
+        return ("You hear a low yawn echoing in the distance.",)
+
+class Caught(Event):
+    """A monster caught the player, and the game is lost."""
+    __slots__ = ()
+
+    def lines(self):
+        return ("You were caught by the monster!",)
+
+class Escaped(Event):
+    """The player unlocked the exit, and the game is won."""
+    __slots__ = ()
+
+    def lines(self):
+        return ('You unlock the door and escape!',)
+
+class PlayAgain(Event):
+    """The game has ended and waits for a yes or no."""
+    __slots__ = ()
+
+    def lines(self):
+        return ("Do you want to play again? (Y/N)",)
+
+class Cleared(Event):
+    """A new game started, so what was shown of the old one can go."""
+    __slots__ = ()
+
+class Quit(Event):
+    """The player asked to stop playing."""
+    __slots__ = ()
+
+class EventLog:
+    __slots__ = ("file", "turn")
+
+    def __init__(self, path):
+        """
+        A sink that writes every event to a JSON Lines file, one object per event with the number of
+        the batch it came in. Batch 0 is what the game showed when it started.
+
+        Args:
+            path (str): The file to write. It is replaced if it exists.
+        """
+        self.file = open(path, "w", encoding="utf-8")
+        self.turn = 0
+
+    def handle(self, events):
+        turn = self.turn
+        self.file.write("".join(json.dumps({"turn": turn, **event.to_dict()}) + "\n" for event in events))
+        self.file.flush()
+        self.turn += 1
+
+    def close(self):
+        self.file.close()
+
+class Broadcast:
+    """A sink that hands every batch to several others, e.g. the terminal and an EventLog."""
+    __slots__ = ("sinks",)
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def handle(self, events):
+        for sink in self.sinks:
+            sink.handle(events)
+
+    def __getattr__(self, name):
+        return getattr(self.sinks[0], name)  # Anything else, e.g. HeadlessGUI.messages, comes from the first sink
@@ -0,0 +1,121 @@
+# fov.py
+from collections import OrderedDict
+from grid import EXPLORED, WALL
+
+CACHE_SIZE = 128  # Lit areas kept before the one used longest ago is forgotten
+
+# How each of the eight octants turns (column, row) steps away from the light into (dx, dy) on the map
+OCTANTS = [
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+]
+
+def shadowcast(grid, origin, radius):
+    """
+    Find the cells a light can reach with recursive shadowcasting.
+
+    Each of the eight octants around the light is scanned row by row outwards. A wall casts a shadow
+    that covers a range of slopes, and the rows further out only look at the slopes still lit, so
+    every cell within the radius is checked at most once, however many walls there are.
+
+    Args:
+        grid (GridState): The map. Walls block the light but are lit themselves.
+        origin (tuple): The (x, y) position of the light.
+        radius (int): How far the light reaches, in steps as the crow flies.
+
+    Returns:
+        set: The index into grid.cells of every lit cell.
+    """
+    ox, oy = origin
+    lit = {grid.index(origin)}
+    for xx, xy, yx, yy in OCTANTS:
+        cast_light(grid, ox, oy, 1, 1.0, 0.0, radius, xx, xy, yx, yy, lit)
+    return lit
+
+def cast_light(grid, ox, oy, row, start, end, radius, xx, xy, yx, yy, lit):
+    """Light one octant from a row outwards, between two slopes. Calls itself below every wall it passes."""
+    if start < end:
+        return
+    width, height, cells = grid.width, grid.height, grid.cells
+    radius_squared = radius * radius
+    new_start = start
+    for distance in range(row, radius + 1):
+        dy = -distance
+        blocked = False
+        for dx in range(-distance, 1):
+            # Slopes of the cell's two far corners, seen from the light
+            left_slope = (dx - 0.5) / (dy + 0.5)
+            right_slope = (dx + 0.5) / (dy - 0.5)
+            if start < right_slope:
+                continue
+            if end > left_slope:
+                break
+            x, y = ox + dx * xx + dy * xy, oy + dx * yx + dy * yy
+            inside = 0 <= x < width and 0 <= y < height
+            index = y * width + x
+            if inside and dx * dx + dy * dy <= radius_squared:
+                lit.add(index)
+            wall = not inside or cells[index] & WALL
+            if blocked:
+                if wall:
+                    new_start = right_slope  # Still in the shadow of the same wall
+                    continue
+                blocked = False
+                start = new_start
+            elif wall and distance < radius:
+                # The rows beyond this wall only get the light that passes on its near side
+                blocked = True
+                cast_light(grid, ox, oy, distance + 1, start, left_slope, radius, xx, xy, yx, yy, lit)
+                new_start = right_slope
+        if blocked:
+            break
+
+class FieldOfView:
+    __slots__ = ("grid", "cache", "cache_size")
+
+    def __init__(self, grid, cache_size=CACHE_SIZE):
+        """
+        Work out what a torch lights, remembering the most recent answers. An answer only holds
+        while the walls stay the same, so grid.version is part of what it is remembered by.
+
+        Args:
+            grid (GridState): The map.
+            cache_size (int): How many lit areas to keep.
+        """
+        self.grid = grid
+        self.cache = OrderedDict()  # (position, radius, grid version) -> frozenset of cell indexes, oldest first
+        self.cache_size = cache_size
+
+    def visible(self, position, radius):
+        """
+        The cells a torch at a position lights.
+
+        Returns:
+            frozenset: Their indexes into grid.cells.
+        """
+        key = (position, radius, self.grid.version)
+        cells = self.cache.get(key)
+        if cells is not None:
+            self.cache.move_to_end(key)
+            return cells
+        cells = self.cache[key] = frozenset(shadowcast(self.grid, position, radius))
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return cells
+
+    def light(self, position, radius):
+        """
+        Light a torch at a position and mark the cells it lights as explored.
+
+        Returns:
+            list: The (x, y) positions explored for the first time, for the renderer to draw again.
+        """
+        grid = self.grid
+        cells = grid.cells
+        width = grid.width
+        explored = []
+        for index in self.visible(position, radius):
+            if not cells[index] & EXPLORED:
+                cells[index] |= EXPLORED
+                explored.append((index % width, index // width))
+        return explored
@@ -0,0 +1,126 @@
+# fuzzy.py
+
+def edit_distance(a, b, max_distance=None):
+    """
+    Count the single-character edits (insert, delete, substitute or swap two neighbours)
+    needed to turn one string into the other.
+
+    Args:
+        a (str): The first string.
+        b (str): The second string.
+        max_distance (int): Stop early once the distance is known to be larger than this.
+
+    Returns:
+        int: The edit distance, or max_distance + 1 if it is larger than max_distance.
+    """
+    if max_distance is None:
+        max_distance = max(len(a), len(b))
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) < len(b):
+        a, b = b, a
+    # Only cells within max_distance of the diagonal can stay under the limit, so skip the rest
+    too_far = max_distance + 1
+    previous_previous = None
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        row_min = current[0]
+        for j in range(low, high + 1):
+            char_b = b[j - 1]
+            cost = previous[j - 1] + (char_a != char_b)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if previous_previous is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b and char_a != char_b:
+                cost = min(cost, previous_previous[j - 2] + 1)  # Two letters swapped
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return too_far
+        previous_previous, previous = previous, current
+    return min(previous[-1], too_far)
+
+def deletes(word, max_distance):
+    """Every string that can be made by removing up to max_distance characters from the word."""
+    found = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        next_frontier = []
+        for item in frontier:
+            for i in range(len(item)):
+                shorter = item[:i] + item[i + 1:]
+                if shorter not in found:
+                    found.add(shorter)
+                    next_frontier.append(shorter)
+        frontier = next_frontier
+    return found
+
+class SymSpellIndex:
+    """
+    Fuzzy lookup of phrases using a precomputed dictionary of deletions (the SymSpell method).
+
+    Instead of comparing the input with every phrase, each phrase is stored under all the strings
+    that can be made by deleting a few characters from its start. A lookup only has to generate
+    the same deletions of the input and check the handful of phrases filed under them, so its cost
+    hardly depends on how many phrases there are.
+    """
+    def __init__(self, max_distance=2, prefix_length=10):
+        """
+        Args:
+            max_distance (int): The largest edit distance the index can find.
+            prefix_length (int): Only this many leading characters are used to build the deletions,
+                which keeps the dictionary small for long phrases.
+        """
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.terms = []  # (phrase, value) in the order they were added
+        self.term_ids = {}  # phrase -> index into self.terms
+        self.deletions = {}  # deletion -> indexes into self.terms
+
+    def add(self, term, value):
+        """File a phrase and the value to return when it matches."""
+        if term in self.term_ids:
+            return
+        term_id = len(self.terms)
+        self.terms.append((term, value))
+        self.term_ids[term] = term_id
+        for deletion in deletes(term[:self.prefix_length], self.max_distance):
+            self.deletions.setdefault(deletion, []).append(term_id)
+
+    def lookup(self, text, max_distance=None):
+        """
+        Find the closest phrase to the text.
+
+        Args:
+            text (str): The text to match.
+            max_distance (int): Allow at most this many edits (default and upper limit: the index's max_distance).
+
+        Returns:
+            tuple: (phrase, value, distance) of the best match, or None if nothing is close enough.
+            Ties go to the phrase that was added first.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        candidates = set()
+        for deletion in deletes(text[:self.prefix_length], max_distance):
+            candidates.update(self.deletions.get(deletion, ()))
+
+        best = None
+        for term_id in sorted(candidates):
+            term, value = self.terms[term_id]
+            limit = max_distance if best is None else best[2] - 1
+            if limit < 0:
+                break
+            if abs(len(term) - len(text)) > limit:
+                continue
+            distance = edit_distance(text, term, limit)
+            if distance <= limit:
+                best = (term, value, distance)
+        return best
@@ -1,172 +1,303 @@
 # game.py
 import random
-import tkinter as tk
+from events import (
+    BLANK, Blocked, Broadcast, Caught, Cleared, DetectorBeep, Dug, Escaped, Input, ItemFound, LootFound, MapShown, Message, Moved,
+    PlayAgain, Quit, RepellentUsed, TorchLit, TorchOut,
+)
+from grid import GridState, EXIT, EXPLORED, KEY, WALL
 from monster import Monster
-from settings import settings
-from utils import calculate_distance
-from commands import commands_dict 
-from inventory import inventory
+from pathfinding import DistanceField
+from renderer import MapRenderer
+from settings import Settings
+from spatial import SpatialIndex
+from utils import pack_position, unpack_position
+from parser import command_parser, normalize
+from inventory import Inventory
+from loot import table_for_map
+
+# Gems that can be buried around the map besides the key
+TREASURES = ["ruby", "emerald", "diamond"]
 
 class Game:
-    def __init__(self, gui):
+    __slots__ = (
+        "gui", "map_size", "monster_count", "treasure_count", "seed", "rng", "log", "save_path", "stats", "awaiting_play_again", "outcome", "events",
+        "cave_mode", "fog_mode", "inventory", "settings", "grid", "cave", "fov", "buried", "renderer", "distance_field", "monster",
+        "_player", "_key", "_exit",  # Positions packed into ints, see the properties below
+    )
+
+    DETECTOR_RANGE = 2  # The metal detector hears buried things up to this many steps away
+    TORCH_RADIUS = 5  # In fog of war, a torch lights cells up to this many steps away
+
+    def __init__(self, gui, width=None, height=None, monsters=1, treasures=0, seed=None, log=None, snapshot=None, save_path=None, stats=None, cave=False, fog=False, event_log=None):
         # print(f"gui type: {type(gui)}")  # Check the type of gui
         # print(f"gui attributes: {dir(gui)}")  # List the attributes of gui
         
-        """Initialize the game by resetting to default settings."""
+        """
+        Initialize the game by resetting to default settings.
+
+        Args:
+            gui: Where each turn's events go, in one batch per turn: the GUI, a HeadlessGUI or any other
+                object with a handle(events) method, see events.py.
+            width (int): Play on maps this wide instead of a random width.
+            height (int): Play on maps this tall instead of a random height.
+            monsters (int): How many monsters hunt the player. More than one needs NumPy.
+            treasures (int): How many gems to bury around the map, for the metal detector to find.
+            seed (int): Seed for every random roll of this game. The same seed and inputs always play the same game.
+            log: Where to record every input, e.g. a replay.GameLog. None records nothing.
+            snapshot (bytes): Resume a game saved with snapshot.dumps() instead of starting a new one.
+            save_path (str): Where the "save" command writes the game to. None turns saving off.
+            stats (Instrumentation): Time every phase of every turn and count what happens. Off when None.
+            cave (bool): Fill the map with cave walls, carved a chunk at a time as the player and monsters get near.
+            fog (bool): Only show the parts of the map the player has lit with a torch, instead of all of it.
+            event_log: Also hand every batch of events to this, e.g. an events.EventLog.
+        """
+        self.stats = stats
+        if event_log is not None:
+            gui = Broadcast(gui, event_log)
+        if stats is not None:
+            from instrumentation import InstrumentedOutput
+            gui = InstrumentedOutput(gui, stats)  # Times and counts the output of the whole game, monsters included
         self.gui = gui
+        self.events = []  # What happened so far this turn, handed to the gui at the end of it
+        self.save_path = save_path
+        self.log = log
+        if snapshot is not None:
+            if log is not None:
+                raise ValueError("A resumed game can't be logged, because its log couldn't be replayed from the seed")
+            from snapshot import restore
+            restore(self, snapshot)  # Sets everything reset_game() would, and more
+            self.emit(Message("You find yourself back in the dark cave...\n"))
+            self.flush_events()
+            return
+
+        self.map_size = (width, height)
+        self.monster_count = monsters
+        self.treasure_count = treasures
+        self.cave_mode = cave
+        self.fog_mode = fog
+        # A game rolls all of its dice with its own generator, never the shared random module
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        if log is not None:
+            log.start(self)
         self.reset_game() # Reset the game to its initial state with default settings
         self.awaiting_play_again = False  # Track if waiting for a play-again response
+        self.outcome = None  # "escaped" or "caught" once the current game has ended
 
         # Display a welcome message
-        self.gui.display_message("You find yourself in a dark cave...\n")
+        self.emit(Message("You find yourself in a dark cave...\n"))
+        self.flush_events()
 
     def reset_game(self):
         """Reset the game to its initial state with default settings."""
-        inventory.reset() # Reset player inventory to its default state
-        settings.reset() # Reset the settings to their default values
-        self.searched_positions = settings.DEFAULT_SEARCHED_POSITIONS
-        self.player_position = settings.DEFAULT_PLAYER_POS
-        self.key_position = settings.DEFAULT_KEY_POS
-        self.exit_position = settings.DEFAULT_EXIT_POS
-        self.monster = Monster(settings.DEFAULT_MONSTER_POS, self.gui)
-
-    def draw_map(self, show_key=False):
+        # Every game has its own inventory and settings, so many games can run in one process
+        self.settings = Settings(*self.map_size, self.rng) # Start with the default settings
+        # Start with the default player inventory, finding what the loot table for this map size holds
+        self.inventory = Inventory(self.rng, table_for_map(self.settings.GRID_WIDTH, self.settings.GRID_HEIGHT))
+        self.grid = GridState(self.settings.GRID_WIDTH, self.settings.GRID_HEIGHT) # Tracks dug spots, the key and the exit
+        self.cave = None
+        if self.cave_mode:
+            from cave import CaveGenerator, CaveMap
+            self.cave = CaveMap(self.grid, CaveGenerator(self.rng.getrandbits(64), self.settings.GRID_WIDTH, self.settings.GRID_HEIGHT))
+        taken = set()
+        self.player_position = self.open_position(self.settings.DEFAULT_PLAYER_POS, taken)
+        self.key_position = self.open_position(self.settings.DEFAULT_KEY_POS, taken)
+        self.exit_position = self.open_position(self.settings.DEFAULT_EXIT_POS, taken)
+        self.grid.set(self.key_position, KEY)
+        self.grid.set(self.exit_position, EXIT)
+        self.renderer = None # Created the first time the map is drawn
+        self.fov = None
+        if self.fog_mode:
+            from fov import FieldOfView
+            self.fov = FieldOfView(self.grid) # What each torch lights, and so which cells have been explored
+        self.distance_field = DistanceField(self.grid) # Distances to the player, shared by every monster
+        if self.monster_count > 1:
+            from swarm import MonsterSwarm # Only needed (and only needs NumPy) for crowded caves
+            positions = [self.settings.DEFAULT_MONSTER_POS] + [self.settings.randomize_position() for _ in range(self.monster_count - 1)]
+            positions = [self.open_position(position, set(taken)) for position in positions]  # Monsters may share a cell
+            self.monster = MonsterSwarm(positions, self.distance_field, self.rng)
+        else:
+            self.monster = Monster(self.open_position(self.settings.DEFAULT_MONSTER_POS, set(taken)), self.distance_field, self.rng)
+        # Everything the metal detector can find, the key first so no gem is buried on top of it
+        self.buried = SpatialIndex()
+        self.buried.insert(self.key_position, "key")
+        for _ in range(self.treasure_count):
+            position = self.settings.randomize_position()
+            if self.cave is not None:
+                position = self.cave.open_cell_near(position, taken)
+            if position is not None and self.buried.get(position) is None:
+                self.buried.insert(position, self.rng.choice(TREASURES))
+                taken.add(position)
+        self.explore()
+        self.outcome = None
+
+    def open_position(self, position, taken):
+        """
+        In a cave, move a starting position to the closest open cell that can be reached from everywhere else.
+
+        Args:
+            position (tuple): The position rolled for an open map.
+            taken (set): Positions already in use. The position picked is added to it.
+
+        Returns:
+            tuple: The position to use.
+        """
+        if self.cave is not None:
+            position = self.cave.open_cell_near(position, taken) or position  # Only a crowded tiny map runs out of room
+        taken.add(position)
+        return position
+
+    def explore(self):
+        """Carve the cave walls around the player and the monsters wherever nobody has been yet."""
+        if self.cave is None:
+            return
+        size = self.cave.generator.chunk_size
+        for cx, cy in self.cave.touch([self.player_position, *self.monster.positions()]):
+            if self.renderer:
+                self.renderer.forget_rows(cy * size, (cy + 1) * size)  # Those rows have new walls to draw
+
+    @property
+    def player_position(self):
+        return unpack_position(self._player)
+
+    @player_position.setter
+    def player_position(self, position):
+        self._player = pack_position(position)
+
+    @property
+    def key_position(self):
+        """Where the key is buried, or None once it has been dug up."""
+        return unpack_position(self._key)
+
+    @key_position.setter
+    def key_position(self, position):
+        self._key = pack_position(position)
+
+    @property
+    def exit_position(self):
+        return unpack_position(self._exit)
+
+    @exit_position.setter
+    def exit_position(self, position):
+        self._exit = pack_position(position)
+
+    def draw_map(self, show_key=False, viewport=None):
         """
         Draw the game map with the player, monster, and optionally the key.
 
         Args:
             show_key (bool): Whether to display the key on the map.
+            viewport (tuple): (width, height) of the part of the map around the player to draw, or None for all of it.
         """
-        grid = [['⬚ ' for _ in range(settings.GRID_WIDTH)] for _ in range(settings.GRID_HEIGHT)]
-        
-        # Mark the spots the player has already dug on the map
-        for pos in self.searched_positions: 
-            x, y = pos
-            grid[y][x] = '⛝ '
-        
-        # Draw the player location on the map
-        player_x, player_y = self.player_position
-        grid[player_y][player_x] = '♙ '
-        
-        # Draw the monster location on the map
-        monster_x, monster_y = self.monster.position
-        grid[monster_y][monster_x] = '♞ '
-        
-        exit_x, exit_y = self.exit_position
-        grid[exit_y][exit_x] = '⬕ '
-        
+        overlays = {}
+        overlays[self.player_position] = '♙ ' # Draw the player location on the map
+        if self.fov is None:
+            for position in self.monster.positions():
+                overlays[position] = '♞ ' # Draw the monster location on the map
+            overlays[self.exit_position] = '⬕ '
+        else:
+            # In the fog the monster only shows up inside the torchlight, and the exit once it has been seen
+            lit = self.fov.visible(self.player_position, self.TORCH_RADIUS)
+            for position in self.monster.positions():
+                if self.grid.index(position) in lit:
+                    overlays[position] = '♞ '
+            if self.grid.has(self.exit_position, EXPLORED):
+                overlays[self.exit_position] = '⬕ '
+
         # Draw the key if cheat is used and key is still on the map
         if show_key and self.key_position:
-            key_x, key_y = self.key_position
-            grid[key_y][key_x] = '⚿ '
-        return '\n'.join(''.join(row) for row in grid) # draw the map row by row into a single string and return
+            overlays[self.key_position] = '⚿ '
+        # Only the cells that changed since the last time the map was drawn are redrawn
+        if self.renderer is None:
+            self.renderer = MapRenderer(self.grid, fog=self.fov is not None)
+        return self.renderer.render(overlays, self.player_position, viewport)
 
-    # Figure out how to implement this function with multiple returns and nested if statement
     def light_torch(self):
-        """Use a torch to reveal the map and display helpful information."""
-        if inventory.has_item("torch"): # Check if the player has any torches left
-            inventory.use_item("torch")  # Use one torch from inventory
-            self.gui.display_message("You light a torch and check your map.")
-            self.gui.display_message(' ')
-            self.gui.display_message(self.draw_map()) # putting this here for now because the return statement comes after
-            self.gui.display_message(' ')
-            self.gui.display_message('♙ - You are here.')
-            self.gui.display_message('⛝ - Spots where you\'ve already dug.')
-            self.gui.display_message('♞ - The MONSTER.')
-            self.gui.display_message('⬕ - The exit.')
-    
-            if inventory.items["torch"] == 1: # Handle singular vs. plural in the message.
-                return f'The light has gone out. You have {inventory.items["torch"]} torch left'
-            else:
-                return f'The light has gone out. You have {inventory.items["torch"]} torches left'
+        """Use a torch to reveal the map (or in fog of war, the cells around the player) and display helpful information."""
+        if self.inventory.has_item("torch"): # Check if the player has any torches left
+            self.inventory.use_item("torch")  # Use one torch from inventory
+            if self.fov is not None:
+                for position in self.fov.light(self.player_position, self.TORCH_RADIUS):
+                    if self.renderer:
+                        self.renderer.mark_dirty(position)
+            torches_left = self.inventory.count("torch")
+            self.emit(TorchLit(torches_left))
+            self.emit(MapShown(self.draw_map(viewport=(self.settings.VIEWPORT_WIDTH, self.settings.VIEWPORT_HEIGHT)), self.cave is not None))
+            self.emit(TorchOut(torches_left))
         else:
-            return "You don't have any torches left"
+            self.emit(Message("You don't have any torches left"))
 
     def use_metal_detector(self):
-        """Use the metal detector to get a hint about the key's location."""
-        if inventory.has_item("metal detector"): # Check if the player has a metal detector:
+        """Use the metal detector to get a hint about the nearest buried key or gem."""
+        if self.inventory.has_item("metal detector"): # Check if the player has a metal detector:
             
             # Right now this code will always be executed, consider making the metal detector have limited uses
             # or make it a key item that is found from digging
-            if self.key_position is None:
-                return "The metal detector is silent."
-            else:
-                distance = calculate_distance(self.player_position, self.key_position)
-                if distance == 0:
-                    return "The metal detector is going wild!!"
-                elif distance == 1:
-                    return "The metal detector is beeping rapidly!"
-                elif distance == 2:
-                    return "The metal detector is slowly beeping."
-                else:
-                    return "The metal detector is silent."
-
-    # Figure out how to handle multiple returns to display message
+            found = self.buried.nearest(self.player_position, self.DETECTOR_RANGE)
+            self.emit(DetectorBeep(found[2] if found is not None else None))
+
     def use_monster_repellent(self, monster):
-        if inventory.has_item("monster repellent"):
-            inventory.use_item("monster repellent")
+        if self.inventory.has_item("monster repellent"):
+            self.inventory.use_item("monster repellent")
             # Set the repellent effect on the monster
             monster.repellent_turns_left = 3
-            self.gui.display_message('You used a monster repellent.')
-            self.gui.display_message(' ')
-            return 'You hear a disgruntled growl as the sound of heavy footfalls fade away.'
+            self.emit(RepellentUsed())
         else:
-            return 'You don\'t have any monster repellent.'
+            self.emit(Message('You don\'t have any monster repellent.'))
 
     def dig(self):
         """Handle the player digging at their current position."""
-        if self.player_position in self.searched_positions: # Check if the player has already dug here
-            return "You have already dug here."
+        if self.grid.is_searched(self.player_position): # Check if the player has already dug here
+            self.emit(Message("You have already dug here."))
         else:
-            self.searched_positions.append(self.player_position) # Mark the spot as searched
-        
-            if self.player_position == self.key_position: # Check if the player has found the key
-                inventory.add_item("key", 1)  # Add the key to the inventory
+            self.grid.mark_searched(self.player_position) # Mark the spot as searched
+            if self.renderer:
+                self.renderer.mark_dirty(self.player_position)
+            self.emit(Dug(self.player_position))
+
+            found = self.buried.remove(self.player_position)
+            if found == "key": # Check if the player has found the key
+                self.inventory.add_item("key", 1)  # Add the key to the inventory
+                self.grid.clear(self.key_position, KEY)
                 self.key_position = None  # Remove the key from the map
-                return "You found the key!"
+                self.emit(ItemFound("key", "You found the key!"))
+            elif found is not None:
+                self.inventory.add_item(found, 1)
+                self.emit(ItemFound(found))
             else:
-                # We call inventory.find_random_item() and it returns the result here for us to display
-                return inventory.find_random_item()
+                # The loot table says what was found and how to tell the player
+                self.emit(LootFound(*self.inventory.find_random_item()))
 
-    # Handle play again after return? Can anything happen after the return statement?
     def unlock_door(self):
         """Handle the unlock action."""
         if self.player_position == self.exit_position:  # Check if the player is at the exit
-            if inventory.has_item("key"):  # Check if the player has the key
-                inventory.use_item("key")  # Remove the key from inventory
-                self.gui.display_message('You unlock the door and escape!')
-                return self.play_again()  # Ask the player if they want to play again.
+            if self.inventory.has_item("key"):  # Check if the player has the key
+                self.inventory.use_item("key")  # Remove the key from inventory
+                self.emit(Escaped())
+                self.outcome = "escaped"
+                self.play_again()  # Ask the player if they want to play again.
             else:
-                return "The door is locked. You need the key to open it."
+                self.emit(Message("The door is locked. You need the key to open it."))
         else:
-            return "There is nothing to unlock here."
+            self.emit(Message("There is nothing to unlock here."))
 
     def move_player(self, direction):
+        x, y = self.player_position
         match direction:
             case "up":
-                if self.player_position[1] > 0:
-                    self.player_position = (self.player_position[0], self.player_position[1] - 1)
-                    return "You move north."
-                else:
-                    return "The way is blocked."
+                new_position = (x, y - 1)
             case "down":
-                if self.player_position[1] < settings.GRID_HEIGHT - 1:
-                    self.player_position = (self.player_position[0], self.player_position[1] + 1)
-                    return "You move south."
-                else:
-                    return "The way is blocked."
+                new_position = (x, y + 1)
             case "left":
-                if self.player_position[0] > 0:
-                    self.player_position = (self.player_position[0] - 1, self.player_position[1])
-                    return "You move west."
-                else:
-                    return "The way is blocked."
+                new_position = (x - 1, y)
             case "right":
-                if self.player_position[0] < settings.GRID_WIDTH - 1:
-                    self.player_position = (self.player_position[0] + 1, self.player_position[1])
-                    return "You move east."
-                else:
-                    return "The way is blocked."
+                new_position = (x + 1, y)
+        # The edge of the map and the cave walls block the way
+        if not self.grid.in_bounds(new_position) or self.grid.has(new_position, WALL):
+            self.emit(Blocked(direction))
+            return
+        self.player_position = new_position
+        self.emit(Moved(direction, new_position))
 
     def show_hints(self):
         """Display helpful hints to the player."""
@@ -180,92 +311,140 @@ class Game:
             "You can use a key to unlock a door.",
             "You can move north, south, east, or west.",
         ]
-        return random.choice(hints)
+        return self.rng.choice(hints)
     
-    # TODO: FIX THIS FUNCTION        
-    # def cheat(self):
-    #     """Display inventory and the full map, including the key's location (cheat mode)."""
-    #     # return display_message(' ')
-    #     self.draw_map(show_key=True) # Show the key on the map
-    #     inventory_messages = inventory.show_inventory()  # Get inventory messages
-    #     for message in inventory_messages:
-    #         return message  # Display each message
-    #     return  ' '
+    def cheat(self):
+        """Display inventory and the map, including the key's location (cheat mode)."""
+        self.emit(MapShown(self.draw_map(show_key=True, viewport=(self.settings.VIEWPORT_WIDTH, self.settings.VIEWPORT_HEIGHT)), self.cave is not None))
+        for message in self.inventory.show_inventory():
+            self.emit(Message(message))
+
+    def save_game(self):
+        """Save the game to its save path, so it can be resumed later."""
+        if self.save_path is None:
+            return "You can't save this game."
+        from snapshot import save
+        save(self, self.save_path)
+        return "Game saved."
+
+    def show_stats(self):
+        """Return messages with the turn timings and counters, if the game is instrumented."""
+        if self.stats is None:
+            return ["Stats are turned off. Start the game with --stats to collect them."]
+        return self.stats.report()
 
     def play_again(self):
         """Ask the player if they want to play again."""
         self.awaiting_play_again = True  # Set the flag to indicate we're awaiting a response
-        return "Do you want to play again? (Y/N)"
+        self.emit(PlayAgain())
+
+    def emit(self, event):
+        """Add an event to this turn's batch."""
+        self.events.append(event)
+
+    def flush_events(self):
+        """Hand the turn's events to the gui in one call, so a window or a socket is updated once per turn."""
+        events = self.events
+        self.events = []
+        self.gui.handle(events)
 
     def run(self, player_input):
-        """Handle player input."""
+        """Handle player input, show what happened, and record it if the game is being logged."""
 
         if not player_input:
             return
 
-        self.gui.display_message(f"> {player_input}")
+        self.play_turn(player_input)
+        self.flush_events()
+        if self.log is not None:
+            self.log.record(player_input, self)
+        if self.stats is not None:
+            self.stats.end_turn()
+
+    def play_turn(self, player_input):
+        """Play one turn for an input."""
+        self.emit(Input(player_input))
 
         # Check if we're awaiting a play-again response
         if self.awaiting_play_again:
-            if player_input in ["y", "yes"]:
+            answer = normalize(player_input)
+            if answer in ["y", "yes"]:
                 self.awaiting_play_again = False  # Reset the flag
                 self.reset_game()
-                self.gui.message_box.config(state=tk.NORMAL)  # Enable editing of the message box
-                self.gui.message_box.delete(1.0, tk.END)  # Clear all previous messages
-                self.gui.message_box.config(state=tk.DISABLED)  # Disable editing again
-                self.gui.display_message("You find yourself in a dark cave. Type your commands below.\n")
-            elif player_input in ["n", "no"]:
+                self.emit(Cleared())  # Clear all previous messages
+                self.emit(Message("You find yourself in a dark cave. Type your commands below.\n"))
+            elif answer in ["n", "no"]:
                 self.awaiting_play_again = False  # Reset the flag
-                self.gui.display_message("Thank you for playing!")
-                self.gui.window.quit()  # Exit the game
+                self.emit(Message("Thank you for playing!"))
+                self.emit(Quit())  # Exit the game
             else:
-                self.gui.display_message("Please answer 'Y' or 'N'.")
+                self.emit(Message("Please answer 'Y' or 'N'."))
             return
 
+        stats = self.stats
+        if stats is not None:
+            mark = stats.clock()
+        action, argument = command_parser.parse(player_input)
+        if stats is not None:
+            mark = stats.lap("parse", mark)
+
         # Window exits before message is displayed. Do I really want this part anyway?
-        if player_input in commands_dict["quit"]:
-            self.gui.display_message("Thanks for playing!")
-            self.gui.window.quit()
+        if action == "quit":
+            self.emit(Message("Thanks for playing!"))
+            self.emit(Quit())
             return
 
         # Process the command through the game logic
         monster_should_move = True
 
-        match player_input:
-            case _ if player_input in commands_dict["up"]:
-                self.gui.display_message(self.move_player("up"))
-            case _ if player_input in commands_dict["down"]:
-                self.gui.display_message(self.move_player("down"))
-            case _ if player_input in commands_dict["left"]:
-                self.gui.display_message(self.move_player("left"))
-            case _ if player_input in commands_dict["right"]:
-                self.gui.display_message(self.move_player("right"))
-            case _ if player_input in commands_dict["dig"]:
-                self.gui.display_message(self.dig())
-            case _ if player_input in commands_dict["torch"]:
-                self.gui.display_message(self.light_torch())
-            case _ if player_input in commands_dict["sweep"]:
-                self.gui.display_message(self.use_metal_detector())
-            case _ if player_input in commands_dict["repel"]:
-                self.gui.display_message(self.use_monster_repellent(self.monster))
-            case _ if player_input in commands_dict["inventory"]:
-                inventory_messages = inventory.show_inventory()  # Get inventory messages
+        match action:
+            case "up" | "down" | "left" | "right":
+                self.move_player(action)
+            case "go":
+                self.move_player(argument)
+            case "dig":
+                self.dig()
+            case "torch":
+                self.light_torch()
+            case "sweep":
+                self.use_metal_detector()
+            case "repel":
+                self.use_monster_repellent(self.monster)
+            case "inventory":
+                inventory_messages = self.inventory.show_inventory()  # Get inventory messages
                 for message in inventory_messages:
-                    self.gui.display_message(message)  # Display each message
-            case _ if player_input in commands_dict["unlock"]:
-                self.gui.display_message(self.unlock_door())
-            case _ if player_input in commands_dict["help"]:
-                self.gui.display_message(self.show_hints())
-            case _ if player_input in commands_dict["cheat"]:
-                self.gui.display_message(self.cheat())
+                    self.emit(Message(message))  # Display each message
+            case "unlock":
+                self.unlock_door()
+            case "help":
+                self.emit(Message(self.show_hints()))
+            case "save":
+                self.emit(Message(self.save_game()))
+                monster_should_move = False
+            case "stats":
+                for message in self.show_stats():
+                    self.emit(Message(message))
+                monster_should_move = False
+            case "cheat":
+                self.cheat()
                 monster_should_move = False
             case _:
-                self.gui.display_message(f"I don't know what '{player_input}' means.")
+                self.emit(Message(f"I don't know what '{player_input}' means."))
                 monster_should_move = False
-        self.gui.display_message(' ') # print blank line after every command
+        self.emit(BLANK) # print blank line after every command
+        self.explore()
+        if stats is not None:
+            mark = stats.lap("action", mark)
 
         if monster_should_move:
-            self.monster.move(self.player_position)
-            if self.monster.check_if_caught(self.player_position):
-                self.gui.display_message("You were caught by the monster!")
-                self.gui.display_message(self.play_again())  # Ask the player if they want to play again
+            self.events.extend(self.monster.move(self.player_position))
+            self.explore()
+            if stats is not None:
+                mark = stats.lap("monster", mark)
+            caught = self.monster.check_if_caught(self.player_position)
+            if stats is not None:
+                stats.lap("caught", mark)
+            if caught:
+                self.emit(Caught())
+                self.outcome = "caught"
+                self.play_again()  # Ask the player if they want to play again
@@ -0,0 +1,70 @@
+# grid.py
+
+# Flags stored for every cell of the map. A cell can have several at once.
+SEARCHED = 1  # The player has dug here
+EXIT = 2      # The exit door
+KEY = 4       # The key is buried here
+WALL = 8      # Solid rock, nothing can move here
+EXPLORED = 16 # The player has seen this cell by torchlight, in fog of war
+
+class GridState:
+    __slots__ = ("width", "height", "cells", "version")
+
+    def __init__(self, width, height):
+        """
+        Keep one byte of flags per cell of the map, so checking or changing a cell
+        takes the same time no matter how big the map is or how much has been dug.
+
+        Args:
+            width (int): Number of columns.
+            height (int): Number of rows.
+        """
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)  # Row by row, cells[y * width + x]
+        self.version = 0  # Goes up whenever a wall is added or removed, so cached paths know to start over
+
+    def index(self, position):
+        """Turn an (x, y) position into an index into self.cells."""
+        x, y = position
+        return y * self.width + x
+
+    def in_bounds(self, position):
+        """Check if a position is on the map."""
+        x, y = position
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def has(self, position, flag):
+        """Check if a cell has a flag."""
+        return bool(self.cells[self.index(position)] & flag)
+
+    def set(self, position, flag):
+        """Add a flag to a cell."""
+        self.cells[self.index(position)] |= flag
+        if flag & WALL:
+            self.version += 1
+
+    def clear(self, position, flag):
+        """Remove a flag from a cell."""
+        self.cells[self.index(position)] &= ~flag
+        if flag & WALL:
+            self.version += 1
+
+    def is_searched(self, position):
+        """Check if the player has already dug at a position."""
+        return bool(self.cells[self.index(position)] & SEARCHED)
+
+    def mark_searched(self, position):
+        """Remember that the player dug at a position."""
+        self.cells[self.index(position)] |= SEARCHED
+
+    def row(self, y):
+        """Return the flags of one row of the map, without copying them."""
+        start = y * self.width
+        return memoryview(self.cells)[start:start + self.width]
+
+    def positions_with(self, flag):
+        """Yield the (x, y) position of every cell that has a flag."""
+        for index, cell in enumerate(self.cells):
+            if cell & flag:
+                yield index % self.width, index // self.width
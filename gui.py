@@ -2,20 +2,102 @@
 import tkinter as tk
 import ttkbootstrap as ttk
 import style
+from events import Cleared, MapShown, Quit
+from renderer import CELL_WIDTH, MAP_LEGEND, map_legend
+
+class MapView(tk.Canvas):
+    TILE_SIZE = 28  # Width and height of one map tile in pixels
+
+    def __init__(self, master, **kwargs):
+        """
+        A canvas with one text item per map tile. Drawing a new map only changes
+        the tiles that look different from the last one, so the cost of an update
+        depends on the size of the view, not on how long the game has been going.
+        """
+        super().__init__(master, highlightthickness=0, **kwargs)
+        self.tiles = []  # Canvas item ids, row by row
+        self.shown = []  # The symbol each tile currently shows
+        self.columns = 0
+        self.rows = 0
+
+    def draw(self, map_text):
+        """
+        Show a map drawn by MapRenderer.
+
+        Args:
+            map_text (str): The map, one line per row.
+        """
+        lines = map_text.split('\n')
+        rows = len(lines)
+        columns = len(lines[0]) // CELL_WIDTH
+        if (columns, rows) != (self.columns, self.rows):
+            self.create_tiles(columns, rows)
+
+        i = 0
+        for line in lines:
+            for x in range(columns):
+                symbol = line[x * CELL_WIDTH]
+                if self.shown[i] != symbol:
+                    self.itemconfig(self.tiles[i], text=symbol)
+                    self.shown[i] = symbol
+                i += 1
+
+    def create_tiles(self, columns, rows):
+        """Replace all tiles with an empty grid of the given size."""
+        self.delete('all')
+        self.columns = columns
+        self.rows = rows
+        self.config(width=columns * self.TILE_SIZE, height=rows * self.TILE_SIZE)
+        half = self.TILE_SIZE // 2
+        self.tiles = [
+            self.create_text(x * self.TILE_SIZE + half, y * self.TILE_SIZE + half, text='', font=style.map_font, fill='white')
+            for y in range(rows) for x in range(columns)
+        ]
+        self.shown = [''] * len(self.tiles)
+
+    def clear(self):
+        """Remove the map, e.g. when a new game starts."""
+        self.delete('all')
+        self.tiles = []
+        self.shown = []
+        self.columns = 0
+        self.rows = 0
 
 class GUI:
-    def __init__(self, window):
+    SCROLLBACK_LIMIT = 1000  # Lines kept in the message box, older ones are removed
+    POLL_INTERVAL = 15  # Milliseconds between checks for output from the turn worker
+
+    def __init__(self, window, scrollback_limit=SCROLLBACK_LIMIT, threaded=False, game_options=None):
         """
         Initialize the GUI and connect it to the Game class.
         Args:
             window (ttk.Window): The root Tkinter window.
+            scrollback_limit (int): How many lines the message box keeps.
+            threaded (bool): Play turns on a worker thread so the window never waits for the game.
+            game_options (dict): Keyword arguments for Game, e.g. its seed or a log to record to.
         """
         self.window = window
+        self.scrollback_limit = scrollback_limit
+        self.pending_messages = []  # Messages waiting for the next flush
+        self.flush_scheduled = False
+        self.line_count = 0  # Lines currently in the message box
         self.window.title("GUI Adventure")
-        self.window.geometry("1020x600")
+        self.window.geometry("1280x640")
+
+        self.game_frame = ttk.Frame(master=window)
+        self.game_frame.pack(pady=(20, 10))
+
+        self.message_box = tk.Text(self.game_frame, height=20, width=50, font=style.game_font, state=tk.DISABLED, wrap=tk.WORD)
+        self.message_box.pack(side='left', padx=(0, 20))
 
-        self.message_box = tk.Text(window, height=20, width=60, font=style.game_font, state=tk.DISABLED, wrap=tk.WORD)
-        self.message_box.pack(pady=(20, 10))
+        self.map_frame = ttk.Frame(master=self.game_frame)
+        self.map_frame.pack(side='left', anchor='n')
+
+        self.map_view = MapView(self.map_frame)
+        self.map_view.pack()
+
+        self.map_legend = ttk.Label(master=self.map_frame, text='\n'.join(MAP_LEGEND), font=style.small_font)
+        self.map_legend.pack(pady=10, anchor='w')
 
         self.command_frame = ttk.Frame(master=window)
         self.command_frame.pack(pady=10)
@@ -27,19 +109,85 @@ class GUI:
         self.input_box.pack(side='left', pady=10)
         self.input_box.bind("<Return>", self.handle_input)
 
-        from game import Game
-        self.game = Game(self)  # Connect to the game class
+        if threaded:
+            # The game lives on the worker thread and never calls tkinter itself
+            from worker import TurnWorker
+            self.worker = TurnWorker(game_options)
+            self.worker.start()
+            self.game = None
+            self.window.after(self.POLL_INTERVAL, self.poll_worker)
+        else:
+            from game import Game
+            self.worker = None
+            self.game = Game(self, **(game_options or {}))  # Connect to the game class
+
+    def handle(self, events):
+        """Show one turn's events: every message in a single update of the message box, and the map if it was drawn."""
+        for event in events:
+            kind = type(event)
+            if kind is MapShown:
+                self.display_map(event.map_text, event.cave)
+            elif kind is Cleared:
+                self.clear_messages()
+            elif kind is Quit:
+                self.quit()
+            else:
+                self.pending_messages.extend(event.lines())
+        if self.pending_messages and not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.window.after_idle(self.flush_messages)
 
     def display_message(self, message):
+        """Queue a message. Everything queued during a turn is shown at once when Tk is idle."""
+        self.pending_messages.append(message)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.window.after_idle(self.flush_messages)
+
+    def flush_messages(self):
+        """Add all queued messages to the message box in one update and trim the oldest lines."""
+        self.flush_scheduled = False
+        if not self.pending_messages:
+            return
+        text = "\n".join(self.pending_messages) + "\n"
+        self.pending_messages.clear()
+
         self.message_box.config(state=tk.NORMAL)
-        self.message_box.insert(tk.END, message + "\n")
+        self.message_box.insert(tk.END, text)
+        self.line_count += text.count("\n")
+        if self.line_count > self.scrollback_limit:
+            excess = self.line_count - self.scrollback_limit
+            self.message_box.delete("1.0", f"{excess + 1}.0")  # Remove the oldest lines
+            self.line_count = self.scrollback_limit
         self.message_box.config(state=tk.DISABLED)
         self.message_box.see(tk.END)
 
+    def display_map(self, map_text, cave=False):
+        self.map_view.draw(map_text)
+        self.map_legend.config(text='\n'.join(map_legend(cave)))  # Rock only needs explaining in caves
+
+    def clear_messages(self):
+        self.pending_messages.clear()  # Messages that weren't shown yet are cleared too
+        self.line_count = 0
+        self.message_box.config(state=tk.NORMAL)  # Enable editing of the message box
+        self.message_box.delete(1.0, tk.END)  # Clear all previous messages
+        self.message_box.config(state=tk.DISABLED)  # Disable editing again
+        self.map_view.clear()  # The old map belongs to the last game
+
     def handle_input(self, event):
         player_input = self.input_box.get().strip()
         self.input_box.delete(0, tk.END)
-        self.game.run(player_input)
+        if self.worker:
+            self.worker.submit(player_input)
+        else:
+            self.game.run(player_input)
+
+    def poll_worker(self):
+        """Show what the turn worker produced since the last poll, then check again later."""
+        self.worker.drain(self)
+        self.window.after(self.POLL_INTERVAL, self.poll_worker)
 
     def quit(self):
-        self.window.quit()
\ No newline at end of file
+        if self.worker:
+            self.worker.stop()
+        self.window.quit()
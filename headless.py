@@ -0,0 +1,53 @@
+# headless.py
+from events import Cleared, MapShown, Quit
+from renderer import map_legend
+
+class HeadlessGUI:
+    """
+    A stand-in for the GUI class that lets Game run without tkinter.
+    Messages are collected in a list instead of being drawn in a window.
+    Without keep_messages the events' text is never even made.
+    """
+    __slots__ = ("keep_messages", "messages", "quit_requested")
+
+    def __init__(self, keep_messages=True):
+        """
+        Args:
+            keep_messages (bool): Store every message. Turn this off for batch runs where nobody reads them.
+        """
+        self.keep_messages = keep_messages
+        self.messages = []
+        self.quit_requested = False
+
+    def handle(self, events):
+        """Take one turn's events."""
+        if not self.keep_messages:
+            # Nobody reads the messages, so only quitting matters
+            if any(type(event) is Quit for event in events):
+                self.quit_requested = True
+            return
+        for event in events:
+            kind = type(event)
+            if kind is MapShown:
+                self.display_map(event.map_text, event.cave)
+            elif kind is Cleared:
+                self.clear_messages()
+            elif kind is Quit:
+                self.quit()
+            else:
+                self.messages.extend(event.lines())
+
+    def display_message(self, message):
+        if self.keep_messages:
+            self.messages.append(message)
+
+    def display_map(self, map_text, cave=False):
+        """Show the map as text, followed by its legend."""
+        for message in [map_text, ' ', *map_legend(cave)]:
+            self.display_message(message)
+
+    def clear_messages(self):
+        self.messages.clear()
+
+    def quit(self):
+        self.quit_requested = True
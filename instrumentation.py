@@ -0,0 +1,126 @@
+# instrumentation.py
+import csv
+import json
+import os
+import time
+from events import Dug, TorchLit
+
+# The phases of a turn, in the order Game.run goes through them. Output is the turn's batch of events
+# being handed to the gui at the end.
+PHASES = ("parse", "action", "monster", "caught", "output")
+
+class Instrumentation:
+    def __init__(self, export_path=None, export_every=100):
+        """
+        Timings for each phase of a turn and counters of what happened, for a game created with stats=...
+        A game without it only pays for a few `is None` checks per turn, see benchmarks.py instrumentation.
+
+        Args:
+            export_path (str): Write the stats to this file every export_every turns. A path ending in
+                .csv gets a row per metric appended each time, anything else is rewritten as JSON.
+            export_every (int): Turns between exports.
+        """
+        self.export_path = export_path
+        self.export_every = export_every
+        self.spans = {phase: [0, 0, 0] for phase in PHASES}  # phase -> [count, total ns, longest ns]
+        # What the player did and saw, counted from the events the game shows, not from the commands typed
+        self.counters = {"turns": 0, "digs": 0, "torches_lit": 0, "messages_shown": 0, "events": 0}
+        self.clock = time.perf_counter_ns
+
+    def lap(self, phase, start):
+        """
+        Add the time since start to a phase.
+
+        Returns:
+            int: The time now, to start the next phase from.
+        """
+        now = self.clock()
+        span = self.spans[phase]
+        span[0] += 1
+        span[1] += now - start
+        if now - start > span[2]:
+            span[2] = now - start
+        return now
+
+    def end_turn(self):
+        """Count a finished turn, exporting the stats when it is time to."""
+        self.counters["turns"] += 1
+        if self.export_path and self.counters["turns"] % self.export_every == 0:
+            self.export()
+
+    def summary(self):
+        """
+        Returns:
+            dict: The counters, and the count, mean and longest time in microseconds of every phase.
+        """
+        return {
+            "counters": dict(self.counters),
+            "spans": {
+                phase: {"count": count, "mean_us": total / count / 1e3 if count else 0.0, "max_us": longest / 1e3}
+                for phase, (count, total, longest) in self.spans.items()
+            },
+        }
+
+    def report(self):
+        """Return messages describing the stats, for the stats command."""
+        summary = self.summary()
+        messages = ["Turn timings (mean / longest):"]
+        for phase, span in summary["spans"].items():
+            messages.append(f"{phase}: {span['mean_us']:.1f} / {span['max_us']:.1f} µs over {span['count']} calls")
+        messages.append("Counters:")
+        for name, value in summary["counters"].items():
+            messages.append(f"{name}: {value}")
+        return messages
+
+    def export(self, path=None):
+        """Write the stats to a file, as JSON or as CSV rows depending on its extension."""
+        path = path or self.export_path
+        summary = self.summary()
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if path.endswith(".csv"):
+            new_file = not os.path.exists(path)
+            with open(path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["time", "turns", "metric", "value"])
+                turns = summary["counters"]["turns"]
+                for name, value in summary["counters"].items():
+                    writer.writerow([timestamp, turns, name, value])
+                for phase, span in summary["spans"].items():
+                    writer.writerow([timestamp, turns, f"{phase}_mean_us", round(span["mean_us"], 3)])
+                    writer.writerow([timestamp, turns, f"{phase}_max_us", round(span["max_us"], 3)])
+        else:
+            with open(path, "w") as f:
+                json.dump(dict(summary, time=timestamp), f, indent=2)
+
+class InstrumentedOutput:
+    """Wraps a game's GUI to time and count everything the game shows."""
+    __slots__ = ("gui", "stats")
+
+    # Every kind of event is shown as the same number of lines, so each kind's lines are only made once
+    LINE_COUNTS = {}
+
+    def __init__(self, gui, stats):
+        self.gui = gui
+        self.stats = stats
+
+    def handle(self, events):
+        start = self.stats.clock()
+        self.gui.handle(events)
+        self.stats.lap("output", start)
+        counters = self.stats.counters
+        counters["events"] += len(events)
+        line_counts = self.LINE_COUNTS
+        for event in events:
+            kind = type(event)
+            if kind is Dug:
+                counters["digs"] += 1
+            elif kind is TorchLit:
+                counters["torches_lit"] += 1
+            lines = line_counts.get(kind)
+            if lines is None:
+                lines = line_counts[kind] = len(event.lines())
+            counters["messages_shown"] += lines  # A window or terminal shows every line as a message
+
+    def __getattr__(self, name):
+        return getattr(self.gui, name)  # Anything else, e.g. HeadlessGUI.messages, comes from the real GUI
@@ -1,68 +1,94 @@
 import random
+from array import array
+from loot import TABLES
+
+# Every item has a small number, its position in this list. The counts of an inventory are
+# kept in an array indexed by these numbers instead of a dict keyed by name.
+ITEM_NAMES = ["map", "metal detector", "monster repellent", "shovel", "torch", "key", "ruby", "emerald", "diamond"]
+ITEM_IDS = {name: item_id for item_id, name in enumerate(ITEM_NAMES)}
+
+def item_id(item):
+    """Look up the number of an item, giving new items the next free number."""
+    if item not in ITEM_IDS:
+        ITEM_IDS[item] = len(ITEM_NAMES)
+        ITEM_NAMES.append(item)
+    return ITEM_IDS[item]
 
 class Inventory:
-    def __init__(self):
-        """Initialize the player's inventory with default items."""
+    __slots__ = ("counts", "owned", "rng", "loot")
+
+    def __init__(self, rng=random, loot=TABLES["default"]):
+        """
+        Initialize the player's inventory with default items.
+
+        Args:
+            rng (random.Random): Rolls the dice when digging, so seeded games find the same items.
+            loot (AliasTable): What digging can find, see loot.py.
+        """
+        self.rng = rng
+        self.loot = loot
         self.reset()
 
     def reset(self):
         """Reset the inventory to its default state."""
-        self.items = {
-            "map": 1,    # Start with a map (make this a key item?)
-            "metal detector": 1, # Start with a metal detector
-            "monster repellent": 1, # Start with one monster repellent
-            "shovel": 1, # Start with a shovel (make this a key item?)
-            "torch": 3,  # Start with 3 torches
-        }
+        self.counts = array('i', [
+            1, # Start with a map (make this a key item?)
+            1, # Start with a metal detector
+            1, # Start with one monster repellent
+            1, # Start with a shovel (make this a key item?)
+            3, # Start with 3 torches
+        ])
+        self.owned = 0b11111  # One bit per item id the player has ever had, so used-up items still show as 0
+
+    @property
+    def items(self):
+        """The inventory as a dict of item names and counts."""
+        return {ITEM_NAMES[item]: count for item, count in enumerate(self.counts) if self.owned >> item & 1}
 
     def add_item(self, item, count=1):
         """Add an item to the inventory."""
-        if item in self.items:
-            self.items[item] += count
-        else:
-            self.items[item] = count
+        item = item_id(item)
+        if item >= len(self.counts):
+            self.counts.extend([0] * (item + 1 - len(self.counts)))
+        self.counts[item] += count
+        self.owned |= 1 << item
+
+    def count(self, item):
+        """Return how many of an item the player has."""
+        item = ITEM_IDS.get(item)
+        if item is None or item >= len(self.counts):
+            return 0
+        return self.counts[item]
 
     def find_random_item(self):
-        """Roll virtual dice and add items to player inventory based on luck."""
-        roll = random.randint(1, 20)  # Simulate a D20 roll (integer between 1 and 20)
-    
-        if 1 <= roll <= 5:  # Nothing: 25% chance
-            return "There is nothing here."
-        elif 6 <= roll <= 10: # Torch: 25% chance
-            self.add_item("torch", 1)
-            return "You found a torch!"
-        elif 11 <= roll <= 15:  # Monster Repellent: 25% chance
-            self.add_item("monster repellent", 1)
-            return "You found some monster repellent!"
-        elif 16 <= roll <= 17:  # Ruby: 7.5% chance
-            self.add_item("ruby", 1)
-            return "You found a ruby"
-        elif 18 <= roll <= 19:  # Emerald: 7.5% chance
-            self.add_item("emerald", 1)
-            return "You found an emerald!"
-        elif roll == 20:  # Diamond: 5% chance
-            self.add_item("diamond", 1)
-            return "You found a diamond!"
+        """
+        Draw from the loot table and add what was found to the inventory.
+
+        Returns:
+            tuple: (item, message). The item is None when nothing was found.
+        """
+        item, message = self.loot.sample(self.rng)
+        if item is not None:
+            self.add_item(item, 1)
+        return item, message
 
     def use_item(self, item):
         """Use an item from the inventory, if available."""
-        if self.items.get(item, 0) > 0: # Second argument is the default value if item is not found
-            self.items[item] -= 1
+        if self.count(item) > 0:
+            self.counts[ITEM_IDS[item]] -= 1
 
     def has_item(self, item):
         """Check if the player has a specific item."""
-        return self.items.get(item, 0) > 0
+        return self.count(item) > 0
 
     # TODO Pluralize item names if the quantity is greater than 1
     def show_inventory(self):
         """Return messages representing the player's inventory."""
-        if not self.items:
+        items = self.items
+        if not items:
             return ["Your inventory is empty."]
         else:
             messages = ["You check the contents of your backpack..."]
-            for item, count in self.items.items(): # rename the "items" dict to "backpack" or something, this is confusing
+            for item, count in items.items():
                 messages.append(f"{item}: {count}")
             return messages
-    
-# Create a single instance of the Inventory class
-inventory = Inventory()
\ No newline at end of file
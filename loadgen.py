@@ -0,0 +1,121 @@
+# loadgen.py
+import argparse
+import asyncio
+import random
+import time
+from server import END_OF_TURN
+from simulator import RandomPolicy
+
+async def read_turn(reader):
+    """Read one turn's output, up to the end-of-turn marker."""
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("The server closed the session")
+        line = line.decode().rstrip("\n")
+        if line == END_OF_TURN:
+            return lines
+        lines.append(line)
+
+async def play_session(connect, turns, think_time, seed, latencies):
+    """Connect, then play random commands, answering "y" whenever a game ends."""
+    rng = random.Random(seed)
+    policy = RandomPolicy()
+    reader, writer = await connect()
+    await read_turn(reader)  # The welcome message
+    game_over = False
+    for turn in range(turns):
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * think_time))
+        command = "y" if game_over else policy.choose(None, turn, rng)
+        start = time.perf_counter()
+        writer.write((command + "\n").encode())
+        lines = await read_turn(reader)
+        latencies.append(time.perf_counter() - start)
+        game_over = any(line.startswith("Do you want to play again?") for line in lines)
+    writer.close()
+
+def percentile(values, fraction):
+    """The value below which the given fraction of the sorted values lie."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def measure(connect, sessions, args):
+    """
+    Play a number of concurrent sessions.
+
+    Returns:
+        tuple: (every turn's latency in seconds, sorted, and the seconds the whole run took).
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        play_session(connect, args.turns, args.think_time, args.seed + i, latencies)
+        for i in range(sessions)
+    ])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return latencies, elapsed
+
+def report(sessions, latencies, elapsed, cores):
+    print(f"{sessions} sessions, {len(latencies)} turns in {elapsed:.2f}s, {len(latencies) / elapsed:,.0f} turns/s ({len(latencies) / elapsed / cores:,.0f} per server core)")
+    print(f"turn latency p50: {percentile(latencies, 0.5) * 1e3:.2f} ms, p99: {percentile(latencies, 0.99) * 1e3:.2f} ms")
+
+async def find_capacity(connect, args):
+    """
+    Find the most concurrent sessions the server keeps within the p99 latency budget. The number of
+    sessions is doubled until the budget is missed, then the gap between the last count that kept
+    to it and the first that didn't is halved until it is within 5% of the answer.
+
+    Returns:
+        int: The most sessions measured to keep to the budget, or 0 if even one session misses it.
+    """
+    budget = args.p99_budget / 1e3
+    good, bad = 0, None
+    sessions = 1
+    while bad is None or bad - good > max(1, good // 20):
+        latencies, elapsed = await measure(connect, sessions, args)
+        p99 = percentile(latencies, 0.99)
+        print(f"{sessions} sessions: p99 {p99 * 1e3:.2f} ms, {len(latencies) / elapsed:,.0f} turns/s")
+        if p99 <= budget:
+            good = sessions
+        else:
+            bad = sessions
+        if bad is None:
+            sessions *= 2
+        else:
+            sessions = (good + bad) // 2
+            if sessions == good:
+                break
+    return good
+
+async def run_load(args):
+    if args.unix:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+    if args.p99_budget is None:
+        report(args.sessions, *await measure(connect, args.sessions, args), args.server_processes)
+    else:
+        capacity = await find_capacity(connect, args)
+        print(f"The server keeps p99 turn latency within {args.p99_budget:g} ms for up to {capacity} concurrent sessions")
+        print(f"That is {capacity / args.server_processes:,.1f} sessions per server core")
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many concurrent sessions against server.py and report turn latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Connect to this Unix socket instead of TCP")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=50, help="Turns played by each session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Average seconds a player waits between commands")
+    parser.add_argument("--p99-budget", type=float, metavar="MS", help="Instead of playing --sessions, find the most sessions whose p99 turn latency stays within this many milliseconds")
+    parser.add_argument("--server-processes", type=int, default=1, help="How many server.py processes answer at the address. Each runs every session it hosts on one core, so the per-core figures divide by this (default: 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.server_processes < 1:
+        parser.error("--server-processes must be at least 1")
+    asyncio.run(run_load(args))
+
+if __name__ == "__main__":
+    main()
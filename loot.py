@@ -0,0 +1,156 @@
+# loot.py
+import argparse
+import random
+
+# What digging can turn up, as weighted tables: (item, weight, message). An item of None finds nothing.
+# Weights don't need to add up to anything, they only count relative to each other.
+LOOT_TABLES = {
+    # The original d20 roll: 5 nothing, 5 torch, 5 repellent, 2 ruby, 2 emerald, 1 diamond
+    "default": [
+        (None, 5, "There is nothing here."),
+        ("torch", 5, "You found a torch!"),
+        ("monster repellent", 5, "You found some monster repellent!"),
+        ("ruby", 2, "You found a ruby"),
+        ("emerald", 2, "You found an emerald!"),
+        ("diamond", 1, "You found a diamond!"),
+    ],
+    # Big maps take longer to search, so more digs come up empty but torches are a little more common
+    "large_map": [
+        (None, 8, "There is nothing here."),
+        ("torch", 6, "You found a torch!"),
+        ("monster repellent", 4, "You found some monster repellent!"),
+        ("ruby", 2, "You found a ruby"),
+        ("emerald", 2, "You found an emerald!"),
+        ("diamond", 1, "You found a diamond!"),
+    ],
+}
+
+# Which table is used on a map with at least this many cells. The last matching entry wins.
+LOOT_BY_MAP_AREA = [
+    (0, "default"),
+    (32 * 32, "large_map"),
+]
+
+class AliasTable:
+    def __init__(self, entries):
+        """
+        Draw from a weighted table in constant time with Walker's alias method.
+
+        Every entry gets a column of equal width. A column holds its own entry up to its probability
+        and the leftover is given to one other ("alias") entry, so a draw picks a column and makes
+        one comparison, however long the table is.
+
+        Args:
+            entries (list): (outcome, weight) pairs. Weights must be positive.
+        """
+        self.outcomes = [outcome for outcome, _ in entries]
+        weights = [weight for _, weight in entries]
+        if not weights or min(weights) <= 0:
+            raise ValueError("A loot table needs at least one entry, and every weight must be positive")
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+
+        # Vose's version: pair every column that is too short with one that is too tall
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            short, tall = small.pop(), large.pop()
+            self.probability[short] = scaled[short]
+            self.alias[short] = tall
+            scaled[tall] -= 1.0 - scaled[short]
+            (small if scaled[tall] < 1.0 else large).append(tall)
+        # Whatever is left is 1.0 up to rounding errors, and keeps its default of never using its alias
+
+        self.arrays = None  # NumPy copies of probability and alias, made for the first batch
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def chances(self):
+        """The chance of drawing each entry, added up from the columns: its own and those it is the alias of."""
+        count = len(self.probability)
+        chances = [0.0] * count
+        for column, (probability, alias) in enumerate(zip(self.probability, self.alias)):
+            chances[column] += probability / count
+            chances[alias] += (1.0 - probability) / count
+        return chances
+
+    def sample_index(self, rng=random):
+        """Draw the index of one entry, using a single random number."""
+        u = rng.random() * len(self.probability)
+        column = int(u)
+        if u - column < self.probability[column]:  # The fraction decides between the column and its alias
+            return column
+        return self.alias[column]
+
+    def sample(self, rng=random):
+        """Draw one outcome."""
+        return self.outcomes[self.sample_index(rng)]
+
+    def sample_many(self, count, rng=None):
+        """
+        Draw many entries at once with NumPy, e.g. to check a table's odds over millions of digs.
+
+        Args:
+            count (int): How many to draw.
+            rng (numpy.random.Generator): The generator to use. A fresh unseeded one by default.
+
+        Returns:
+            numpy.ndarray: The index of the entry drawn each time.
+        """
+        try:
+            import numpy as np  # Only imported here, so games that dig one cell at a time never load it
+        except ImportError:
+            raise ImportError("Drawing many items at once needs NumPy (pip install numpy)") from None
+        if self.arrays is None:
+            self.arrays = (np.array(self.probability), np.array(self.alias, dtype=np.intp))
+        probability, alias = self.arrays
+        rng = rng or np.random.default_rng()
+        u = rng.random(count) * len(probability)
+        columns = u.astype(np.intp)
+        return np.where(u - columns < probability[columns], columns, alias[columns])
+
+def build_table(name):
+    """Turn one of the LOOT_TABLES into an AliasTable of (item, message) outcomes."""
+    return AliasTable([((item, message), weight) for item, weight, message in LOOT_TABLES[name]])
+
+TABLES = {name: build_table(name) for name in LOOT_TABLES}
+
+def table_for_map(width, height):
+    """Pick the loot table for a map of this size."""
+    name = LOOT_BY_MAP_AREA[0][1]
+    for area, table in LOOT_BY_MAP_AREA:
+        if width * height >= area:
+            name = table
+    return TABLES[name]
+
+def main():
+    parser = argparse.ArgumentParser(description="Draw from the loot tables and compare the results with their weights.")
+    parser.add_argument("--draws", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        import numpy as np
+        rng = np.random.default_rng(args.seed)
+    except ImportError:  # Fall back to drawing one at a time
+        np = rng = None
+
+    for name, entries in LOOT_TABLES.items():
+        table = TABLES[name]
+        total = sum(weight for _, weight, _ in entries)
+        if rng is not None:
+            counts = np.bincount(table.sample_many(args.draws, rng), minlength=len(table))
+        else:
+            py_rng = random.Random(args.seed)
+            counts = [0] * len(table)
+            for _ in range(args.draws):
+                counts[table.sample_index(py_rng)] += 1
+        print(f"== {name}")
+        for (item, weight, _), count in zip(entries, counts):
+            print(f"{item or 'nothing'}: {count / args.draws:.2%} (expected {weight / total:.2%})")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 # main.py
-from gui import GUI
+import argparse
+from cli import add_game_arguments, game_options
 
-import tkinter as tk
-import ttkbootstrap as ttk
+def main():
+    parser = argparse.ArgumentParser(description="GUI Adventure")
+    parser.add_argument("--threaded", action="store_true", help="Play turns on a worker thread")
+    add_game_arguments(parser)
+    args = parser.parse_args()
+    options = game_options(parser, args)
+
+    # tkinter and ttkbootstrap are only imported once the window is really needed
+    import ttkbootstrap as ttk
+    from gui import GUI
 
-if __name__ == "__main__":
     window = ttk.Window(themename='darkly')
-    gui = GUI(window)
-    window.mainloop()
\ No newline at end of file
+    gui = GUI(window, threaded=args.threaded, game_options=options)
+    window.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,60 @@
 # monster.py
 import random
-from settings import settings
-from utils import calculate_distance
+from events import MonsterHowl, MonsterYawn
+from grid import WALL
+from utils import pack_position, unpack_position
 
 class Monster:
-    def __init__(self, initial_position, gui):
+    __slots__ = ("_position", "field", "grid", "rng", "repellent_turns_left")
+
+    def __init__(self, initial_position, field, rng=random):
         """
         Initializes the Monster class with an initial position and the turn counter.
         
         Args:
         initial_position (tuple): The (x, y) coordinates of the monster's starting position.
+        field (DistanceField): Distances to the player, shared by everything that chases or flees from them.
+        rng (random.Random): Picks the random moves, so seeded games play out the same way.
         """
         self.position = initial_position
-        self.gui = gui
+        self.field = field
+        self.grid = field.grid
+        self.rng = rng
         self.repellent_turns_left = 0  # Track how many turns the repellent is active
 
+    @property
+    def position(self):
+        return unpack_position(self._position)
+
+    @position.setter
+    def position(self, position):
+        self._position = pack_position(position)  # A packed int is smaller than a tuple
+
     def random_move(self):
         """
         Moves the monster in a random direction (north, south, east, west) if the move is within bounds.
         If the monster tries to move out of bounds, another random direction is chosen.
         20% chance that the monster will not move.
+
+        Returns:
+        MonsterYawn: If the monster stayed where it was, otherwise None.
         """
-        directions = ["north", "south", "east", "west", "yawn"]
+        directions = {"north": (0, -1), "south": (0, 1), "east": (1, 0), "west": (-1, 0), "yawn": None}
+        names = list(directions)
         while True:  # Loop until a valid move is made
-            direction = random.choice(directions)
+            direction = self.rng.choice(names)
             
-            if direction == "north" and self.position[1] > 0:
-                self.position = (self.position[0], self.position[1] - 1)
-                break
-            elif direction == "south" and self.position[1] < settings.GRID_HEIGHT - 1:
-                self.position = (self.position[0], self.position[1] + 1)
-                break
-            elif direction == "east" and self.position[0] < settings.GRID_WIDTH - 1:
-                self.position = (self.position[0] + 1, self.position[1])
-                break
-            elif direction == "west" and self.position[0] > 0:
-                self.position = (self.position[0] - 1, self.position[1])
-                break
-            elif direction == "yawn":
-                self.gui.display_message("You hear a low yawn echoing in the distance.")
-                break
+            if direction == "yawn":
+                return MonsterYawn()
+            dx, dy = directions[direction]
+            new_position = (self.position[0] + dx, self.position[1] + dy)
+            if self.grid.in_bounds(new_position) and not self.grid.has(new_position, WALL):
+                self.position = new_position
+                return None
 
     def is_near_player(self, player_position):
         """
-        Checks if the monster is within 2 steps of the player using Manhattan distance.
+        Checks if the monster is within 2 steps of the player, walking around walls.
         
         Args:
         player_position (tuple): The (x, y) coordinates of the player's position.
@@ -51,9 +62,8 @@ class Monster:
         Returns:
         bool: True if the monster is within 2 steps of the player, otherwise False.
         """
-        # Manhattan distance: sum of absolute differences in x and y
-        distance = calculate_distance(self.position, player_position)
-        return distance <= 2  # Monster chases the player if within 2 steps
+        self.field.update(player_position)
+        return self.field.distance(self.position, limit=2) is not None  # Monster chases the player if within 2 steps
 
     def chase_player(self, player_position):
         """
@@ -62,17 +72,11 @@ class Monster:
         Args:
         player_position (tuple): The (x, y) coordinates of the player's position.
         """
-        # Move towards the player horizontally or vertically
-        if self.position[0] < player_position[0] and self.position[0] < settings.GRID_WIDTH - 1:
-            self.position = (self.position[0] + 1, self.position[1])
-        elif self.position[0] > player_position[0] and self.position[0] > 0:
-            self.position = (self.position[0] - 1, self.position[1])
-        elif self.position[1] < player_position[1] and self.position[1] < settings.GRID_HEIGHT - 1:
-            self.position = (self.position[0], self.position[1] + 1)
-        elif self.position[1] > player_position[1] and self.position[1] > 0:
-            self.position = (self.position[0], self.position[1] - 1)
+        # Move one step along the shortest way to the player, going around walls
+        self.field.update(player_position)
+        self.position = self.field.step_towards(self.position)
 
-    # This is basically just the opposite of chase_player(). Can this code be less repetitive?
+    # Both directions come from the same distance field as chase_player()
     def avoid_player(self, player_position):
         """
         Moves the monster one step away from the player's position.
@@ -80,15 +84,13 @@ class Monster:
         Args:
         player_position (tuple): The (x, y) coordinates of the player's position.
         """
-        # Move away from the player horizontally or vertically
-        if self.position[0] > player_position[0] and self.position[0] < settings.GRID_WIDTH - 1:
-            self.position = (self.position[0] + 1, self.position[1])
-        elif self.position[0] < player_position[0] and self.position[0] > 0:
-            self.position = (self.position[0] - 1, self.position[1])
-        elif self.position[1] > player_position[1] and self.position[1] < settings.GRID_HEIGHT - 1:
-            self.position = (self.position[0], self.position[1] + 1)
-        elif self.position[1] < player_position[1] and self.position[1] > 0:
-            self.position = (self.position[0], self.position[1] - 1)
+        # Move to the neighbouring cell that is furthest from the player
+        self.field.update(player_position)
+        self.position = self.field.step_away(self.position)
+
+    def positions(self):
+        """Return the positions of every monster this object moves, which is just this one."""
+        return [self.position]
 
     def check_if_caught(self, player_position):
         """
@@ -111,16 +113,20 @@ class Monster:
         
         Args:
         player_position (tuple): The (x, y) coordinates of the player's position.
+
+        Returns:
+        list: The events the player can hear, e.g. a MonsterHowl.
         """
         
         # If repellent is active, the monster avoids the player
         if self.repellent_turns_left > 0:
             self.repellent_turns_left -= 1
             self.avoid_player(player_position)
+            return []
         # If the monster is close to the player and no repellent is active, it chases the player,
         elif self.is_near_player(player_position):
-            self.gui.display_message("You hear a bloodcurdling howl as a foul stench fills the air.")
             self.chase_player(player_position)
+            return [MonsterHowl()]
         # else it moves randomly
-        else:
-            self.random_move()
\ No newline at end of file
+        yawn = self.random_move()
+        return [yawn] if yawn else []
@@ -0,0 +1,123 @@
+# parser.py
+import string
+from fuzzy import SymSpellIndex
+from commands import commands_dict, command_templates, arguments_dict
+
+# Every punctuation mark except the apostrophe ("what's", "don't") is treated as a space
+PUNCTUATION = str.maketrans({char: " " for char in string.punctuation if char != "'"})
+
+def normalize(text):
+    """
+    Bring a phrase into the form used as a key in the parser's index.
+
+    Args:
+        text (str): Raw player input or a phrase from commands.py.
+
+    Returns:
+        str: Lowercase words separated by single spaces, without punctuation.
+    """
+    return " ".join(text.lower().translate(PUNCTUATION).split())
+
+class CommandParser:
+    CACHE_SIZE = 4096  # Players repeat the same few commands, so remember recent inputs
+    FUZZY_MAX_DISTANCE = 2  # How many typos a phrase may have and still be understood
+    FUZZY_EXCLUDE = ("quit", "cheat", "save", "stats")  # Never guess these actions from a typo
+
+    def __init__(self, commands=commands_dict, templates=command_templates, arguments=arguments_dict, max_distance=FUZZY_MAX_DISTANCE):
+        """
+        Build the phrase index once, so parsing a command is a dictionary lookup
+        instead of a scan over every phrase in commands.py.
+
+        Args:
+            commands (dict): Maps each action to the phrases that trigger it.
+            templates (dict): Maps an action to phrases with one <slot>, e.g. "go <direction>".
+            arguments (dict): Maps each slot name to {word: argument}.
+            max_distance (int): How many typos to forgive when no phrase matches exactly. 0 turns fuzzy matching off.
+        """
+        self.index = {}  # normalized phrase -> action
+        for action, phrases in commands.items():
+            for phrase in phrases:
+                self.index.setdefault(normalize(phrase), action)
+
+        self.max_distance = max_distance
+        self._fuzzy = None  # Built on the first typo, which keeps it out of the game's startup time
+
+        self.templates = {}  # (words before the slot, words after the slot) -> (action, slot name)
+        for action, phrases in templates.items():
+            for phrase in phrases:
+                before, _, rest = phrase.partition("<")
+                slot, _, after = rest.partition(">")
+                self.templates[(normalize(before), normalize(after))] = (action, slot)
+        self.arguments = arguments
+        self.argument_words = {word for values in arguments.values() for word in values}
+        self.cache = {}
+
+    @property
+    def fuzzy(self):
+        """The typo index over every phrase, built the first time it is needed."""
+        if self._fuzzy is None:
+            self._fuzzy = SymSpellIndex(self.max_distance)
+            for phrase, action in self.index.items():
+                if action not in self.FUZZY_EXCLUDE:
+                    self._fuzzy.add(phrase, action)
+        return self._fuzzy
+
+    def parse(self, player_input):
+        """
+        Look up the action for a line of player input.
+
+        Args:
+            player_input (str): The raw text the player typed.
+
+        Returns:
+            tuple: (action, argument). The argument is None unless a template matched,
+            and the action is None if nothing matched.
+        """
+        result = self.cache.get(player_input)
+        if result is None:
+            result = self.parse_uncached(player_input)
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.clear()
+            self.cache[player_input] = result
+        return result
+
+    def parse_uncached(self, player_input):
+        """Parse without the cache of recent inputs."""
+        action = self.index.get(player_input)  # Most input is already a plain phrase
+        if action is not None:
+            return action, None
+        text = normalize(player_input)
+        action = self.index.get(text)
+        if action is not None:
+            return action, None
+        action, argument = self.parse_template(text)
+        if action is not None:
+            return action, argument
+        return self.parse_fuzzy(text), None
+
+    def parse_template(self, text):
+        """Try every word that could fill a slot, with the words around it as the template."""
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if word not in self.argument_words:
+                continue
+            key = (" ".join(words[:i]), " ".join(words[i + 1:]))
+            if key in self.templates:
+                action, slot = self.templates[key]
+                argument = self.arguments[slot].get(word)
+                if argument is not None:
+                    return action, argument
+        return None, None
+
+    def parse_fuzzy(self, text):
+        """Find the action of the closest phrase, allowing fewer typos in short input."""
+        max_distance = min(self.max_distance, (len(text) + 1) // 3)
+        if max_distance <= 0:
+            return None
+        match = self.fuzzy.lookup(text, max_distance)
+        if match is None:
+            return None
+        return match[1]
+
+# Create a single instance of the CommandParser class
+command_parser = CommandParser()
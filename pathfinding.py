@@ -0,0 +1,198 @@
+# pathfinding.py
+import heapq
+from grid import WALL
+from utils import calculate_distance
+
+class DistanceField:
+    __slots__ = ("grid", "source", "version", "distances", "frontier", "head")
+
+    # Neighbours are tried in this order, so ties are broken the same way the monster always moved: sideways first
+    DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    # How far from the source step_away() searches. A fleeing monster further away than this only
+    # steps away as the crow flies, so fleeing never floods the whole map.
+    FLEE_LIMIT = 16
+
+    def __init__(self, grid):
+        """
+        The number of steps from one position (the player) to every other cell, going around walls.
+
+        The field is filled in with a breadth-first search, but only as far as the questions asked of it
+        need, and it is kept until the player moves or a wall changes. Every monster on the map can
+        read its next step from the same field.
+
+        Args:
+            grid (GridState): The map, used for its size and walls.
+        """
+        self.grid = grid
+        self.source = None
+        self.version = None
+        self.distances = {}  # Steps from the source by cell index, only for the cells found so far
+        self.frontier = []  # Cell indexes in the order they were found
+        self.head = 0  # frontier[head:] are found but not expanded yet (a list is much smaller than a deque)
+
+    def update(self, source):
+        """
+        Measure distances from a new position. Nothing is recomputed if neither it nor the walls changed.
+
+        Args:
+            source (tuple): The (x, y) position to measure from.
+        """
+        if source == self.source and self.grid.version == self.version:
+            return
+        self.source = source
+        self.version = self.grid.version
+        start = self.grid.index(source)
+        # A fresh dict per search, so memory grows with how far the searches go, not with the size of the map
+        self.distances = {start: 0}
+        self.frontier = [start]
+        self.head = 0
+
+    def expand(self, target=None, limit=None):
+        """
+        Continue the search until a cell has been reached, or everything up to a distance has been found.
+
+        Args:
+            target (int): Stop once this cell index has a distance.
+            limit (int): Stop once every cell closer than this has a distance.
+        """
+        width = self.grid.width
+        cells = self.grid.cells
+        distances = self.distances
+        frontier = self.frontier
+        head = self.head
+        while head < len(frontier) and (target is None or target not in distances):
+            index = frontier[head]
+            distance = distances[index]
+            if limit is not None and distance >= limit:
+                break
+            head += 1
+            x = index % width
+            for dx, dy in self.DIRECTIONS:
+                if not 0 <= x + dx < width:
+                    continue
+                neighbour = index + dx + dy * width
+                if 0 <= neighbour < len(cells) and neighbour not in distances and not cells[neighbour] & WALL:
+                    distances[neighbour] = distance + 1
+                    frontier.append(neighbour)
+        self.head = head
+
+    def distance(self, position, limit=None):
+        """
+        Count the steps from the source to a position.
+
+        Args:
+            position (tuple): The (x, y) position to measure to.
+            limit (int): Don't search further than this many steps.
+
+        Returns:
+            int: The number of steps, or None if the position can't be reached (within the limit).
+        """
+        if limit is not None and calculate_distance(self.source, position) > limit:
+            return None  # Walls only ever make the way longer
+        index = self.grid.index(position)
+        self.expand(index, limit)
+        distance = self.distances.get(index)
+        if distance is None or (limit is not None and distance > limit):
+            return None
+        return distance
+
+    def neighbours(self, position):
+        """Yield the open cells next to a position."""
+        x, y = position
+        for dx, dy in self.DIRECTIONS:
+            neighbour = (x + dx, y + dy)
+            if self.grid.in_bounds(neighbour) and not self.grid.has(neighbour, WALL):
+                yield neighbour
+
+    def step_towards(self, position):
+        """
+        Pick the next position on a shortest way from a position to the source.
+
+        Returns:
+            tuple: The next position, or the same position if there is no way closer.
+        """
+        current = self.distance(position)
+        if current is None:
+            return position
+        for neighbour in self.neighbours(position):
+            distance = self.distance(neighbour, current)
+            if distance is not None and distance < current:
+                return neighbour
+        return position
+
+    def step_away(self, position):
+        """
+        Pick the neighbouring position furthest from the source.
+
+        Only cells within FLEE_LIMIT steps of the source are searched. Further out, the neighbour
+        furthest as the crow flies is picked, which is the same one on open ground.
+
+        Returns:
+            tuple: The next position, or the same position if no neighbour is further away.
+        """
+        current = self.distance(position, self.FLEE_LIMIT)
+        if current is None:
+            # Too far away, or walled off, to be worth searching for
+            current = calculate_distance(self.source, position)
+            best, best_distance = position, current
+            for neighbour in self.neighbours(position):
+                distance = calculate_distance(self.source, neighbour)
+                if distance > best_distance:
+                    best, best_distance = neighbour, distance
+            return best
+        best, best_distance = position, current
+        for neighbour in self.neighbours(position):
+            distance = self.distance(neighbour, current + 1)
+            if distance is not None and distance > best_distance:
+                best, best_distance = neighbour, distance
+        return best
+
+def find_path(grid, start, goal, limit=None):
+    """
+    Find a shortest way between two positions with A*, for one-off questions
+    where building a whole distance field would be wasteful.
+
+    Args:
+        grid (GridState): The map, used for its size and walls.
+        start (tuple): The (x, y) position to start from.
+        goal (tuple): The (x, y) position to reach.
+        limit (int): Give up after looking at this many cells. A goal that can't be reached
+            otherwise costs a search of everything reachable from the start.
+
+    Returns:
+        list: The positions from start to goal, both included, or None if the goal can't be reached
+            (within the limit).
+    """
+    if start != goal:
+        if not grid.in_bounds(goal) or grid.has(goal, WALL):
+            return None
+        x, y = goal
+        if not any(grid.in_bounds((x + dx, y + dy)) and not grid.has((x + dx, y + dy), WALL) for dx, dy in DistanceField.DIRECTIONS):
+            return None  # Walled in on every side
+    came_from = {start: None}
+    cost = {start: 0}
+    queue = [(calculate_distance(start, goal), 0, start)]
+    while queue:
+        _, steps, position = heapq.heappop(queue)
+        if position == goal:
+            path = []
+            while position is not None:
+                path.append(position)
+                position = came_from[position]
+            return path[::-1]
+        if steps > cost[position]:
+            continue  # A shorter way here was already found
+        if limit is not None:
+            limit -= 1
+            if limit < 0:
+                return None
+        x, y = position
+        for dx, dy in DistanceField.DIRECTIONS:
+            neighbour = (x + dx, y + dy)
+            if not grid.in_bounds(neighbour) or grid.has(neighbour, WALL):
+                continue
+            if steps + 1 < cost.get(neighbour, steps + 2):
+                cost[neighbour] = steps + 1
+                came_from[neighbour] = position
+                heapq.heappush(queue, (steps + 1 + calculate_distance(neighbour, goal), steps + 1, neighbour))
+    return None
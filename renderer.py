@@ -0,0 +1,138 @@
+# renderer.py
+from grid import EXPLORED, SEARCHED, WALL
+
+CELL_WIDTH = 2  # Every map symbol is a character followed by a space
+MAX_CACHED_ROWS = 256  # Forget rows far outside the view once this many are cached
+
+MAP_LEGEND = [
+    '♙ - You are here.',
+    '⛝ - Spots where you\'ve already dug.',
+    '♞ - The MONSTER.',
+    '⬕ - The exit.',
+]
+CAVE_LEGEND = MAP_LEGEND + ['▦ - Solid rock.']
+
+def map_legend(cave=False):
+    """The lines explaining the map's symbols. Rock is only explained in caves, the only maps that have it."""
+    return CAVE_LEGEND if cave else MAP_LEGEND
+
+def base_symbol(cell):
+    """Pick the symbol for a cell's flags, before the player, monster and exit are drawn on top."""
+    if cell & WALL:
+        return '▦ '
+    if cell & SEARCHED:
+        return '⛝ '
+    return '⬚ '
+
+SYMBOLS = [base_symbol(cell) for cell in range(256)]  # The symbol for every possible byte of flags
+FOG_SYMBOLS = [SYMBOLS[cell] if cell & EXPLORED else '  ' for cell in range(256)]  # Cells never seen stay blank
+
+class MapRenderer:
+    __slots__ = ("grid", "symbols", "rows", "row_text", "overlays", "dirty")
+
+    def __init__(self, grid, fog=False):
+        """
+        Draw the map as text, keeping the rows from the last frame so that only
+        the cells that changed since then have to be drawn again. Only the cells
+        inside the view are ever drawn, however wide the map is.
+
+        Args:
+            grid (GridState): The map to draw.
+            fog (bool): Only draw the cells the player has explored.
+        """
+        self.grid = grid
+        self.symbols = FOG_SYMBOLS if fog else SYMBOLS
+        self.rows = {}  # y -> (left, list of the symbols of the row's cells from left to the right edge of the view)
+        self.row_text = {}  # y -> the cached part of the row joined into one string
+        self.overlays = {}  # position -> symbol drawn on top of the cell in the last frame
+        self.dirty = []  # positions whose symbol has to be worked out again
+
+    def mark_dirty(self, position):
+        """Tell the renderer a cell's flags changed, e.g. because the player dug there."""
+        self.dirty.append(position)
+
+    def viewport(self, center, size):
+        """
+        Work out which part of the map is visible.
+
+        Args:
+            center (tuple): Keep this (x, y) position in the middle of the view.
+            size (tuple): (width, height) of the view, or None for the whole map.
+
+        Returns:
+            tuple: (left, top, right, bottom), with right and bottom excluded.
+        """
+        if size is None:
+            return 0, 0, self.grid.width, self.grid.height
+        width = min(size[0], self.grid.width)
+        height = min(size[1], self.grid.height)
+        left = min(max(center[0] - width // 2, 0), self.grid.width - width)
+        top = min(max(center[1] - height // 2, 0), self.grid.height - height)
+        return left, top, left + width, top + height
+
+    def render(self, overlays, center=(0, 0), viewport=None):
+        """
+        Draw the visible part of the map.
+
+        Args:
+            overlays (dict): Maps positions to the symbol drawn on top, e.g. the player and the monster.
+            center (tuple): The position the viewport follows.
+            viewport (tuple): (width, height) of the visible region, or None to draw the whole map.
+
+        Returns:
+            str: The map, one line per row.
+        """
+        # Cells that had something drawn on them last frame, or have something now, have to be redrawn
+        for position, symbol in self.overlays.items():
+            if overlays.get(position) != symbol:
+                self.dirty.append(position)
+        for position, symbol in overlays.items():
+            if self.overlays.get(position) != symbol:
+                self.dirty.append(position)
+        self.overlays = dict(overlays)
+
+        for position in self.dirty:
+            x, y = position
+            cached = self.rows.get(y)
+            if cached is not None:  # Rows that aren't cached are built from scratch when they're needed
+                row_left, row = cached
+                if row_left <= x < row_left + len(row):
+                    row[x - row_left] = self.overlays.get(position) or self.symbols[self.grid.cells[self.grid.index(position)]]
+                    self.row_text.pop(y, None)
+        self.dirty.clear()
+
+        left, top, right, bottom = self.viewport(center, viewport)
+        if len(self.rows) > MAX_CACHED_ROWS:
+            self.forget_rows_outside(top, bottom)
+        lines = []
+        for y in range(top, bottom):
+            cached = self.rows.get(y)
+            if cached is None or cached[0] != left or len(cached[1]) != right - left:
+                # The view moved sideways, so the row is drawn again for the cells now in view
+                self.rows[y] = (left, self.build_row(y, left, right))
+                self.row_text.pop(y, None)
+            text = self.row_text.get(y)
+            if text is None:
+                text = self.row_text[y] = ''.join(self.rows[y][1])
+            lines.append(text)
+        return '\n'.join(lines)
+
+    def build_row(self, y, left, right):
+        """Draw the cells of one row from left up to right from scratch."""
+        row = list(map(self.symbols.__getitem__, self.grid.row(y)[left:right]))
+        for (x, overlay_y), symbol in self.overlays.items():
+            if overlay_y == y and left <= x < right:
+                row[x - left] = symbol
+        return row
+
+    def forget_rows(self, top, bottom):
+        """Drop cached rows from top up to bottom, e.g. because new walls were carved into them."""
+        for y in [y for y in self.rows if top <= y < bottom]:
+            del self.rows[y]
+            self.row_text.pop(y, None)
+
+    def forget_rows_outside(self, top, bottom):
+        """Drop cached rows that are not visible to keep memory bounded on big maps."""
+        for y in [y for y in self.rows if not top <= y < bottom]:
+            del self.rows[y]
+            self.row_text.pop(y, None)
@@ -0,0 +1,149 @@
+# replay.py
+import argparse
+import hashlib
+import json
+import time
+from game import Game
+from headless import HeadlessGUI
+
+LOG_VERSION = 1
+
+def state_hash(game):
+    """
+    Fingerprint everything a turn can change: positions, the monsters, the inventory and the map.
+
+    Returns:
+        str: A short hex digest. Two games with the same digest are in the same state.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    monster = game.monster
+    digest.update(repr((
+        game._player, game._key, game._exit,
+        monster.positions(), monster.repellent_turns_left,
+        game.inventory.owned, game.awaiting_play_again, game.outcome,
+    )).encode())
+    digest.update(game.inventory.counts.tobytes())
+    digest.update(game.grid.cells)
+    return digest.hexdigest()
+
+class ReplayMismatch(Exception):
+    """A replayed game ended up in a different state than the recorded one."""
+    def __init__(self, turn, expected, actual):
+        super().__init__(f"Turn {turn}: expected state {expected}, got {actual}")
+        self.turn = turn
+        self.expected = expected
+        self.actual = actual
+
+class GameLog:
+    def __init__(self, path=None):
+        """
+        An append-only record of one game: its seed and options, then every input with the state hash after it.
+
+        The log is a JSON Lines file. The first line is the header and every other line is one turn,
+        written as soon as the turn has been played, so a log survives the game crashing.
+
+        Args:
+            path (str): File to append the log to. None keeps it in memory only.
+        """
+        self.path = path
+        self.header = None
+        self.turns = []  # (input, state hash) for every turn
+        self.file = None
+
+    def start(self, game):
+        """Called by Game when it is created, to write down what is needed to create it again."""
+        self.header = {
+            "version": LOG_VERSION,
+            "seed": game.seed,
+            "width": game.map_size[0],
+            "height": game.map_size[1],
+            "monsters": game.monster_count,
+            "treasures": game.treasure_count,
+            "cave": game.cave_mode,
+            "fog": game.fog_mode,
+        }
+        if self.path:
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.write(self.header)
+
+    def record(self, player_input, game):
+        """Called by Game after every turn."""
+        turn = (player_input, state_hash(game))
+        self.turns.append(turn)
+        if self.file:
+            self.write({"input": turn[0], "hash": turn[1]})
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    @classmethod
+    def load(cls, path):
+        """Read a log written by a previous game."""
+        log = cls()
+        with open(path, encoding="utf-8") as file:
+            log.header = json.loads(file.readline())
+            if log.header.get("version") != LOG_VERSION:
+                raise ValueError(f"{path}: unsupported log version {log.header.get('version')}")
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    log.turns.append((entry["input"], entry["hash"]))
+        return log
+
+def replay(log, verify=True):
+    """
+    Play a logged game again without a GUI, as fast as possible.
+
+    Args:
+        log (GameLog): The game to play.
+        verify (bool): Check the state after every turn against the recorded hash.
+
+    Returns:
+        Game: The game in the state after the last turn.
+
+    Raises:
+        ReplayMismatch: If verify is on and a turn doesn't end in the recorded state.
+    """
+    header = log.header
+    game = Game(HeadlessGUI(keep_messages=False), header["width"], header["height"],
+                monsters=header["monsters"], treasures=header.get("treasures", 0), seed=header["seed"],
+                cave=header.get("cave", False), fog=header.get("fog", False))
+    for turn, (player_input, expected) in enumerate(log.turns, start=1):
+        game.run(player_input)
+        if verify:
+            actual = state_hash(game)
+            if actual != expected:
+                raise ReplayMismatch(turn, expected, actual)
+    return game
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded games and check they still play out the same way.")
+    parser.add_argument("logs", nargs="+", help="Game logs written with --record")
+    parser.add_argument("--no-verify", action="store_true", help="Only measure speed, don't compare state hashes")
+    args = parser.parse_args()
+
+    logs = [GameLog.load(path) for path in args.logs]
+    turns = sum(len(log.turns) for log in logs)
+    failures = 0
+    start = time.perf_counter()
+    for path, log in zip(args.logs, logs):
+        try:
+            replay(log, verify=not args.no_verify)
+        except ReplayMismatch as error:
+            failures += 1
+            print(f"{path}: {error}")
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(logs)} games, {turns} turns in {elapsed:.2f}s ({turns / max(elapsed, 1e-9):,.0f} turns/s)")
+    if failures:
+        print(f"{failures} of {len(logs)} games did not replay the same way")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# server.py
+import argparse
+import asyncio
+from events import Cleared, MapShown, Quit
+from game import Game
+
+END_OF_TURN = "."  # Sent on a line of its own after each turn's output
+
+class SessionOutput:
+    """Stands in for the GUI of one network session and collects what a turn prints."""
+    def __init__(self):
+        self.lines = []
+        self.quit_requested = False
+
+    def handle(self, events):
+        """Collect one turn's events as lines."""
+        lines = self.lines
+        for event in events:
+            kind = type(event)
+            if kind is MapShown:
+                lines.append(event.map_text)
+            elif kind is Cleared:
+                lines.clear()
+            elif kind is Quit:
+                self.quit_requested = True
+            else:
+                lines.extend(event.lines())
+
+    def flush(self, writer):
+        """Send the collected lines and the end-of-turn marker."""
+        self.lines.append(END_OF_TURN)
+        writer.write(("\n".join(self.lines) + "\n").encode())
+        self.lines.clear()
+
+class GameServer:
+    def __init__(self, game_options=None):
+        """
+        Host many independent games over a simple line protocol: the client sends one command
+        per line, and the server answers with the turn's output followed by a line with a single ".".
+
+        Args:
+            game_options (dict): Keyword arguments for every session's Game, e.g. the map size.
+        """
+        self.game_options = game_options or {}
+        self.sessions = 0  # Sessions currently connected
+
+    async def handle_session(self, reader, writer):
+        """Play one game for as long as the client stays connected."""
+        output = SessionOutput()
+        game = Game(output, **self.game_options)  # Each session has its own map, monster, inventory and settings
+        self.sessions += 1
+        try:
+            output.flush(writer)
+            await writer.drain()
+            while not output.quit_requested:
+                line = await reader.readline()
+                if not line:
+                    break
+                game.run(line.decode(errors="replace").strip())
+                output.flush(writer)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        """Accept sessions until the task is cancelled."""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_session, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_session, host, port, backlog=4096)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many games over TCP or a Unix socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--width", type=int, help="Map width (default: random)")
+    parser.add_argument("--height", type=int, help="Map height (default: random)")
+    args = parser.parse_args()
+
+    server = GameServer({"width": args.width, "height": args.height})
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
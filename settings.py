@@ -1,26 +1,61 @@
 import random
+from utils import pack_position, unpack_position
 
 class Settings:
-    def __init__(self):
-        self.reset()
+    __slots__ = (
+        "GRID_WIDTH", "GRID_HEIGHT", "VIEWPORT_WIDTH", "VIEWPORT_HEIGHT", "rng",
+        "_player", "_key", "_exit", "_monster",  # Starting positions packed into ints
+    )
 
-    def reset(self):
+    def __init__(self, width=None, height=None, rng=random):
+        """
+        Args:
+            width (int): Use a map this wide instead of a random width.
+            height (int): Use a map this tall instead of a random height.
+            rng (random.Random): Where the random sizes and positions come from, so seeded games repeat exactly.
+        """
+        self.rng = rng
+        self.reset(width, height)
+
+    def reset(self, width=None, height=None):
         """
         Resets all settings to their initial random state, including when the game starts.
         Change any initial settings here
+
+        Args:
+            width (int): Use a map this wide instead of a random width.
+            height (int): Use a map this tall instead of a random height.
         """
-        self.GRID_WIDTH = random.randint(4, 8) # The map will not be larger than 8x8
-        self.GRID_HEIGHT = random.randint(4, 8)
+        self.GRID_WIDTH = width or self.rng.randint(4, 8) # Random maps will not be larger than 8x8
+        self.GRID_HEIGHT = height or self.rng.randint(4, 8)
+        self.VIEWPORT_WIDTH = 16 # The torch shows at most this much of the map around the player
+        self.VIEWPORT_HEIGHT = 12
         # self.DEFAULT_NUM_OF_TORCHES = 3
-        self.DEFAULT_SEARCHED_POSITIONS = []
-        self.DEFAULT_PLAYER_POS = self.randomize_position()
-        self.DEFAULT_KEY_POS = self.randomize_position()
-        self.DEFAULT_EXIT_POS = self.randomize_position()
-        self.DEFAULT_MONSTER_POS = self.randomize_position()
+        # The player, key, exit and monster each get a cell of their own, as long as the map has room
+        taken = set()
+        for name in ("_player", "_key", "_exit", "_monster"):
+            position = self.randomize_position()
+            while position in taken and len(taken) < self.GRID_WIDTH * self.GRID_HEIGHT:
+                position = self.randomize_position()
+            taken.add(position)
+            setattr(self, name, pack_position(position))
+
+    @property
+    def DEFAULT_PLAYER_POS(self):
+        return unpack_position(self._player)
+
+    @property
+    def DEFAULT_KEY_POS(self):
+        return unpack_position(self._key)
+
+    @property
+    def DEFAULT_EXIT_POS(self):
+        return unpack_position(self._exit)
+
+    @property
+    def DEFAULT_MONSTER_POS(self):
+        return unpack_position(self._monster)
 
     def randomize_position(self):
         """Generate a random position within the grid."""
-        return (random.randint(0, self.GRID_WIDTH - 1), random.randint(0, self.GRID_HEIGHT - 1))
-
-# Create a single instance of the Settings class
-settings = Settings()
\ No newline at end of file
+        return (self.rng.randint(0, self.GRID_WIDTH - 1), self.rng.randint(0, self.GRID_HEIGHT - 1))
@@ -0,0 +1,195 @@
+# simulator.py
+import argparse
+import os
+import random
+from collections import Counter
+from multiprocessing import Pool
+from commands import commands_dict
+from game import Game
+from headless import HeadlessGUI
+from replay import GameLog
+
+# Actions the input policies are allowed to pick from. "quit" and "cheat" are left out on purpose.
+PLAYABLE_ACTIONS = ["up", "down", "left", "right", "dig", "torch", "sweep", "repel", "inventory", "unlock", "help"]
+
+class RandomPolicy:
+    """Pick a random phrase for a random playable action every turn."""
+    def __init__(self, actions=PLAYABLE_ACTIONS):
+        self.phrases = [phrase for action in actions for phrase in commands_dict[action]]
+
+    def choose(self, game, turn, rng):
+        return rng.choice(self.phrases)
+
+class ScriptedPolicy:
+    """Play a fixed list of inputs, one per turn. The game is abandoned when the script runs out."""
+    def __init__(self, script, repeat=False):
+        self.script = list(script)
+        self.repeat = repeat
+
+    def choose(self, game, turn, rng):
+        if self.repeat:
+            return self.script[turn % len(self.script)]
+        if turn < len(self.script):
+            return self.script[turn]
+        return None
+
+def random_policy(max_turns):
+    return RandomPolicy()
+
+def known_key_policy(max_turns):
+    """The solver's best play, knowing where the key is. Needs NumPy, so it is only imported when asked for."""
+    from solver import KnownKeyPolicy
+    return KnownKeyPolicy()
+
+def hidden_key_policy(max_turns):
+    """The solver's best play when searching for the key, within the game's turn limit. Only for tiny maps."""
+    from solver import HiddenKeyPolicy
+    return HiddenKeyPolicy(max_turns)
+
+# Every policy is made knowing the turn limit, which only the hidden-key solver plays to
+POLICIES = {
+    "random": random_policy,
+    "known-key": known_key_policy,
+    "hidden-key": hidden_key_policy,
+}
+
+def play_game(seed, policy, max_turns=500, map_size=(None, None), monsters=1, log=None, treasures=0, cave=False, fog=False, analytics=None):
+    """
+    Play one seeded game without a GUI.
+
+    Args:
+        seed (int): Seed for the game's randomness. The same seed and policy always play the same game.
+        policy: Any object with a choose(game, turn, rng) method returning the next input (or None to stop).
+        max_turns (int): Give up after this many turns.
+        map_size (tuple): (width, height) of the map. None picks a random size as usual.
+        monsters (int): How many monsters are in the cave.
+        log (GameLog): Record the game's inputs here, e.g. to build a replay corpus.
+        treasures (int): How many gems are buried around the map.
+        cave (bool): Play in a cave with walls.
+        fog (bool): Play in fog of war.
+        analytics (OutcomeWriter): Add a record of the game here, see analytics.py.
+
+    Returns:
+        tuple: (outcome, turns) where outcome is "escaped", "caught", "quit", "abandoned" or "timeout".
+    """
+    policy_rng = random.Random(seed ^ 0x5EED)  # Keep the policy's choices independent of the game's rolls
+    gui = HeadlessGUI(keep_messages=False)
+    tally = None
+    if analytics is not None:
+        from analytics import GameTally
+        tally = GameTally()  # Counts what the game's events add up to
+    game = Game(gui, *map_size, monsters=monsters, treasures=treasures, seed=seed, log=log, cave=cave, fog=fog, event_log=tally)
+
+    outcome, turns = "timeout", max_turns
+    for turn in range(max_turns):
+        player_input = policy.choose(game, turn, policy_rng)
+        if player_input is None:
+            outcome, turns = "abandoned", turn
+            break
+        game.run(player_input)
+        if game.outcome:
+            outcome, turns = game.outcome, turn + 1
+            break
+        if gui.quit_requested:
+            outcome, turns = "quit", turn + 1
+            break
+    if analytics is not None:
+        analytics.append(seed, outcome, turns, game.settings, tally)
+    return outcome, turns
+
+def play_chunk(task):
+    """Play a contiguous range of seeds in a worker process and return the totals."""
+    first_seed, count, policy, max_turns, map_size, monsters, treasures, record_dir, cave, fog, analytics_dir = task
+    outcomes = Counter()
+    turns = Counter()
+    analytics = None
+    if analytics_dir:
+        from analytics import OutcomeWriter
+        analytics = OutcomeWriter(analytics_dir, f"games-{first_seed}")
+    for seed in range(first_seed, first_seed + count):
+        log = GameLog(os.path.join(record_dir, f"game-{seed}.jsonl")) if record_dir else None
+        outcome, turns_taken = play_game(seed, policy, max_turns, map_size, monsters, log, treasures, cave, fog, analytics)
+        if log:
+            log.close()
+        outcomes[outcome] += 1
+        turns[outcome] += turns_taken
+    if analytics:
+        analytics.close()
+    return outcomes, turns
+
+def run_batch(games, policy, first_seed=0, processes=None, max_turns=500, chunk_size=1000, map_size=(None, None), monsters=1, record_dir=None, treasures=0, cave=False, fog=False, analytics_dir=None):
+    """
+    Play many seeded games on a process pool.
+
+    Games are handed out in chunks of seeds so that only the totals travel back between processes,
+    which keeps runs of millions of games cheap on memory. With record_dir set, every game is also
+    logged to its own file there, ready to be checked with replay.py. With analytics_dir set, a record
+    of every game is streamed to disk there for analytics.py, a file per chunk of seeds.
+
+    Returns:
+        dict: Game counts and average turns per outcome.
+    """
+    tasks = [
+        (seed, min(chunk_size, first_seed + games - seed), policy, max_turns, map_size, monsters, treasures, record_dir, cave, fog, analytics_dir)
+        for seed in range(first_seed, first_seed + games, chunk_size)
+    ]
+    outcomes = Counter()
+    turns = Counter()
+
+    def add(result):
+        chunk_outcomes, chunk_turns = result
+        outcomes.update(chunk_outcomes)
+        turns.update(chunk_turns)
+
+    if processes == 1:
+        for result in map(play_chunk, tasks):
+            add(result)
+    else:
+        with Pool(processes) as pool:
+            for result in pool.imap_unordered(play_chunk, tasks):
+                add(result)
+
+    return {
+        "games": games,
+        "outcomes": dict(outcomes),
+        "average_turns": {outcome: turns[outcome] / outcomes[outcome] for outcome in outcomes},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many headless games for balance and regression runs.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--script", help="Play this file of inputs (one per line) instead of a policy")
+    parser.add_argument("--max-turns", type=int, default=500)
+    parser.add_argument("--width", type=int, help="Map width (default: random)")
+    parser.add_argument("--height", type=int, help="Map height (default: random)")
+    parser.add_argument("--monsters", type=int, default=1)
+    parser.add_argument("--treasures", type=int, default=0, help="Gems buried around each map")
+    parser.add_argument("--cave", action="store_true", help="Play in caves with walls")
+    parser.add_argument("--fog", action="store_true", help="Play in fog of war")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--record", metavar="DIR", help="Log every game to this directory for replay.py")
+    parser.add_argument("--analytics", metavar="DIR", help="Stream a record of every game to this directory for analytics.py")
+    args = parser.parse_args()
+    if args.analytics and os.path.isdir(args.analytics) and os.listdir(args.analytics):
+        # Records left by another run would be counted together with this one's
+        parser.error(f"--analytics directory {args.analytics} is not empty")
+    for directory in (args.record, args.analytics):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    if args.script:
+        with open(args.script) as f:
+            policy = ScriptedPolicy(line.strip() for line in f if line.strip())
+    else:
+        policy = POLICIES[args.policy](args.max_turns)
+
+    result = run_batch(args.games, policy, args.seed, args.processes, args.max_turns, args.chunk_size, (args.width, args.height), args.monsters, args.record, args.treasures, args.cave, args.fog, args.analytics)
+    print(f"Played {result['games']} games")
+    for outcome, count in sorted(result["outcomes"].items()):
+        print(f"{outcome}: {count} ({count / result['games']:.1%}), {result['average_turns'][outcome]:.1f} turns on average")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# snapshot.py
+import random
+import re
+import struct
+import sys
+import zlib
+from array import array
+from grid import GridState
+from inventory import Inventory, ITEM_NAMES, item_id
+from loot import table_for_map
+from monster import Monster
+from pathfinding import DistanceField
+from settings import Settings
+from spatial import SpatialIndex
+from utils import pack_position, unpack_position
+
+MAGIC = b"GADV"
+VERSION = 4  # 2 added buried treasure, 3 added caves, 4 added fog of war
+
+# Bits of the flags byte in the preamble
+COMPRESSED = 1  # Everything after the preamble is zlib-compressed
+SPARSE = 2      # The grid is stored as a list of non-empty cells instead of every cell
+
+# magic, version, flags
+PREAMBLE = struct.Struct("<4sHB")
+# width, height, viewport width, viewport height, map size options (0 = random), monster count, seed,
+# player, key and exit positions, starting player, key, exit and monster positions, awaiting play again, outcome
+HEADER = struct.Struct("<IIHHIIIq3q4qBB")
+# Version 2 and up: how many gems each new game buries
+TREASURES = struct.Struct("<I")
+# Version 2 and up: number of buried things, length of the names of their kinds
+BURIED = struct.Struct("<II")
+# Version 3 and up: whether the game has a cave, its seed, its chunk size and how many chunks have been carved
+CAVE = struct.Struct("<BQHI")
+# Version 4 and up: whether the game is played in fog of war. The cells explored are flags in the grid.
+FOG = struct.Struct("<B")
+# Whether gauss_next is set, gauss_next, and the position in the Mersenne Twister's 624 words
+RNG_TAIL = struct.Struct("<BdI")
+# Number of items, length of their names, bitmask of items ever owned
+ITEMS = struct.Struct("<HIQ")
+# state, increment, has_uint32 and uinteger of a swarm's NumPy PCG64 generator
+SWARM_RNG = struct.Struct("<16s16sBI")
+COUNT = struct.Struct("<I")
+
+COMPRESSION_LEVEL = 1  # Saving happens in the middle of a turn, so speed matters more than the last few bytes
+
+OUTCOMES = [None, "escaped", "caught"]
+NON_EMPTY = re.compile(b"[^\\x00]")
+
+def packed_array(typecode, values):
+    """Make an array in little-endian byte order, whatever the machine's order is."""
+    values = array(typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+class Reader:
+    """Reads the parts of a snapshot one after the other."""
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def array(self, typecode, count):
+        values = array(typecode)
+        end = self.offset + count * values.itemsize
+        values.frombytes(self.data[self.offset:end])
+        if sys.byteorder == "big":
+            values.byteswap()
+        self.offset = end
+        return values
+
+    def bytes(self, length):
+        end = self.offset + length
+        value = self.data[self.offset:end]
+        self.offset = end
+        return value
+
+def non_empty_cells(cells, block_size=1 << 16):
+    """Yield the index of every non-zero cell, skipping over blocks of empty ones without looking at each cell."""
+    for start in range(0, len(cells), block_size):
+        end = start + block_size
+        if cells.count(0, start, end) < min(end, len(cells)) - start:
+            for match in NON_EMPTY.finditer(cells, start, end):
+                yield match.start()
+
+def dumps(game, compress=True):
+    """
+    Pack the whole state of a game into a compact binary snapshot.
+
+    Args:
+        game (Game): The game to save.
+        compress (bool): Compress everything after the preamble with zlib.
+
+    Returns:
+        bytes: The snapshot.
+    """
+    settings = game.settings
+    grid = game.grid
+    flags = COMPRESSED if compress else 0
+    parts = []
+
+    map_width, map_height = game.map_size
+    parts.append(HEADER.pack(
+        grid.width, grid.height, settings.VIEWPORT_WIDTH, settings.VIEWPORT_HEIGHT,
+        map_width or 0, map_height or 0, game.monster_count, game.seed,
+        game._player, game._key, game._exit,
+        settings._player, settings._key, settings._exit, settings._monster,
+        game.awaiting_play_again, OUTCOMES.index(game.outcome),
+    ))
+    parts.append(TREASURES.pack(game.treasure_count))
+
+    _, words, gauss_next = game.rng.getstate()
+    parts.append(packed_array('I', words[:-1]).tobytes())
+    parts.append(RNG_TAIL.pack(gauss_next is not None, gauss_next or 0.0, words[-1]))
+
+    # Items are stored by name, because item numbers are only handed out as items are first seen
+    counts = game.inventory.counts
+    names = "\0".join(ITEM_NAMES[:len(counts)]).encode()
+    parts.append(ITEMS.pack(len(counts), len(names), game.inventory.owned))
+    parts.append(names)
+    parts.append(packed_array('i', counts).tobytes())
+
+    monster = game.monster
+    positions = monster.positions()
+    parts.append(COUNT.pack(len(positions)))
+    parts.append(packed_array('q', [pack_position(position) for position in positions]).tobytes())
+    if isinstance(monster, Monster):
+        parts.append(packed_array('h', [monster.repellent_turns_left]).tobytes())
+    else:
+        parts.append(packed_array('h', monster.repellent.tolist()).tobytes())
+        state = monster.rng.bit_generator.state
+        parts.append(SWARM_RNG.pack(
+            state["state"]["state"].to_bytes(16, "little"), state["state"]["inc"].to_bytes(16, "little"),
+            state["has_uint32"], state["uinteger"],
+        ))
+
+    # What is buried, by name like the items
+    buried = list(game.buried)
+    kinds = sorted({kind for _, kind in buried})
+    kind_names = "\0".join(kinds).encode()
+    parts.append(BURIED.pack(len(buried), len(kind_names)))
+    parts.append(kind_names)
+    parts.append(packed_array('q', [pack_position(position) for position, _ in buried]).tobytes())
+    parts.append(bytes(kinds.index(kind) for _, kind in buried))
+
+    # The walls already carved are in the grid, so only what is needed to carve the rest is stored
+    cave = game.cave
+    if cave is None:
+        parts.append(CAVE.pack(game.cave_mode, 0, 0, 0))
+    else:
+        generator = cave.generator
+        parts.append(CAVE.pack(True, generator.seed, generator.chunk_size, len(cave.generated)))
+        parts.append(packed_array('q', [pack_position(chunk) for chunk in sorted(cave.generated)]).tobytes())
+    parts.append(FOG.pack(game.fog_mode))
+
+    # The grid goes last. Storing only the non-empty cells costs 5 bytes each instead of 1 byte for every cell.
+    cells = grid.cells
+    if (len(cells) - cells.count(0)) * 5 < len(cells):
+        flags |= SPARSE
+        indexes = packed_array('I', non_empty_cells(cells))
+        parts.append(COUNT.pack(len(indexes)))
+        parts.append(indexes.tobytes())
+        parts.append(bytes(cells[index] for index in indexes))
+    else:
+        parts.append(cells)
+
+    body = b"".join(parts)
+    if compress:
+        body = zlib.compress(body, COMPRESSION_LEVEL)
+    return PREAMBLE.pack(MAGIC, VERSION, flags) + body
+
+def save(game, path, compress=True):
+    """Write a snapshot of a game to a file."""
+    with open(path, "wb") as file:
+        file.write(dumps(game, compress))
+
+def load(path):
+    """Read a snapshot from a file, ready to be passed to Game(gui, snapshot=...)."""
+    with open(path, "rb") as file:
+        return file.read()
+
+def restore(game, data):
+    """
+    Fill in a game from a snapshot. Called by Game when it is created with one.
+
+    Only what was saved is decoded: the map's renderer and the monsters' distance field start empty
+    and are filled in as the game needs them, so resuming a huge, mostly unexplored map is quick.
+
+    Args:
+        game (Game): A game that hasn't been reset yet.
+        data (bytes): A snapshot made by dumps().
+    """
+    magic, version, flags = PREAMBLE.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a game snapshot")
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    body = memoryview(data)[PREAMBLE.size:]
+    if flags & COMPRESSED:
+        body = zlib.decompress(body)
+    reader = Reader(body)
+
+    (width, height, viewport_width, viewport_height, map_width, map_height, monster_count, seed,
+     player, key, exit, start_player, start_key, start_exit, start_monster,
+     awaiting_play_again, outcome) = reader.unpack(HEADER)
+    game.map_size = (map_width or None, map_height or None)
+    game.monster_count = monster_count
+    game.seed = seed
+    game.awaiting_play_again = bool(awaiting_play_again)
+    game.outcome = OUTCOMES[outcome]
+    game._player, game._key, game._exit = player, key, exit
+    game.treasure_count = reader.unpack(TREASURES)[0] if version >= 2 else 0
+
+    words = reader.array('I', 624)
+    has_gauss, gauss_next, word_index = reader.unpack(RNG_TAIL)
+    game.rng = random.Random()
+
+    settings = Settings.__new__(Settings)  # Use the saved sizes and positions instead of rolling new ones
+    settings.rng = game.rng
+    settings.GRID_WIDTH, settings.GRID_HEIGHT = width, height
+    settings.VIEWPORT_WIDTH, settings.VIEWPORT_HEIGHT = viewport_width, viewport_height
+    settings._player, settings._key, settings._exit, settings._monster = start_player, start_key, start_exit, start_monster
+    game.settings = settings
+
+    item_count, names_length, owned = reader.unpack(ITEMS)
+    names = bytes(reader.bytes(names_length)).decode().split("\0")
+    counts = reader.array('i', item_count)
+    inventory = Inventory(game.rng, table_for_map(width, height))
+    inventory.counts = array('i')
+    inventory.owned = 0
+    for saved_id, (name, count) in enumerate(zip(names, counts)):
+        inventory.add_item(name, count)  # Item numbers may differ in this process
+        if not owned >> saved_id & 1:
+            inventory.owned &= ~(1 << item_id(name))
+    game.inventory = inventory
+
+    (monsters,) = reader.unpack(COUNT)
+    positions = [unpack_position(position) for position in reader.array('q', monsters)]
+    repellent = reader.array('h', monsters)
+    swarm_state = reader.unpack(SWARM_RNG) if monster_count > 1 else None
+
+    game.buried = SpatialIndex()
+    if version >= 2:
+        buried_count, kinds_length = reader.unpack(BURIED)
+        kinds = bytes(reader.bytes(kinds_length)).decode().split("\0")
+        buried_positions = reader.array('q', buried_count)
+        for position, kind in zip(buried_positions, reader.bytes(buried_count)):
+            game.buried.insert(unpack_position(position), kinds[kind])
+    elif key >= 0:
+        game.buried.insert(unpack_position(key), "key")  # Version 1 games only had the key buried
+
+    game.cave_mode, cave_seed, chunk_size, chunk_count = reader.unpack(CAVE) if version >= 3 else (False, 0, 0, 0)
+    game.cave_mode = bool(game.cave_mode)
+    generated = [unpack_position(chunk) for chunk in reader.array('q', chunk_count)] if chunk_size else []
+    game.fog_mode = bool(reader.unpack(FOG)[0]) if version >= 4 else False
+
+    grid = GridState(width, height)  # Zeroed memory is handed out by the OS almost for free
+    if flags & SPARSE:
+        (cell_count,) = reader.unpack(COUNT)
+        indexes = reader.array('I', cell_count)
+        cells = grid.cells
+        for index, cell in zip(indexes, reader.bytes(cell_count)):
+            cells[index] = cell
+    else:
+        grid.cells[:] = reader.bytes(width * height)
+    game.grid = grid
+    game.cave = None
+    if chunk_size:
+        from cave import CaveGenerator, CaveMap
+        game.cave = CaveMap(grid, CaveGenerator(cave_seed, width, height, chunk_size))
+        game.cave.generated.update(generated)
+    game.fov = None
+    if game.fog_mode:
+        from fov import FieldOfView
+        game.fov = FieldOfView(grid)  # Lit areas are worked out again as they are needed
+    game.renderer = None
+    game.distance_field = DistanceField(grid)
+
+    if monster_count > 1:
+        from swarm import MonsterSwarm
+        game.monster = MonsterSwarm(positions, game.distance_field, game.rng)
+        game.monster.repellent[:] = repellent
+        state, inc, has_uint32, uinteger = swarm_state
+        game.monster.rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": int.from_bytes(state, "little"), "inc": int.from_bytes(inc, "little")},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+    else:
+        game.monster = Monster(positions[0], game.distance_field, game.rng)
+        game.monster.repellent_turns_left = repellent[0]
+    # Last, because creating a swarm draws its seed from the game's generator
+    game.rng.setstate((3, tuple(words) + (word_index,), gauss_next if has_gauss else None))
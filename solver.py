@@ -0,0 +1,696 @@
+# solver.py
+import argparse
+import time
+from collections import OrderedDict
+from multiprocessing import Pool
+import numpy as np
+from commands import commands_dict
+from loot import table_for_map
+
+REPELLENT_TURNS = 3  # How long the monster flees after the repellent is used, as in Game.use_monster_repellent
+CHASE_DISTANCE = 2  # The monster chases the player from this many steps away, as in Monster.is_near_player
+MAX_DEPTH = 5000  # Never look further ahead than this many turns
+TOLERANCE = 1e-6  # Stop looking further ahead once no chance changes by more than this in a turn
+MAX_HIDDEN_CELLS = 9  # HiddenKeySolver's states grow exponentially with the map: 3x3 within 10 turns is already 3 million
+CACHE_SIZE = 256  # Solved boards a KnownKeySolver keeps before forgetting the one used longest ago
+POLICY_DISCOUNT = 0.99  # KnownKeyPolicy values getting away a turn sooner this much more, so it doesn't dawdle
+
+# What the player has of the repellent. Fleeing states have no repellent left, because the one
+# the game starts with is the only one the solver plays with.
+HOLDING = 0  # A repellent in the backpack
+EMPTY = 1  # No repellent, and the monster isn't fleeing
+CHARGES = 2 + REPELLENT_TURNS  # HOLDING, EMPTY, then fleeing for 1, 2 or 3 more turns
+
+# What the player can do on their turn, in the order ties are broken. Everything else the game
+# understands (torches, the metal detector, checking the inventory) only lets the monster move, like "wait".
+ACTIONS = ["up", "down", "left", "right", "repel", "wait"]
+STEPS = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0), "wait": (0, 0)}
+
+class Board:
+    def __init__(self, width, height):
+        """
+        Everything that happens on a map of one size, worked out once for every position: where each
+        action takes the player and where the monster can go next, with what chance.
+
+        A position is the player's cell, the monster's cell and what the player has of the repellent.
+        Whether the key has been dug up is kept apart, because before that the exit doesn't matter
+        and after it the key doesn't, so those two halves can be shared between many layouts.
+
+        Args:
+            width (int): Width of the map.
+            height (int): Height of the map.
+        """
+        self.width = width
+        self.height = height
+        cells = width * height
+        self.cells = cells
+        self.size = CHARGES * cells * cells  # Positions, plus one more index that stands for being caught
+        neighbours = [self.neighbours(cell) for cell in range(cells)]
+
+        # Where each action leaves the player, before the monster moves
+        destinations = {}
+        for action, (dx, dy) in STEPS.items():
+            destinations[action] = [
+                self.cell((x + dx, y + dy)) if 0 <= x + dx < width and 0 <= y + dy < height else self.cell((x, y))
+                for x, y in map(self.position, range(cells))
+            ]
+        charge, player, monster = self.unpack(np.arange(self.size))
+        self.player = player  # The player's cell in every position
+        self.after_action = np.array([
+            self.index(np.where(charge == HOLDING, CHARGES - 1, charge), player, monster) if action == "repel"
+            else self.index(charge, np.array(destinations[action])[player], monster)
+            for action in ACTIONS
+        ])
+
+        # Where the monster goes from every position, following Monster.move on a map without walls
+        self.next_position = np.full((5, self.size), self.size, dtype=np.intp)  # Caught, unless filled in
+        self.chance = np.zeros((5, self.size, 1), dtype=np.float32)
+        for index in range(self.size):
+            charge, player, monster = self.unpack(index)
+            if charge >= 2:
+                charge -= 1  # The repellent wears off a little, and the monster runs
+                outcomes = [(self.step_away(player, monster, neighbours[monster]), 1.0)]
+            elif self.distance(player, monster) <= CHASE_DISTANCE:
+                step = next((n for n in neighbours[monster] if self.distance(player, n) < self.distance(player, monster)), monster)
+                outcomes = [(step, 1.0)]
+            else:
+                # A yawn or one of the four directions, rolling again whenever the direction is off the map
+                chance = 1.0 / (len(neighbours[monster]) + 1)
+                outcomes = [(monster, chance)] + [(neighbour, chance) for neighbour in neighbours[monster]]
+            for k, (cell, chance) in enumerate(outcomes):
+                self.chance[k, index, 0] = chance
+                if cell != player or charge >= 2:  # The monster can't catch anyone while it's fleeing
+                    self.next_position[k, index] = self.index(charge, player, cell)
+        # The chance of not being caught by the monster's next move, from every position
+        self.survival = (self.chance[:, :, 0] * (self.next_position < self.size)).sum(axis=0, dtype=np.float32)
+
+    def cell(self, position):
+        return position[1] * self.width + position[0]
+
+    def position(self, cell):
+        return (cell % self.width, cell // self.width)
+
+    def index(self, charge, player, monster):
+        return (charge * self.cells + player) * self.cells + monster
+
+    def unpack(self, index):
+        return index // (self.cells * self.cells), index // self.cells % self.cells, index % self.cells
+
+    def neighbours(self, cell):
+        """The cells next to a cell, in the order DistanceField.DIRECTIONS tries them: east, west, south, north."""
+        x, y = self.position(cell)
+        return [
+            self.cell((x + dx, y + dy)) for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
+            if 0 <= x + dx < self.width and 0 <= y + dy < self.height
+        ]
+
+    def distance(self, a, b):
+        return abs(a % self.width - b % self.width) + abs(a // self.width - b // self.width)
+
+    def step_away(self, player, monster, neighbours):
+        """DistanceField.step_away: the first neighbour further from the player than any before it."""
+        best, best_distance = monster, self.distance(player, monster)
+        for neighbour in neighbours:
+            if self.distance(player, neighbour) > best_distance:
+                best, best_distance = neighbour, self.distance(player, neighbour)
+        return best
+
+    def expect(self, values):
+        """
+        Average over what the monster does: the chance of escaping from every position right after
+        the player's action, given the chance from every position at the start of the next turn.
+
+        Args:
+            values (numpy.ndarray): One row per position and one column per board, with a last row
+                of 0 for being caught. Boards side by side make every lookup copy a whole row at once.
+        """
+        expected = self.chance[0] * values[self.next_position[0]]
+        for k in range(1, len(self.chance)):
+            expected += self.chance[k] * values[self.next_position[k]]
+        return expected
+
+    def backup(self, values, discount=1.0):
+        """
+        Look one more turn ahead: the player picks the best action, then the monster moves.
+
+        Args:
+            values (numpy.ndarray): The chances with one turn less to go, see expect().
+            discount (float): Multiply the chances by this for every turn it takes to escape.
+
+        Returns:
+            tuple: (chance of escaping from every position, chance right after every action).
+        """
+        expected = self.expect(values)
+        if discount != 1.0:
+            expected *= discount
+        best = expected[self.after_action[0]]
+        for after_action in self.after_action[1:]:
+            np.maximum(best, expected[after_action], out=best)
+        return best, expected
+
+    def solve(self, key, exits, depth=MAX_DEPTH, tolerance=TOLERANCE, turns=None, discount=1.0):
+        """
+        Look further ahead one turn at a time until nothing changes any more, for one key and some exits.
+
+        This is expectimax search done for every position at once: after d rounds, every entry is
+        the chance of escaping within d turns with the best play, every position at its own fixed index.
+
+        Both halves of the game are looked ahead together, since digging up the key on turn d leads
+        to the escape half with d - 1 turns left. The escape half usually settles long before the
+        search half does, and then stops being worked on.
+
+        Args:
+            key (int): The key's cell.
+            exits (list): The exit cells, one board each.
+            depth (int): Turns to look ahead at most.
+            tolerance (float): Stop early once no chance changes by more than this.
+            turns (int): Also keep the chances of escaping within this many turns.
+            discount (float): Multiply the chances by this for every turn it takes to escape, so that
+                of two sure ways out the quicker one is better.
+
+        Returns:
+            tuple: (solution, solution within turns or None, turns looked ahead). A solution is
+            (search chances, search chances after actions, escape chances, escape chances after actions),
+            with one column per exit.
+        """
+        count = len(exits)
+        on_key = self.player == key
+        # The door opens at once, but the monster still gets its move that turn and can catch the player
+        unlock = np.where(self.player[:, None] == np.array(exits)[None, :], self.survival[:, None], np.float32(0))
+        # The search half of every board, then the escape half, side by side
+        values = np.zeros((self.size + 1, 2 * count), dtype=np.float32)
+        escape = None  # The escape half, once it has settled: (chances, chances after actions)
+        limited = None
+        for turn in range(1, depth + 1):
+            if escape is None:
+                best, expected = self.backup(values, discount)
+                np.maximum(best[:, count:], unlock, out=best[:, count:])
+                escape_expected = expected[:, count:]
+            else:
+                best, expected = self.backup(values[:, :count], discount)
+            # Digging up the key: the player keeps their place, the monster moves, and now they have the key
+            best[on_key, :count] = np.maximum(best[on_key, :count], escape_expected[on_key])
+            change = np.abs(best - values[:-1, :best.shape[1]]).max(axis=0)
+            values[:-1, :best.shape[1]] = best
+            if escape is None and change[count:].max() <= tolerance:
+                escape = (values[:-1, count:].copy(), escape_expected.copy())
+            solution = escape is not None and change.max() <= tolerance
+            if turn == turns or (solution and limited is None and turns is not None):
+                limited = (values[:-1, :count].copy(), expected[:, :count].copy(), values[:-1, count:].copy(), escape_expected.copy())
+            if solution:
+                break
+        escape = escape or (values[:-1, count:], escape_expected)
+        return (values[:-1, :count], expected[:, :count], escape[0], escape[1]), limited, turn
+
+class BoardCache:
+    __slots__ = ("entries", "capacity")
+
+    def __init__(self, capacity=CACHE_SIZE):
+        """
+        Remember solved boards by map size, key and exit, forgetting the one used longest ago once it
+        is full, so memory stays bounded however many layouts are asked about.
+
+        Args:
+            capacity (int): How many solved boards to keep.
+        """
+        self.entries = OrderedDict()
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+def default_turns(width, height):
+    """How many turns the solver gives a game by default: enough to cross the map there and back a few times."""
+    return 3 * (width + height)
+
+class KnownKeySolver:
+    def __init__(self, depth=MAX_DEPTH, tolerance=TOLERANCE, turns=None, discount=1.0, cache_size=CACHE_SIZE):
+        """
+        Work out the best play and the chance of escaping for any layout by a player who knows where
+        the key is buried, solving the boards it needs as it goes and keeping the most recently used ones.
+
+        This is not the chance of winning a real game. A real player has to search for the key, and
+        then every cell already dug becomes part of the position, so the number of positions grows
+        exponentially with the size of the map. Here the player walks straight to the key, only ever
+        digs there, and plays with the one repellent every game starts with. What is left is how well
+        the monster alone can stop a player, which is useful for comparing layouts and map sizes, but
+        it is close to 100% on every map and real games are won far less often.
+
+        Chances are worked out both without a turn limit and within a number of turns.
+
+        Args:
+            depth (int): Turns to look ahead at most without a turn limit.
+            tolerance (float): Stop looking further ahead once no chance changes by more than this.
+            turns (int): The turn limit. None uses default_turns() for each map size.
+            discount (float): Count an escape a turn later as worth this much less, see Board.solve().
+            cache_size (int): Solved boards to keep, see BoardCache.
+        """
+        self.depth = depth
+        self.tolerance = tolerance
+        self.turns = turns
+        self.discount = discount
+        self.boards = {}  # (width, height) -> Board
+        self.cache = BoardCache(cache_size)
+
+    def board(self, width, height):
+        board = self.boards.get((width, height))
+        if board is None:
+            board = self.boards[(width, height)] = Board(width, height)
+        return board
+
+    def solve_board(self, width, height, key, exit):
+        """
+        Solve one layout's key and exit.
+
+        Returns:
+            tuple: (board, solution without a turn limit, solution within the turn limit), see Board.solve().
+        """
+        entry = self.cache.get((width, height, key, exit))
+        if entry is None:
+            board = self.board(width, height)
+            turns = self.turns or default_turns(width, height)
+            solution, limited, _ = board.solve(board.cell(key), [board.cell(exit)], self.depth, self.tolerance, turns, self.discount)
+            limited = limited or solution  # Only when depth is below the turn limit
+            entry = (board, [half[:, 0] for half in solution], [half[:, 0] for half in limited])
+            self.cache.put((width, height, key, exit), entry)
+        return entry
+
+    def chance(self, layout):
+        """
+        The chance of escaping from a new game's layout, knowing where the key is, see layout_of().
+
+        Returns:
+            tuple: (chance within the turn limit, chance without one).
+        """
+        width, height, player, key, exit, monster = layout
+        board, solution, limited = self.solve_board(width, height, key, exit)
+        index = board.index(HOLDING, board.cell(player), board.cell(monster))
+        return float(limited[0][index]), float(solution[0][index])
+
+    def best_action(self, width, height, key, exit, player, monster, has_key, charge):
+        """
+        Pick the best action from a position, for getting away without a turn limit.
+
+        Returns:
+            tuple: (action, chance of escaping). The action is one of ACTIONS, "dig" or "unlock".
+        """
+        board, solution, _ = self.solve_board(width, height, key, exit)
+        _, search_expected, _, escape_expected = solution
+        expected = escape_expected if has_key else search_expected
+        index = board.index(charge, board.cell(player), board.cell(monster))
+        choices = [(expected[after_action[index]], action) for action, after_action in zip(ACTIONS, board.after_action)]
+        if not has_key and player == key:
+            choices.append((escape_expected[index], "dig"))
+        if has_key and player == exit:
+            choices.insert(0, (board.survival[index], "unlock"))
+        chance, action = max(choices, key=lambda choice: choice[0])  # The first of equally good actions
+        return action, float(chance)
+
+def layout_of(game):
+    """The starting layout of a game: (width, height, player, key, exit, monster)."""
+    settings = game.settings
+    return (settings.GRID_WIDTH, settings.GRID_HEIGHT, settings.DEFAULT_PLAYER_POS, settings.DEFAULT_KEY_POS,
+            settings.DEFAULT_EXIT_POS, settings.DEFAULT_MONSTER_POS)
+
+class KnownKeyPolicy:
+    """
+    Play KnownKeySolver's best action every turn, for checking its chances against real games in
+    simulator.py. It reads where the key is buried from the game's settings, which a player can't.
+    """
+    # What to type for each action
+    PHRASES = {"up": "go north", "down": "go south", "left": "go west", "right": "go east",
+               "repel": commands_dict["repel"][0], "wait": commands_dict["inventory"][0],
+               "dig": commands_dict["dig"][0], "unlock": commands_dict["unlock"][0]}
+
+    def __init__(self, solver=None):
+        self.solver = solver or KnownKeySolver(discount=POLICY_DISCOUNT)
+
+    def choose(self, game, turn, rng):
+        if game.monster_count != 1 or game.cave is not None:
+            raise ValueError("The solver only knows games with one monster and no cave walls")
+        settings = game.settings
+        has_key = game.inventory.has_item("key")
+        fleeing = game.monster.repellent_turns_left
+        if fleeing:
+            charge = EMPTY + fleeing
+        else:
+            charge = HOLDING if game.inventory.has_item("monster repellent") else EMPTY
+        action, _ = self.solver.best_action(
+            settings.GRID_WIDTH, settings.GRID_HEIGHT, settings.DEFAULT_KEY_POS, settings.DEFAULT_EXIT_POS,
+            game.player_position, game.monster.position, has_key, charge,
+        )
+        return self.PHRASES[action]
+
+# What the player can do in HiddenKeySolver, in the order ties are broken
+SEARCH_ACTIONS = ["unlock", "dig", "sweep", "repel", "up", "down", "left", "right", "wait"]
+DETECTOR_RANGE = 2  # The metal detector hears the key up to this many steps away, as in Game.DETECTOR_RANGE
+
+def detector_reading(distance):
+    """What the metal detector says about the key this many steps away: the distance, or None out of range."""
+    return distance if distance <= DETECTOR_RANGE else None
+
+def repellent_chance(width, height):
+    """The chance that digging where nothing is buried turns up a monster repellent, from the game's loot table."""
+    table = table_for_map(width, height)
+    return sum(chance for (item, _), chance in zip(table.outcomes, table.chances()) if item == "monster repellent")
+
+class HiddenKeySolver:
+    def __init__(self, width, height, exit, turns=None):
+        """
+        The chance of escaping within a turn limit for a player who has to find the key, with the best play.
+
+        This is expectimax over what the player knows. A state is the turns left, the player's and the
+        monster's cells, how long the monster still flees, the repellents in the backpack, whether the
+        key has been dug up, the cells the key could still be buried in (the belief) and the cells
+        already dug. Chance nodes average over where the monster goes, over finding the key when digging
+        in a cell of the belief (every cell of it is equally likely), over what the loot table turns up
+        otherwise (only repellents matter), and over what the metal detector says, which splits the
+        belief into the cells that would give each reading.
+
+        The player is assumed to know the map, the exit and where the monster is, as a lit torch shows
+        them, without spending torches on it. Everything else follows the game's rules.
+
+        Every state is kept in one dict under a canonical key, so the many ways of reaching it, and every
+        starting layout with this exit, are solved once. The belief and the dug cells make the number of
+        states grow exponentially with the map, so this only works for tiny maps, see MAX_HIDDEN_CELLS.
+
+        Args:
+            width (int): Width of the map.
+            height (int): Height of the map.
+            exit (tuple): The exit's (x, y) position.
+            turns (int): The turn limit. None uses default_turns().
+        """
+        if width * height > MAX_HIDDEN_CELLS:
+            raise ValueError(f"Searching for the key is only solved on maps of up to {MAX_HIDDEN_CELLS} cells")
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.exit = exit[1] * width + exit[0]
+        self.turns = turns or default_turns(width, height)
+        self.repellent = repellent_chance(width, height)
+        board = self.board = Board(width, height)  # For the monster's moves and the neighbours of every cell
+        self.steps = [
+            [(action, board.cell((x + dx, y + dy))) for action, (dx, dy) in STEPS.items()
+             if action != "wait" and 0 <= x + dx < width and 0 <= y + dy < height]
+            for x, y in map(board.position, range(self.cells))
+        ]
+        # For every cell the player can sweep from, the cells that give each reading of the metal detector
+        self.readings = []
+        for player in range(self.cells):
+            readings = {}
+            for cell in range(self.cells):
+                reading = detector_reading(board.distance(player, cell))
+                readings[reading] = readings.get(reading, 0) | 1 << cell
+            self.readings.append(list(readings.values()))
+        self.monster_moves = {}  # (player, monster, fleeing) -> [(cell, fleeing after, chance)], leaving out being caught
+        self.quickest = {}  # (player, belief) -> fewest turns to dig up the key and unlock the exit
+        self.values = {}  # canonical state -> chance of escaping
+
+    def start(self, player, monster):
+        """The state a game starts in. The key is in any cell but the player's, the exit's and the monster's."""
+        player = self.board.cell(player)
+        monster = self.board.cell(monster)
+        belief = (1 << self.cells) - 1 & ~(1 << player | 1 << self.exit | 1 << monster)
+        return (self.turns, player, monster, 0, 1, False, belief, 0)
+
+    @staticmethod
+    def canonical(state):
+        """
+        The key a state is remembered under. Which cells could hold the key stops mattering once it is dug
+        up, and no more repellents can be used than there are turns left, so those are left out.
+        """
+        turns, player, monster, fleeing, repellents, has_key, belief, searched = state
+        return (turns, player, monster, fleeing, min(repellents, turns), has_key, 0 if has_key else belief, searched)
+
+    def moves(self, player, monster, fleeing):
+        """Where the monster goes from a position without catching the player, following Monster.move like Board does."""
+        moves = self.monster_moves.get((player, monster, fleeing))
+        if moves is None:
+            board = self.board
+            neighbours = board.neighbours(monster)
+            if fleeing:
+                outcomes = [(board.step_away(player, monster, neighbours), 1.0)]
+            elif board.distance(player, monster) <= CHASE_DISTANCE:
+                outcomes = [(next((n for n in neighbours if board.distance(player, n) < board.distance(player, monster)), monster), 1.0)]
+            else:
+                chance = 1.0 / (len(neighbours) + 1)
+                outcomes = [(monster, chance)] + [(neighbour, chance) for neighbour in neighbours]
+            left = max(fleeing - 1, 0)
+            # The monster can't catch anyone while it's fleeing
+            moves = [(cell, left, chance) for cell, chance in outcomes if cell != player or left]
+            self.monster_moves[(player, monster, fleeing)] = moves
+        return moves
+
+    def quickest_escape(self, player, has_key, belief):
+        """The fewest turns that can win from a position: walk to a cell the key may be in, dig, walk to the exit, unlock."""
+        distance = self.board.distance
+        if has_key:
+            return distance(player, self.exit) + 1
+        quickest = self.quickest.get((player, belief))
+        if quickest is None:
+            quickest = self.quickest[(player, belief)] = min(
+                (distance(player, cell) + distance(cell, self.exit) + 2 for cell in range(self.cells) if belief >> cell & 1),
+                default=self.turns + 1,  # The key can't be anywhere, which only chances that can't happen lead to
+            )
+        return quickest
+
+    def value(self, state):
+        """The chance of escaping from a state with the best play."""
+        if state[0] < self.quickest_escape(state[1], state[5], state[6]):
+            return 0.0
+        state = self.canonical(state)
+        value = self.values.get(state)
+        if value is None:
+            value = self.values[state] = max(chance for _, chance in self.actions(state))
+        return value
+
+    def after(self, turns, player, monster, fleeing, repellents, has_key, belief, searched):
+        """The chance of escaping once the player has acted: the monster moves, then the next turn starts."""
+        turns -= 1
+        if turns < self.quickest_escape(player, has_key, belief):
+            return 0.0  # Not even the monster staying away all the way would help
+        if repellents > turns:
+            repellents = turns
+        values = self.values
+        total = 0.0
+        for cell, left, chance in self.moves(player, monster, fleeing):
+            state = (turns, player, cell, left, repellents, has_key, belief, searched)
+            value = values.get(state)
+            if value is None:
+                value = values[state] = max(chance for _, chance in self.actions(state))
+            total += chance * value
+        return total
+
+    def actions(self, state):
+        """
+        Yield every useful action from a canonical state with its chance of escaping, in SEARCH_ACTIONS
+        order. Walking into the edge of the map is the same as waiting, so it is left out.
+        """
+        turns, player, monster, fleeing, repellents, has_key, belief, searched = state
+        after = self.after
+        cell = 1 << player
+        if has_key and player == self.exit:
+            # The door opens at once, but the monster still gets its move that turn and can catch the player
+            yield "unlock", sum(chance for _, _, chance in self.moves(player, monster, fleeing))
+        if not searched & cell:
+            dug = searched | cell
+            # Digging where the key isn't draws from the loot table, which may turn up a repellent
+            missed = belief & ~cell
+            loot = (
+                self.repellent * after(turns, player, monster, fleeing, repellents + 1, has_key, missed, dug)
+                + (1.0 - self.repellent) * after(turns, player, monster, fleeing, repellents, has_key, missed, dug)
+            )
+            if belief & cell:
+                found = 1.0 / belief.bit_count()
+                yield "dig", found * after(turns, player, monster, fleeing, repellents, True, 0, dug) + (1.0 - found) * loot
+            else:
+                yield "dig", loot
+        if not has_key:
+            readings = [belief & cells for cells in self.readings[player] if belief & cells]
+            if len(readings) > 1:  # Otherwise the player learns nothing
+                count = belief.bit_count()
+                yield "sweep", sum(
+                    cells.bit_count() / count * after(turns, player, monster, fleeing, repellents, False, cells, searched)
+                    for cells in readings
+                )
+        if repellents:
+            yield "repel", after(turns, player, monster, REPELLENT_TURNS, repellents - 1, has_key, belief, searched)
+        for action, destination in self.steps[player]:
+            yield action, after(turns, destination, monster, fleeing, repellents, has_key, belief, searched)
+        yield "wait", after(*state)
+
+    def best_action(self, state):
+        """
+        Pick the best action from a state.
+
+        Returns:
+            tuple: (action, chance of escaping). The first of equally good actions in SEARCH_ACTIONS order.
+        """
+        if state[0] < self.quickest_escape(state[1], state[5], state[6]):
+            return "wait", 0.0
+        return max(self.actions(self.canonical(state)), key=lambda choice: choice[1])
+
+class HiddenKeyPolicy:
+    """
+    Play HiddenKeySolver's best action every turn, for checking its chances against real games in
+    simulator.py. Unlike KnownKeyPolicy it never reads where the key is: it keeps its own belief,
+    narrowed down by the cells it digs and by the metal detector's readings.
+    """
+    PHRASES = dict(KnownKeyPolicy.PHRASES, sweep=commands_dict["sweep"][0])
+
+    def __init__(self, max_turns):
+        self.max_turns = max_turns  # The game is lost once this many turns are played
+        self.solvers = {}  # (width, height, exit) -> HiddenKeySolver, all sharing its states
+        self.belief = None
+
+    def choose(self, game, turn, rng):
+        if game.monster_count != 1 or game.cave is not None or game.treasure_count:
+            raise ValueError("The solver only knows games with one monster, no cave walls and no buried gems")
+        settings = game.settings
+        width, height = settings.GRID_WIDTH, settings.GRID_HEIGHT
+        solver_key = (width, height, settings.DEFAULT_EXIT_POS)
+        solver = self.solvers.get(solver_key)
+        if solver is None:
+            solver = self.solvers[solver_key] = HiddenKeySolver(width, height, settings.DEFAULT_EXIT_POS, self.max_turns)
+        if turn == 0:
+            self.belief = solver.start(settings.DEFAULT_PLAYER_POS, settings.DEFAULT_MONSTER_POS)[6]
+        searched = 0
+        for cell in range(solver.cells):
+            if game.grid.is_searched(solver.board.position(cell)):
+                searched |= 1 << cell
+        self.belief &= ~searched
+        state = (
+            self.max_turns - turn, solver.board.cell(game.player_position), solver.board.cell(game.monster.position),
+            game.monster.repellent_turns_left, game.inventory.count("monster repellent"),
+            game.inventory.has_item("key"), self.belief, searched,
+        )
+        action, _ = solver.best_action(state)
+        if action == "sweep":
+            # The reading the game is about to show, which keeps only the cells that would give it
+            found = game.buried.nearest(game.player_position, DETECTOR_RANGE)
+            reading = found[2] if found is not None else None
+            self.belief = sum(
+                1 << cell for cell in range(solver.cells)
+                if self.belief >> cell & 1 and detector_reading(solver.board.distance(state[1], cell)) == reading
+            )
+        return self.PHRASES[action]
+
+def solve_hidden(width, height, turns=None):
+    """
+    Solve every layout Settings.reset can roll for a map size, with the key hidden.
+
+    Returns:
+        tuple: (average chance of escaping within the turn limit, number of layouts, states solved).
+    """
+    total = 0.0
+    layouts = 0
+    states = 0
+    for exit_cell in range(width * height):
+        exit = (exit_cell % width, exit_cell // width)
+        solver = HiddenKeySolver(width, height, exit, turns)
+        for player in range(solver.cells):
+            for monster in range(solver.cells):
+                if len({player, monster, exit_cell}) == 3:
+                    total += solver.value(solver.start(solver.board.position(player), solver.board.position(monster)))
+                    layouts += 1
+        states += len(solver.values)
+    return total / layouts, layouts, states
+
+def solve_key(task):
+    """
+    Solve every layout with one key cell, in a worker process.
+
+    Returns:
+        tuple: (sum of chances within the turn limit, sum of chances without one, number of layouts).
+    """
+    width, height, key, depth, tolerance, turns = task
+    board = Board(width, height)
+    cells = np.arange(board.cells)
+    exits = [exit for exit in cells if exit != key]
+    solution, limited, _ = board.solve(key, exits, depth, tolerance, turns)
+    limited = limited or solution
+
+    # Settings.reset gives the player, key, exit and monster a cell each
+    starts = board.index(HOLDING, cells[:, None], cells[None, :])  # [player, monster]
+    totals = [0.0, 0.0]
+    layouts = 0
+    for column, exit in enumerate(exits):
+        allowed = np.ones((board.cells, board.cells), dtype=bool)
+        allowed[[key, exit], :] = False
+        allowed[:, [key, exit]] = False
+        np.fill_diagonal(allowed, False)
+        for i, (search, _, _, _) in enumerate((limited, solution)):
+            totals[i] += float(search[starts[allowed], column].sum(dtype=np.float64))
+        layouts += int(allowed.sum())
+    return totals[0], totals[1], layouts
+
+def solve_all(width, height, depth=MAX_DEPTH, tolerance=TOLERANCE, turns=None, processes=None):
+    """
+    Solve every layout Settings.reset can roll for a map size, the layouts of each key cell in
+    one task of a process pool.
+
+    Returns:
+        tuple: (average chance within the turn limit, average chance without one, number of layouts).
+    """
+    turns = turns or default_turns(width, height)
+    tasks = [(width, height, key, depth, tolerance, turns) for key in range(width * height)]
+    if processes == 1:
+        results = list(map(solve_key, tasks))
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(solve_key, tasks)
+    layouts = sum(count for _, _, count in results)
+    return sum(limited for limited, _, _ in results) / layouts, sum(total for _, total, _ in results) / layouts, layouts
+
+def main():
+    parser = argparse.ArgumentParser(description="Work out the best play and the chance of escaping for starting layouts, if the player knew where the key is, or exactly on tiny maps if they have to search for it.")
+    parser.add_argument("--seed", type=int, default=0, help="Solve the layout of the game with this seed")
+    parser.add_argument("--size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="Solve every layout of maps this big")
+    parser.add_argument("--all", action="store_true", help="Solve every layout of every map size a game can roll")
+    parser.add_argument("--turns", type=int, help="The turn limit (default: three times width plus height)")
+    parser.add_argument("--depth", type=int, default=MAX_DEPTH, help="Turns to look ahead at most without a turn limit")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Stop once chances change less than this per turn")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--hidden", action="store_true", help=f"Search for the key instead of knowing where it is, on a --size map of up to {MAX_HIDDEN_CELLS} cells")
+    args = parser.parse_args()
+    if args.hidden and (args.all or not args.size or args.size[0] * args.size[1] > MAX_HIDDEN_CELLS):
+        parser.error(f"--hidden needs a --size of up to {MAX_HIDDEN_CELLS} cells, the maps a game rolls are far too big")
+
+    start = time.perf_counter()
+    if args.hidden:
+        width, height = args.size
+        turns = args.turns or default_turns(width, height)
+        chance, layouts, states = solve_hidden(width, height, turns)
+        print(f"{width}x{height}, {layouts} layouts: {chance:.2%} escape within {turns} turns, searching for the key ({states} states)")
+    elif args.size or args.all:
+        sizes = [tuple(args.size)] if args.size else [(width, height) for width in range(4, 9) for height in range(4, 9)]
+        for width, height in sizes:
+            turns = args.turns or default_turns(width, height)
+            limited, chance, layouts = solve_all(width, height, args.depth, args.tolerance, turns, args.processes)
+            print(f"{width}x{height}, {layouts} layouts: {limited:.2%} escape within {turns} turns, {chance:.2%} without a limit, knowing where the key is")
+    else:
+        from game import Game
+        from headless import HeadlessGUI
+        layout = layout_of(Game(HeadlessGUI(keep_messages=False), seed=args.seed))
+        solver = KnownKeySolver(args.depth, args.tolerance, args.turns)
+        width, height, player, key, exit, monster = layout
+        limited, chance = solver.chance(layout)
+        action, _ = KnownKeySolver(args.depth, args.tolerance, discount=POLICY_DISCOUNT).best_action(width, height, key, exit, player, monster, False, HOLDING)
+        print(f"{width}x{height}, player {player}, key {key}, exit {exit}, monster {monster}")
+        print(f"Knowing where the key is: {limited:.2%} escape within {args.turns or default_turns(width, height)} turns, {chance:.2%} without a limit")
+        print(f"Best first move: {action}")
+    print(f"Solved in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
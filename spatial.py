@@ -0,0 +1,148 @@
+# spatial.py
+
+class SpatialIndex:
+    __slots__ = ("bucket_size", "buckets", "count")
+
+    def __init__(self, bucket_size=16):
+        """
+        Things buried on the map, sorted into square buckets of cells so that finding the nearest one
+        only looks at the buckets around a position instead of at everything that is buried.
+
+        Distances are counted in steps (Manhattan distance), like everywhere else in the game.
+
+        Args:
+            bucket_size (int): Width and height of a bucket in cells.
+        """
+        self.bucket_size = bucket_size
+        self.buckets = {}  # (bucket x, bucket y) -> {position: value}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yield (position, value) for everything in the index."""
+        for bucket in self.buckets.values():
+            yield from bucket.items()
+
+    def bucket_of(self, position):
+        return (position[0] // self.bucket_size, position[1] // self.bucket_size)
+
+    def insert(self, position, value):
+        """Bury something at a position, replacing whatever was there."""
+        bucket = self.buckets.setdefault(self.bucket_of(position), {})
+        if position not in bucket:
+            self.count += 1
+        bucket[position] = value
+
+    def get(self, position):
+        """Return what is buried at a position, or None."""
+        bucket = self.buckets.get(self.bucket_of(position))
+        return bucket.get(position) if bucket else None
+
+    def remove(self, position):
+        """
+        Dig up a position.
+
+        Returns:
+            The value that was buried there, or None if there was nothing.
+        """
+        key = self.bucket_of(position)
+        bucket = self.buckets.get(key)
+        if not bucket or position not in bucket:
+            return None
+        self.count -= 1
+        value = bucket.pop(position)
+        if not bucket:
+            del self.buckets[key]  # Keep empty buckets from slowing down searches
+        return value
+
+    def ring(self, center, radius):
+        """Yield the keys of the buckets exactly radius buckets away from center, in both directions."""
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+        for bx in range(cx - radius, cx + radius + 1):
+            yield (bx, cy - radius)
+            yield (bx, cy + radius)
+        for by in range(cy - radius + 1, cy + radius):
+            yield (cx - radius, by)
+            yield (cx + radius, by)
+
+    def nearest(self, position, max_distance=None):
+        """
+        Find the closest buried thing.
+
+        Args:
+            position (tuple): The (x, y) position to search from.
+            max_distance (int): Ignore anything further than this many steps away.
+
+        Returns:
+            tuple: (position, value, distance) of the closest one, or None if there is nothing in range.
+        """
+        if not self.count:
+            return None
+        x, y = position
+        center = self.bucket_of(position)
+        best = None
+        best_distance = max_distance + 1 if max_distance is not None else float("inf")
+        radius = 0
+        while True:
+            if (2 * radius + 1) ** 2 > 4 * len(self.buckets):
+                return self.nearest_by_bucket(position, best, best_distance)  # Few buckets left, so check them all
+            for key in self.ring(center, radius):
+                bucket = self.buckets.get(key)
+                if not bucket:
+                    continue
+                for (px, py), value in bucket.items():
+                    distance = abs(px - x) + abs(py - y)
+                    if distance < best_distance:
+                        best, best_distance = ((px, py), value, distance), distance
+            # Anything in a bucket further out is at least radius * bucket_size + 1 steps away
+            if best_distance <= radius * self.bucket_size + 1:
+                return best
+            radius += 1
+
+    def nearest_by_bucket(self, position, best, best_distance):
+        """Check every bucket, closest first, until the rest are all further away than the best so far."""
+        x, y = position
+        size = self.bucket_size
+        candidates = []
+        for (bx, by), bucket in self.buckets.items():
+            # The fewest steps from the position to any cell of the bucket
+            dx = max(bx * size - x, 0, x - (bx * size + size - 1))
+            dy = max(by * size - y, 0, y - (by * size + size - 1))
+            if dx + dy < best_distance:
+                candidates.append((dx + dy, bx, by))
+        candidates.sort()
+        for lower_bound, bx, by in candidates:
+            if lower_bound >= best_distance:
+                break
+            for (px, py), value in self.buckets[(bx, by)].items():
+                distance = abs(px - x) + abs(py - y)
+                if distance < best_distance:
+                    best, best_distance = ((px, py), value, distance), distance
+        return best
+
+    def within(self, position, radius):
+        """
+        Find everything buried up to radius steps away.
+
+        Returns:
+            list: (position, value, distance) tuples, closest first.
+        """
+        x, y = position
+        size = self.bucket_size
+        found = []
+        for bx in range((x - radius) // size, (x + radius) // size + 1):
+            for by in range((y - radius) // size, (y + radius) // size + 1):
+                bucket = self.buckets.get((bx, by))
+                if not bucket:
+                    continue
+                for (px, py), value in bucket.items():
+                    distance = abs(px - x) + abs(py - y)
+                    if distance <= radius:
+                        found.append(((px, py), value, distance))
+        found.sort(key=lambda item: item[2])
+        return found
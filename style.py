@@ -2,4 +2,5 @@
 
 title_font = ("Terminal", 28)
 game_font = ("Terminal", 20)
-small_font = ("Terminal", 16)
\ No newline at end of file
+small_font = ("Terminal", 16)
+map_font = ("Terminal", 18)
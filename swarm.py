@@ -0,0 +1,198 @@
+# swarm.py
+import random
+from events import MonsterHowl, MonsterYawn
+from grid import WALL
+from pathfinding import DistanceField
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for games with more than one monster
+    np = None
+
+# The same directions Monster.random_move picks from, in the same order. The last one is the yawn.
+STEPS_X = [0, 0, 1, -1, 0]
+STEPS_Y = [-1, 1, 0, 0, 0]
+YAWN = 4
+
+class MonsterSwarm:
+    def __init__(self, initial_positions, field, rng=random):
+        """
+        Many monsters that all move in one vectorized step per turn. They follow the same rules as
+        Monster: flee while repelled, chase the player when within 2 steps, and wander otherwise.
+        Chasing and fleeing go around walls like Monster does, by looking up every monster's
+        distance from the same DistanceField, which is only searched once per player move.
+
+        Args:
+            initial_positions (list): The (x, y) starting position of every monster.
+            field (DistanceField): Distances to the player, shared with everything that chases or flees from them.
+            rng (random.Random): Seeds the swarm's own NumPy generator, so seeded games repeat.
+        """
+        if np is None:
+            raise ImportError("More than one monster needs NumPy (pip install numpy)")
+        self.field = field
+        grid = self.grid = field.grid
+        self.x = np.array([x for x, _ in initial_positions], dtype=np.int32)
+        self.y = np.array([y for _, y in initial_positions], dtype=np.int32)
+        self.repellent = np.zeros(len(initial_positions), dtype=np.int16)  # Turns of repellent left per monster
+        self.steps_x = np.array(STEPS_X, dtype=np.int32)
+        self.steps_y = np.array(STEPS_Y, dtype=np.int32)
+        self.cells = np.frombuffer(grid.cells, dtype=np.uint8).reshape(grid.height, grid.width)  # Shares memory with the grid
+        self.rng = np.random.default_rng(rng.getrandbits(64))  # Follows the seed of the game
+
+    @property
+    def repellent_turns_left(self):
+        return int(self.repellent.max())
+
+    @repellent_turns_left.setter
+    def repellent_turns_left(self, turns):
+        self.repellent[:] = turns  # Repellent drives every monster away
+
+    def positions(self):
+        """Return the (x, y) position of every monster."""
+        return list(zip(self.x.tolist(), self.y.tolist()))
+
+    def is_open(self, x, y):
+        """Check which of the positions are on the map and not inside a wall."""
+        inside = (x >= 0) & (x < self.grid.width) & (y >= 0) & (y < self.grid.height)
+        open_cells = np.zeros_like(inside)
+        open_cells[inside] = (self.cells[y[inside], x[inside]] & WALL) == 0
+        return open_cells
+
+    def step(self, which, step_x, step_y):
+        """Move the selected monsters by a step each, if the cell they would move to is open."""
+        new_x = self.x[which] + step_x
+        new_y = self.y[which] + step_y
+        allowed = self.is_open(new_x, new_y)
+        moving = np.flatnonzero(which)[allowed]
+        self.x[moving] = new_x[allowed]
+        self.y[moving] = new_y[allowed]
+        return allowed
+
+    def random_move(self, which):
+        """
+        Move the selected monsters in random directions. Monsters whose direction is blocked pick again,
+        just like Monster.random_move.
+
+        Returns:
+            bool: True if any of them yawned.
+        """
+        yawned = False
+        waiting = which.copy()
+        while waiting.any():
+            directions = self.rng.integers(0, len(STEPS_X), waiting.sum())
+            yawned = yawned or bool((directions == YAWN).any())
+            moved = self.step(waiting, self.steps_x[directions], self.steps_y[directions])
+            done = np.flatnonzero(waiting)[moved | (directions == YAWN)]
+            waiting[done] = False
+        return yawned
+
+    def distances(self, player_position, limit):
+        """
+        Search the distance field out to a number of steps from the player, and copy what it found into
+        a window around the player that is just big enough to hold it. The window is as small as the
+        search, however big the map is.
+
+        Returns:
+            tuple: The window (numpy.ndarray, -1 where a cell wasn't reached) and the (x, y) position of its corner.
+        """
+        field = self.field
+        field.update(player_position)
+        field.expand(limit=limit)
+        found = np.fromiter(field.distances.keys(), dtype=np.int64, count=len(field.distances))
+        steps = np.fromiter(field.distances.values(), dtype=np.int32, count=len(field.distances))
+        within = steps <= limit  # Every cell this close is also this close as the crow flies, so inside the window
+        found, steps = found[within], steps[within]
+        player_x, player_y = player_position
+        window = np.full((2 * limit + 1, 2 * limit + 1), -1, dtype=np.int32)
+        window[found // self.grid.width - player_y + limit, found % self.grid.width - player_x + limit] = steps
+        return window, (player_x - limit, player_y - limit)
+
+    def look_up(self, distances, x, y):
+        """Read the distances of some positions from a window made by distances(), -1 outside it."""
+        window, (left, top) = distances
+        x, y = x - left, y - top
+        size = len(window)
+        inside = (x >= 0) & (x < size) & (y >= 0) & (y < size)
+        found = np.full(len(x), -1, dtype=np.int32)
+        found[inside] = window[y[inside], x[inside]]
+        return found
+
+    def neighbour_distances(self, distances, x, y, dx, dy):
+        """The neighbours of some positions in one direction, whether they are open, and their distances (-1 if not)."""
+        new_x, new_y = x + dx, y + dy
+        return new_x, new_y, self.is_open(new_x, new_y), self.look_up(distances, new_x, new_y)
+
+    def chase_player(self, which, distances):
+        """
+        Step the selected monsters along a shortest way to the player, like DistanceField.step_towards:
+        to the first neighbour closer to the player, trying them in the order of DistanceField.DIRECTIONS.
+        """
+        x, y = self.x[which], self.y[which]
+        current = self.look_up(distances, x, y)
+        moved = np.zeros(len(x), dtype=bool)
+        for dx, dy in DistanceField.DIRECTIONS:
+            new_x, new_y, _, found = self.neighbour_distances(distances, x, y, dx, dy)
+            step = ~moved & (found >= 0) & (found < current)
+            x[step], y[step] = new_x[step], new_y[step]
+            moved |= step
+        self.x[which], self.y[which] = x, y
+
+    def avoid_player(self, which, distances, player_x, player_y):
+        """
+        Step the selected monsters away from the player, like DistanceField.step_away: to the neighbour
+        furthest from the player within DistanceField.FLEE_LIMIT steps, or as the crow flies further out.
+        """
+        x, y = self.x[which], self.y[which]
+        current = self.look_up(distances, x, y)
+        searched = (current >= 0) & (current <= DistanceField.FLEE_LIMIT)
+        best = np.where(searched, current, np.abs(x - player_x) + np.abs(y - player_y))
+        new_x, new_y = x.copy(), y.copy()
+        for dx, dy in DistanceField.DIRECTIONS:
+            next_x, next_y, open_cells, found = self.neighbour_distances(distances, x, y, dx, dy)
+            # Only steps within the search count for monsters that were searched for, like step_away's limit
+            found = np.where(found <= current + 1, found, -1)
+            distance = np.where(searched, found, np.where(open_cells, np.abs(next_x - player_x) + np.abs(next_y - player_y), -1))
+            step = distance > best
+            new_x[step], new_y[step] = next_x[step], next_y[step]
+            best[step] = distance[step]
+        self.x[which], self.y[which] = new_x, new_y
+
+    def move(self, player_position):
+        """
+        Move every monster once.
+
+        Args:
+            player_position (tuple): The (x, y) coordinates of the player's position.
+
+        Returns:
+            list: The events the player can hear: one howl if any monster gives chase, one yawn if any stays put.
+        """
+        events = []
+        player_x, player_y = player_position
+        repelled = self.repellent > 0
+        self.repellent[repelled] -= 1
+        any_repelled = repelled.any()
+        # Fleeing needs the distances of the neighbours of every cell within FLEE_LIMIT, chasing only within 3
+        distances = self.distances(player_position, DistanceField.FLEE_LIMIT + 1 if any_repelled else 3)
+        current = self.look_up(distances, self.x, self.y)
+        near = ~repelled & (current >= 0) & (current <= 2)  # Within 2 steps, walking around walls
+        wandering = ~repelled & ~near
+
+        if any_repelled:
+            self.avoid_player(repelled, distances, player_x, player_y)
+        if near.any():
+            events.append(MonsterHowl())
+            self.chase_player(near, distances)
+        if wandering.any() and self.random_move(wandering):
+            events.append(MonsterYawn())
+        return events
+
+    def check_if_caught(self, player_position):
+        """
+        Checks if any monster without repellent is standing on the player.
+
+        Returns:
+        bool: True if the player was caught, otherwise False.
+        """
+        player_x, player_y = player_position
+        return bool(((self.x == player_x) & (self.y == player_y) & (self.repellent == 0)).any())
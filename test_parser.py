@@ -0,0 +1,34 @@
+# test_parser.py
+import unittest
+from parser import CommandParser
+
+class FuzzyExcludeTest(unittest.TestCase):
+    # Real words one or two typos away from an action that must never run by accident
+    NEAR_MISSES = {
+        "cheat": ["check", "chest", "cheap", "heat", "chat"],
+        "save": ["wave", "slave", "sane", "safe"],
+        "stats": ["start", "state", "stars"],
+        "quit": ["quiz", "suit", "quite"],
+    }
+
+    def setUp(self):
+        self.parser = CommandParser()
+
+    def test_near_misses_are_not_run(self):
+        for action, words in self.NEAR_MISSES.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertNotEqual(self.parser.parse(word)[0], action)
+
+    def test_excluded_actions_still_match_exactly(self):
+        for action in CommandParser.FUZZY_EXCLUDE:
+            with self.subTest(action=action):
+                self.assertEqual(self.parser.parse(action), (action, None))
+                self.assertEqual(self.parser.parse(action.upper() + "!"), (action, None))
+
+    def test_other_typos_are_still_forgiven(self):
+        self.assertEqual(self.parser.parse("dgi")[0], "dig")
+        self.assertEqual(self.parser.parse("go nort"), ("up", None))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,4 +10,34 @@ def calculate_distance(pos1, pos2):
     Returns:
         int: The Manhattan distance between the two positions.
     """
-    return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
\ No newline at end of file
+    return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+POSITION_BITS = 16  # Bits for each coordinate of a packed position, enough for maps up to 65,536 wide
+
+def pack_position(position):
+    """
+    Pack an (x, y) position into a single small int, which takes less memory than a tuple.
+
+    Args:
+        position (tuple): The (x, y) coordinates, or None.
+
+    Returns:
+        int: The packed position, or -1 for None.
+    """
+    if position is None:
+        return -1
+    return (position[1] << POSITION_BITS) | position[0]
+
+def unpack_position(packed):
+    """
+    Turn a packed position back into an (x, y) tuple.
+
+    Args:
+        packed (int): A position packed by pack_position().
+
+    Returns:
+        tuple: The (x, y) coordinates, or None for -1.
+    """
+    if packed < 0:
+        return None
+    return (packed & ((1 << POSITION_BITS) - 1), packed >> POSITION_BITS)
@@ -0,0 +1,67 @@
+# worker.py
+import queue
+import threading
+
+class QueuedOutput:
+    """
+    Stands in for the GUI on the worker thread. Instead of touching tkinter,
+    every turn's events are put on a queue so the main thread can hand them to the real GUI.
+    """
+    def __init__(self, results):
+        self.results = results
+
+    def handle(self, events):
+        self.results.put(("handle", (events,)))
+
+class TurnWorker:
+    STOP = object()  # Put on the input queue to end the worker thread
+
+    def __init__(self, game_options=None):
+        """
+        Run the game on a background thread, so a slow turn doesn't freeze the window.
+        Inputs are handled one at a time in the order they were submitted.
+
+        Args:
+            game_options (dict): Keyword arguments for Game, e.g. the map size.
+        """
+        self.game_options = game_options or {}
+        self.inputs = queue.Queue()
+        self.results = queue.Queue()
+        self.output = QueuedOutput(self.results)
+        self.game = None
+        self.thread = threading.Thread(target=self.work, name="turn-worker", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, player_input):
+        """Queue player input for the worker. Safe to call from the Tk main thread."""
+        self.inputs.put(player_input)
+
+    def work(self):
+        """The worker thread: create the game, then play each input as it arrives."""
+        from game import Game
+        self.game = Game(self.output, **self.game_options)
+        while True:
+            player_input = self.inputs.get()
+            if player_input is self.STOP:
+                break
+            self.game.run(player_input)
+
+    def drain(self, target):
+        """
+        Replay everything the game output since the last call on the real GUI.
+        Call this from the Tk main thread, e.g. from a window.after callback.
+
+        Args:
+            target: The object to replay the calls on, usually the GUI.
+        """
+        while True:
+            try:
+                name, args = self.results.get_nowait()
+            except queue.Empty:
+                return
+            getattr(target, name)(*args)
+
+    def stop(self):
+        self.inputs.put(self.STOP)